@@ -1,24 +1,24 @@
 import customtkinter as ctk
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-from tkcalendar import DateEntry
+from tkinter import messagebox
 from datetime import datetime, timedelta
-import requests # Keep for now, might be fully removed if client handles all
-import json # Keep for now
-import pandas as pd
 import os
-import time
 import threading
-# import openpyxl # No longer directly used in this file
+from concurrent.futures import as_completed
+from functools import partial
+# pandas, requests and the api/ and utils/ modules built on them are imported on first use (see api_client,
+# _load_stores and warm_up_in_background), so the window is shown without waiting for them.
 
 # Assuming app_ui.py is in a subdirectory 'ui'
 from ui.app_ui import AppUI
-from api.solaredge_client import SolarEdgeClient
-from utils import data_processor
-from utils import file_exporter
 from utils import helpers
+from utils import request_planner
+from utils import request_scheduler
+from utils import sync_state
 from utils.helpers import OperationCancelledError # Centralized OperationCancelledError
 
+WARM_UP_DELAY_MS = 200 # Heavy modules are imported in the background this long after the first frame
+
 
 class SolarEdgeAPIApp:
     def __init__(self, root):
@@ -45,6 +45,7 @@ class SolarEdgeAPIApp:
         self.account_api_key_entry = None
         self.fetch_sites_button = None
         self.fetch_button = None
+        self.fleet_button = None
         self.cancel_button = None
 
         self.ui = AppUI(self.root, self)
@@ -55,12 +56,94 @@ class SolarEdgeAPIApp:
 
         self.site_name_to_id_map = {} 
         self.is_fetching = False 
+        self.sync_state_store = sync_state.SyncStateStore()
         self.current_selected_site_id = None
+        self.site_inventories = {} # site_id -> "Inventory" object from the last details fetch (used to look up inverter models)
 
-        self.api_client = SolarEdgeClient(
-            check_if_cancelled_callback=self.check_if_cancelled,
-            status_update_callback=self.update_status_label_for_client
-        )
+        # The API client and local stores are created on first use; see api_client and _load_stores
+        self._services_lock = threading.RLock()
+        self._api_client = None
+        self._stores_loaded = False
+        self._timeseries_store = None
+        self._segment_store = None
+        self._scheduler = None
+        # Site details and alerts are scheduler jobs that run alongside an export; a new selection replaces them
+        self._details_job = None
+        self._alerts_job = None
+
+    @property
+    def api_client(self):
+        with self._services_lock:
+            if self._api_client is None:
+                from api.solaredge_client import SolarEdgeClient
+                from api.response_cache import ResponseCache
+                try:
+                    response_cache = ResponseCache()
+                except Exception as e:
+                    print(f"Warning: Response cache unavailable, continuing without it: {e}")
+                    response_cache = None
+                self._api_client = SolarEdgeClient(
+                    check_if_cancelled_callback=self._check_request_cancelled,
+                    status_update_callback=self.update_status_label_for_client,
+                    cache=response_cache
+                )
+            return self._api_client
+
+    @property
+    def scheduler(self):
+        """The RequestScheduler every export, fleet export and site-details request is queued on."""
+        with self._services_lock:
+            if self._scheduler is None:
+                from utils.request_scheduler import RequestScheduler
+                self._scheduler = RequestScheduler(rate_limiter=self.api_client.rate_limiter)
+            return self._scheduler
+
+    def _load_stores(self):
+        with self._services_lock:
+            if self._stores_loaded:
+                return
+            from utils.timeseries_store import TimeSeriesStore
+            from utils.segment_store import SegmentStore, segments_available
+            try:
+                self._timeseries_store = TimeSeriesStore()
+            except Exception as e:
+                print(f"Warning: Local time-series store unavailable, continuing without it: {e}")
+                self._timeseries_store = None
+            # Sealed monthly Arrow segments make reading the store's history back (near) instant
+            self._segment_store = SegmentStore(timeseries_store=self._timeseries_store) if self._timeseries_store is not None and segments_available() else None
+            self._stores_loaded = True
+
+    @property
+    def timeseries_store(self):
+        self._load_stores()
+        return self._timeseries_store
+
+    @property
+    def segment_store(self):
+        self._load_stores()
+        return self._segment_store
+
+    def warm_up_in_background(self):
+        """Imports the export stack on a background thread once the window is up, so the first click does not wait for it."""
+        def warm_up():
+            try:
+                self.api_client
+                from utils import export_pipeline
+            except Exception as e:
+                print(f"Warning: Background warm-up failed, modules will load on first use: {e}")
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+    def close(self):
+        """Releases whatever was created: pooled connections, the response cache and the local store."""
+        with self._services_lock:
+            if self._scheduler is not None:
+                self._scheduler.close()
+            if self._api_client is not None:
+                self._api_client.close() # Release pooled keep-alive connections
+                if self._api_client.cache is not None:
+                    self._api_client.cache.close()
+            if self._timeseries_store is not None:
+                self._timeseries_store.close()
 
     def update_status_label_for_client(self, message):
         if hasattr(self, 'status_label') and self.status_label:
@@ -91,37 +174,47 @@ class SolarEdgeAPIApp:
         thread.start()
 
     def _execute_fetch_sites(self, account_api_key):
+        import requests # Already loaded by the API client; imported here so startup does not wait for it
         all_sites = []
-        start_index = 0
-        max_results_per_call = 100
-        total_sites_fetched = 0
+        max_results_per_call = self.api_client.SITES_LIST_MAX_PAGE_SIZE
         expected_total_sites = -1
         
         try:
-            while True:
-                data = self.api_client.get_sites_list(
-                    api_key=account_api_key,
-                    start_index=start_index,
-                    size=max_results_per_call
-                )
-                if data and "sites" in data and "site" in data["sites"]:
-                    current_batch = data["sites"]["site"]
-                    all_sites.extend(current_batch)
-                    if expected_total_sites == -1 :
-                        expected_total_sites = data["sites"].get("count", 0)
-                    total_sites_fetched += len(current_batch)
-                    if expected_total_sites > 0:
-                        if hasattr(self, 'progress_bar'): self.progress_bar.set(min(total_sites_fetched / expected_total_sites, 0.95))
-                    else: 
-                        if hasattr(self, 'progress_bar'): self.progress_bar.set(0.5)
-                    if hasattr(self, 'status_label'): self.status_label.configure(text=f"Fetched {total_sites_fetched}/{expected_total_sites if expected_total_sites >0 else 'many'} sites...")
-                    self.root.update()
-                    if total_sites_fetched >= expected_total_sites or not current_batch or len(current_batch) < max_results_per_call:
-                        break
-                    start_index += len(current_batch)
-                else: 
-                    messagebox.showwarning("Site List Format", "API response for site list not in expected format (or no sites found).")
-                    break
+            # The first page tells us the total count; the remaining pages are then fetched concurrently
+            data = self.api_client.get_sites_list(
+                api_key=account_api_key,
+                start_index=0,
+                size=max_results_per_call
+            )
+            if data and "sites" in data and "site" in data["sites"]:
+                first_batch = data["sites"]["site"]
+                all_sites.extend(first_batch)
+                expected_total_sites = data["sites"].get("count", 0)
+                if hasattr(self, 'status_label'): self.status_label.configure(text=f"Fetched {len(all_sites)}/{expected_total_sites if expected_total_sites >0 else 'many'} sites...")
+                self.root.update()
+
+                remaining_pages = []
+                if first_batch and len(first_batch) >= max_results_per_call:
+                    remaining_pages = [(start_index, max_results_per_call)
+                                       for start_index in range(len(first_batch), expected_total_sites, max_results_per_call)]
+
+                def fetch_page(page_index, start_index, size):
+                    page_data = self.api_client.get_sites_list(api_key=account_api_key, start_index=start_index, size=size)
+                    if page_data and "sites" in page_data and "site" in page_data["sites"]:
+                        return page_data["sites"]["site"]
+                    return []
+
+                def on_page_done(done_count, total_count):
+                    fetched_estimate = min(len(first_batch) + done_count * max_results_per_call, expected_total_sites)
+                    if hasattr(self, 'progress_bar'): self.root.after(0, self.progress_bar.set, min(fetched_estimate / expected_total_sites, 0.95))
+                    if hasattr(self, 'status_label'): self.root.after(0, lambda: self.status_label.configure(text=f"Fetched {fetched_estimate}/{expected_total_sites} sites..."))
+
+                for _, _, _, page_sites in helpers.fetch_chunks_concurrently(
+                        remaining_pages, fetch_page, max_workers=helpers.MAX_CONCURRENT_API_REQUESTS,
+                        check_if_cancelled_callback=self.check_if_cancelled, chunk_done_callback=on_page_done):
+                    all_sites.extend(page_sites) # Merged in page order
+            else: 
+                messagebox.showwarning("Site List Format", "API response for site list not in expected format (or no sites found).")
             
             self.site_name_to_id_map.clear()
             if all_sites:
@@ -163,12 +256,12 @@ class SolarEdgeAPIApp:
                     self.status_label.configure(text="Ready.")
 
     def handle_site_selection_data(self, site_id):
-        self.is_fetching = True
-        if hasattr(self, 'fetch_button'): self.fetch_button.configure(state="disabled")
-        if hasattr(self, 'fetch_sites_button'): self.fetch_sites_button.configure(state="disabled")
-        if hasattr(self, 'cancel_button'): self.cancel_button.pack(pady=5)
-        if hasattr(self, 'status_label'): self.status_label.configure(text=f"Fetching details for site {site_id}...")
-        if hasattr(self, 'progress_bar'): self.progress_bar.start()
+        # Details are queued ahead of a running export's chunks instead of waiting for it to finish
+        if self._details_job is not None: self._details_job.cancel("Replaced by a newer site selection")
+        if not self.is_fetching: # Otherwise the export keeps the status and progress bars
+            if hasattr(self, 'cancel_button'): self.cancel_button.pack(pady=5)
+            if hasattr(self, 'status_label'): self.status_label.configure(text=f"Fetching details for site {site_id}...")
+            if hasattr(self, 'progress_bar'): self.progress_bar.start()
         thread = threading.Thread(target=self._execute_fetch_site_details, args=(site_id,))
         thread.daemon = True
         thread.start()
@@ -179,64 +272,59 @@ class SolarEdgeAPIApp:
             self.root.after(0, lambda: messagebox.showerror("API Key Missing", "Account API Key is required to fetch site details."))
             self._finalize_site_details_fetch_ui()
             return
+        if hasattr(self, 'status_label') and not self.is_fetching: self.root.after(0, lambda: self.status_label.configure(text=f"Fetching overview, inventory and power flow for site {site_id}..."))
+        # The three calls are independent: queue them as one interactive job and fill each tab as soon as its own response lands
+        detail_requests = [
+            ("overview", self.api_client.get_site_overview, "overview", self.ui.populate_overview_tab),
+            ("inventory", self.api_client.get_site_inventory, "Inventory", self.ui.populate_inventory_tab),
+            ("power flow", self.api_client.get_site_current_power_flow, "siteCurrentPowerFlow", self.ui.populate_power_flow_tab),
+        ]
         all_details_fetched_successfully = True
-        try:
-            if hasattr(self, 'status_label'): self.root.after(0, lambda: self.status_label.configure(text=f"Fetching overview for site {site_id}..."))
-            overview_data = self.api_client.get_site_overview(api_key=account_api_key, site_id=site_id)
-            if hasattr(self, 'ui'): self.root.after(0, self.ui.populate_overview_tab, overview_data.get("overview") if overview_data else None)
-        except OperationCancelledError: raise
-        except Exception as e:
-            all_details_fetched_successfully = False; print(f"Error fetching overview: {e}")
-            if hasattr(self, 'ui'): self.root.after(0, self.ui.populate_overview_tab, {"error": str(e)})
-        try:
-            if hasattr(self, 'status_label'): self.root.after(0, lambda: self.status_label.configure(text=f"Fetching inventory for site {site_id}..."))
-            inventory_data = self.api_client.get_site_inventory(api_key=account_api_key, site_id=site_id)
-            if hasattr(self, 'ui'): self.root.after(0, self.ui.populate_inventory_tab, inventory_data.get("Inventory") if inventory_data else None)
-        except OperationCancelledError: raise
-        except Exception as e:
-            all_details_fetched_successfully = False; print(f"Error fetching inventory: {e}")
-            if hasattr(self, 'ui'): self.root.after(0, self.ui.populate_inventory_tab, {"error": str(e)})
-        try:
-            if hasattr(self, 'status_label'): self.root.after(0, lambda: self.status_label.configure(text=f"Fetching power flow for site {site_id}..."))
-            power_flow_data = self.api_client.get_site_current_power_flow(api_key=account_api_key, site_id=site_id)
-            if hasattr(self, 'ui'): self.root.after(0, self.ui.populate_power_flow_tab, power_flow_data.get("siteCurrentPowerFlow") if power_flow_data else None)
-        except OperationCancelledError: raise
-        except Exception as e:
-            all_details_fetched_successfully = False; print(f"Error fetching power flow: {e}")
-            if hasattr(self, 'ui'): self.root.after(0, self.ui.populate_power_flow_tab, {"error": str(e)})
-        self.root.after(0, self._finalize_site_details_fetch_ui, all_details_fetched_successfully, site_id)
+        job = self.scheduler.submit_calls(
+            site_id, [partial(fetch_fn, api_key=account_api_key, site_id=site_id) for _, fetch_fn, _, _ in detail_requests],
+            priority=request_scheduler.PRIORITY_INTERACTIVE, api_key=account_api_key
+        )
+        self._details_job = job
+        future_to_request = {future: (label, response_key, populate_fn) for future, (label, _, response_key, populate_fn) in zip(job.futures, detail_requests)}
+        for future in as_completed(future_to_request):
+            label, response_key, populate_fn = future_to_request[future]
+            superseded = self._details_job is not job # The tabs now belong to a newer selection
+            try:
+                response_data = future.result()
+                if label == "inventory" and response_data and response_data.get(response_key):
+                    self.site_inventories[str(site_id)] = response_data[response_key]
+                if not superseded: self.root.after(0, populate_fn, response_data.get(response_key) if response_data else None)
+            except OperationCancelledError:
+                all_details_fetched_successfully = False
+                if not superseded: self.root.after(0, populate_fn, {"error": "Cancelled by user."})
+            except Exception as e:
+                all_details_fetched_successfully = False; print(f"Error fetching {label}: {e}")
+                if not superseded: self.root.after(0, populate_fn, {"error": str(e)})
+        self.root.after(0, self._finalize_site_details_fetch_ui, all_details_fetched_successfully, site_id, job)
 
-    def _finalize_site_details_fetch_ui(self, success=True, site_id=None):
-        self.is_fetching = False
+    def _finalize_site_details_fetch_ui(self, success=True, site_id=None, job=None):
+        if job is not None and job is not self._details_job:
+            return # A newer site selection owns the status bar
+        self._details_job = None
+        if self.is_fetching:
+            return # A running export owns the status and progress bars
         if hasattr(self, 'progress_bar'): self.progress_bar.stop()
-        if hasattr(self, 'fetch_button'): self.fetch_button.configure(state="normal")
-        if hasattr(self, 'fetch_sites_button'): self.fetch_sites_button.configure(state="normal")
         if hasattr(self, 'cancel_button'): self.cancel_button.pack_forget()
-        if not self.is_fetching:
-            if success:
-                if hasattr(self, 'status_label'): self.status_label.configure(text=f"Details loaded for site {site_id}.")
-            else:
-                if hasattr(self, 'status_label'): self.status_label.configure(text=f"Partial or no details loaded for site {site_id}. Check console for errors.")
+        if success:
+            if hasattr(self, 'status_label'): self.status_label.configure(text=f"Details loaded for site {site_id}.")
         else:
-            if hasattr(self, 'status_label'): self.status_label.configure(text="Operation cancelled.")
-        if hasattr(self, 'status_label'):
-            current_status = self.status_label.cget("text")
-            if not self.is_fetching and not any(s in current_status for s in ["loaded", "Error", "cancelled"]):
-                self.status_label.configure(text="Ready.")
+            if hasattr(self, 'status_label'): self.status_label.configure(text=f"Partial or no details loaded for site {site_id}. Check console for errors.")
 
     def fetch_site_alerts_thread_from_tab(self):
         if not self.current_selected_site_id:
             messagebox.showwarning("No Site Selected", "Please select a site first.")
             return
-        if self.is_fetching:
-            messagebox.showwarning("Busy", "Another operation is in progress. Please wait.")
-            return
-        self.is_fetching = True
         if hasattr(self, 'ui') and self.ui.fetch_alerts_button_tab:
             self.ui.fetch_alerts_button_tab.configure(state="disabled")
-        if hasattr(self, 'cancel_button'): self.cancel_button.pack(pady=5)
-        if hasattr(self, 'status_label'): self.status_label.configure(text=f"Fetching alerts for site {self.current_selected_site_id}...")
-        if hasattr(self, 'progress_bar'): self.progress_bar.start()
+        if not self.is_fetching: # Alerts are queued ahead of a running export, which keeps the status and progress bars
+            if hasattr(self, 'cancel_button'): self.cancel_button.pack(pady=5)
+            if hasattr(self, 'status_label'): self.status_label.configure(text=f"Fetching alerts for site {self.current_selected_site_id}...")
+            if hasattr(self, 'progress_bar'): self.progress_bar.start()
         start_date = self.ui.alert_start_date_entry.get_date() if hasattr(self, 'ui') and self.ui.alert_start_date_entry else datetime.now() - timedelta(days=7)
         end_date = self.ui.alert_end_date_entry.get_date() if hasattr(self, 'ui') and self.ui.alert_end_date_entry else datetime.now()
         start_time_str = datetime.combine(start_date, datetime.min.time()).strftime("%Y-%m-%d %H:%M:%S")
@@ -252,9 +340,12 @@ class SolarEdgeAPIApp:
         error_msg = None
         success_for_finalize = True
         try:
-            alerts_data_response = self.api_client.get_site_alerts(
-                api_key=account_api_key, site_id=site_id, start_time_str=start_time, end_time_str=end_time
+            self._alerts_job = self.scheduler.submit_calls(
+                site_id, [partial(self.api_client.get_site_alerts, api_key=account_api_key, site_id=site_id,
+                                  start_time_str=start_time, end_time_str=end_time)],
+                priority=request_scheduler.PRIORITY_INTERACTIVE, api_key=account_api_key
             )
+            alerts_data_response = self._alerts_job.futures[0].result()
             alerts_list = alerts_data_response.get("alerts", {}).get("alert") if alerts_data_response and "alerts" in alerts_data_response else None
         except OperationCancelledError: 
             error_msg = "cancelled"
@@ -268,14 +359,13 @@ class SolarEdgeAPIApp:
         self.root.after(0, self._finalize_alerts_fetch_ui, success_for_finalize, site_id, error_msg)
 
     def _finalize_alerts_fetch_ui(self, success, site_id, error_msg=None):
-        self.is_fetching = False
-        if hasattr(self, 'progress_bar'): self.progress_bar.stop()
+        self._alerts_job = None
         if hasattr(self, 'ui') and self.ui.fetch_alerts_button_tab:
             self.ui.fetch_alerts_button_tab.configure(state="normal")
-        main_fetch_busy = hasattr(self, 'fetch_button') and self.fetch_button.cget("state") == "disabled"
-        sites_fetch_busy = hasattr(self, 'fetch_sites_button') and self.fetch_sites_button.cget("state") == "disabled"
-        if not main_fetch_busy and not sites_fetch_busy:
-             if hasattr(self, 'cancel_button'): self.cancel_button.pack_forget()
+        if self.is_fetching:
+            return # A running export owns the status and progress bars
+        if hasattr(self, 'progress_bar'): self.progress_bar.stop()
+        if hasattr(self, 'cancel_button'): self.cancel_button.pack_forget()
         if hasattr(self, 'status_label'):
             if success and error_msg == "cancelled":
                 self.status_label.configure(text=f"Alert fetching cancelled for site {site_id}.")
@@ -292,6 +382,7 @@ class SolarEdgeAPIApp:
             return
         self.is_fetching=True
         if hasattr(self, 'fetch_button'): self.fetch_button.configure(state="disabled")
+        if hasattr(self, 'fleet_button'): self.fleet_button.configure(state="disabled")
         if hasattr(self, 'fetch_sites_button'): self.fetch_sites_button.configure(state="disabled")
         if hasattr(self, 'cancel_button'): self.cancel_button.pack(pady=5)
         dtft=threading.Thread(target=self.fetch_and_save_data)
@@ -299,7 +390,9 @@ class SolarEdgeAPIApp:
         dtft.start()
         
     def cancel_fetch(self):
-        if self.is_fetching: 
+        interactive_jobs = [job for job in (self._details_job, self._alerts_job) if job is not None and not job.done()]
+        for job in interactive_jobs: job.cancel("Cancelled by user")
+        if self.is_fetching or interactive_jobs:
             self.is_fetching=False
             if hasattr(self, 'status_label'): self.status_label.configure(text="Cancelling...")
             self.root.update()
@@ -310,6 +403,14 @@ class SolarEdgeAPIApp:
         if not self.is_fetching: 
             raise OperationCancelledError("Cancelled by user")
 
+    def _check_request_cancelled(self):
+        # The API client's check: requests run by the scheduler follow their own job, anything else the Cancel button
+        job = request_scheduler.current_job()
+        if job is not None:
+            job.raise_if_cancelled()
+        else:
+            self.check_if_cancelled()
+
     def create_status_section(self):
         self.status_label=ctk.CTkLabel(self.status_frame,text="Ready.",font=ctk.CTkFont(size=14))
         self.status_label.pack(pady=5)
@@ -317,162 +418,209 @@ class SolarEdgeAPIApp:
         self.progress_bar.pack(pady=5)
         self.progress_bar.set(0)
 
-    def fetch_and_save_data(self):
-        account_api_key=self.account_api_key_entry.get()
-        sel_site_disp=self.ui.site_id_combobox.get()
-        site_id=self.site_name_to_id_map.get(sel_site_disp,sel_site_disp)
-        data_type=self.ui.data_type_var.get()
+    def _export_range_from_ui(self):
         sdo=self.ui.start_date_calendar.get_date()
         edo=self.ui.end_date_calendar.get_date()
         sh=self.ui.start_hour_var.get()
         eh=self.ui.end_hour_var.get()
         sdt=datetime.combine(sdo,datetime.strptime(f"{sh}:00:00","%H:%M:%S").time())
         edt=datetime.combine(edo,datetime.strptime(f"{eh}:59:59","%H:%M:%S").time())
-        time_unit=self.ui.time_unit_var.get() if data_type=="production" else None
-        
-        if data_type=="voltage": max_chunk_days = 7
-        elif data_type=="production":
-            if time_unit == "HOUR": max_chunk_days = 28
-            elif time_unit == "DAY": max_chunk_days = 365
-            elif time_unit in ["WEEK", "MONTH"]: max_chunk_days = 1095
-            else: max_chunk_days = 28
-        else: max_chunk_days = 28
-            
-        if hasattr(self, 'status_label'): self.status_label.configure(text="Calculating export chunks...")
-        if hasattr(self, 'progress_bar'):
-            self.progress_bar.set(0)
-            self.progress_bar.start()
-        self.root.update()
-        
-        date_chunks = helpers.calculate_smart_chunks(sdt, edt, max_chunk_days, self.check_if_cancelled)
-        
-        if hasattr(self, 'progress_bar'): self.progress_bar.stop()
-        num_chunks=len(date_chunks)
-        if num_chunks==0:
-            messagebox.showinfo("Info","No export intervals calculated.")
-            self._restore_ui_after_fetch(); return
-            
-        print(f"Debug: Date range: {sdt} to {edt}")
-        print(f"Debug: Max chunk days: {max_chunk_days}")
-        print(f"Debug: Calculated {num_chunks} chunks:")
-        for i, (start, end) in enumerate(date_chunks):
-            days_in_chunk = (end - start).days + 1
-            print(f"  Chunk {i+1}: {start} to {end} ({days_in_chunk} days)")
-            
-        if hasattr(self, 'status_label'): self.status_label.configure(text=f"Preparing {num_chunks} export requests...")
-        if hasattr(self, 'progress_bar'): self.progress_bar.set(0.1)
-        self.root.update()
-        
-        cdf=None
-        adws=False
+        return sdt, edt
+
+    def _selected_meters(self):
+        return [mtype for var,mtype in [
+            (self.ui.production_var.get(),"PRODUCTION"), (self.ui.consumption_var.get(),"CONSUMPTION"),
+            (self.ui.self_consumption_var.get(),"SELFCONSUMPTION"), (self.ui.feed_in_var.get(),"FEEDIN"),
+            (self.ui.purchased_var.get(),"PURCHASED")] if var]
+
+    def _export_options_from_ui(self):
+        """run_export keyword arguments shared by single-site and fleet exports, from the Output Options section."""
+        use_store = self.ui.use_store_var.get()
+        self.api_client.bypass_cache = not self.ui.use_cache_var.get()
+        return dict(
+            file_format=self.ui.file_format_var.get(), time_unit=self.ui.time_unit_var.get(),
+            compact=self.ui.compact_mode_var.get(), partitioned=self.ui.partition_dataset_var.get(),
+            excel_sheet_per_month=self.ui.excel_sheet_per_month_var.get(),
+            derive_time_units=self.ui.derive_time_units_var.get(),
+            incremental=self.ui.incremental_sync_var.get(), sync_state_store=self.sync_state_store,
+            timeseries_store=self.timeseries_store if use_store else None,
+            segment_store=self.segment_store if use_store else None
+        )
+
+    def _show_status_async(self, message):
+        # Safe to call from export and chunk worker threads
+        if hasattr(self, 'status_label'): self.root.after(0, lambda: self.status_label.configure(text=message))
+
+    def _show_progress_async(self, fraction):
+        if not hasattr(self, 'progress_bar'): return
+        if fraction is None:
+            self.root.after(0, self.progress_bar.set, 0)
+            self.root.after(0, self.progress_bar.start)
+        else:
+            self.root.after(0, self.progress_bar.stop)
+            self.root.after(0, self.progress_bar.set, fraction)
+
+    def fetch_and_save_data(self):
+        import requests # Heavy modules are loaded on first use, see warm_up_in_background
+        from utils import data_processor
+        from utils import export_pipeline
+        account_api_key=self.account_api_key_entry.get()
+        sel_site_disp=self.ui.site_id_combobox.get()
+        site_id=self.site_name_to_id_map.get(sel_site_disp,sel_site_disp)
+        data_type=self.ui.data_type_var.get()
+        sdt, edt = self._export_range_from_ui()
+        isn=None
+        msel_list=[]
+        inverter_model=None
+        if data_type=="voltage":
+            isn=self.ui.inverter_entry.get()
+            # Nested telemetry schemas are cached per inverter model; the pipeline falls back to the serial
+            inverter_model=data_processor.inverter_model_for_serial(self.site_inventories.get(str(site_id)), isn)
+        else:
+            msel_list=self._selected_meters()
+        show_status, show_progress = self._show_status_async, self._show_progress_async
+
         try:
-            for ci,(cs,ce) in enumerate(date_chunks):
-                self.check_if_cancelled()
-                cpb=0.1+(ci/num_chunks)*0.8
-                sts=cs.strftime("%Y-%m-%d %H:%M:%S")
-                ets=ce.strftime("%Y-%m-%d %H:%M:%S")
-                if hasattr(self, 'status_label'): self.status_label.configure(text=f"Fetching export chunk {ci+1}/{num_chunks}: {cs.strftime('%m/%d %H:%M')}-{ce.strftime('%m/%d %H:%M')}")
-                if hasattr(self, 'progress_bar'): self.progress_bar.set(cpb)
-                self.root.update()
-                ad=None
-                df=None
-                if data_type=="voltage":
-                    isn=self.ui.inverter_entry.get()
-                    ad = self.api_client.get_equipment_data(
-                        api_key=account_api_key, site_id=site_id, equipment_sn=isn, start_time_str=sts, end_time_str=ets
-                    )
-                    if ad and "data" in ad and "telemetries" in ad["data"]:
-                        tel=ad["data"]["telemetries"]
-                        df = data_processor.process_voltage_data(tel)
-                    if df is not None and df.empty and not tel and not adws:
-                        if hasattr(self, 'status_label'): self.status_label.configure(text=f"Chunk {ci+1} (V): No telemetries.")
-                        adws=True;
-                        if ci==0: messagebox.showwarning("Data Warn","Chunk (V): No telemetries.")
-                    elif ad and not (df is not None and not df.empty):
-                        if hasattr(self, 'status_label'): self.status_label.configure(text=f"Chunk {ci+1} (V): Bad API resp.")
-                        adws=True;
-                        if ci==0: messagebox.showwarning("API Warn","Chunk (V): Bad structure.")
-                else:
-                    msel_list=[mtype for var,mtype in [
-                        (self.ui.production_var.get(),"PRODUCTION"), (self.ui.consumption_var.get(),"CONSUMPTION"),
-                        (self.ui.self_consumption_var.get(),"SELFCONSUMPTION"), (self.ui.feed_in_var.get(),"FEEDIN"),
-                        (self.ui.purchased_var.get(),"PURCHASED")] if var]
-                    ad = self.api_client.get_energy_details(
-                        api_key=account_api_key, site_id=site_id, start_time_str=sts, end_time_str=ets,
-                        meters_str=",".join(msel_list), time_unit=time_unit
-                    )
-                    if ad and "energyDetails" in ad and "meters" in ad["energyDetails"]:
-                        df = data_processor.process_production_data(ad["energyDetails"]["meters"],ad["energyDetails"]["timeUnit"])
-                    if df is not None and df.empty and not adws and \
-                       (not ad or not ad.get("energyDetails") or not ad["energyDetails"].get("meters") or \
-                        all(not m.get("values") for m in ad["energyDetails"]["meters"])):
-                        if hasattr(self, 'status_label'): self.status_label.configure(text=f"Chunk {ci+1}(P): No meter values.")
-                        adws=True;
-                        if ci==0: messagebox.showwarning("Data Warn","Chunk(P):No meter vals.")
-                    elif ad and not (df is not None and not df.empty):
-                        if hasattr(self, 'status_label'): self.status_label.configure(text=f"Chunk {ci+1}(P):Bad API resp.")
-                        adws=True;
-                        if ci==0: messagebox.showwarning("API Warn","Chunk(P):Bad struct.")
-                if (df is None or df.empty) and not adws and ad:
-                    if hasattr(self, 'status_label'): self.status_label.configure(text=f"Chunk {ci+1} processed,0 pts.")
-                if hasattr(self, 'progress_bar'): self.progress_bar.set(cpb+(0.8/num_chunks)*0.5)
-                self.root.update()
-                if df is not None and not df.empty:
-                    adws=False
-                    cdf=pd.concat([cdf,df],ignore_index=True) if cdf is not None else df
-                    if 'date' in cdf.columns:
-                        cdf=cdf.drop_duplicates(subset=['date']).sort_values('date').reset_index(drop=True)
-            self.check_if_cancelled()
-            if cdf is None or cdf.empty:
-                messagebox.showwarning("No Data","No data for export.")
-                self._restore_ui_after_fetch(); return
-            if hasattr(self, 'status_label'): self.status_label.configure(text="Saving export file...")
-            if hasattr(self, 'progress_bar'): self.progress_bar.set(0.9)
-            self.root.update()
-            output_folder = self.ui.output_path_var.get()
-            file_format_to_save = self.ui.file_format_var.get()
-            saved_fp, export_message = file_exporter.save_data_to_file(
-                dataframe=cdf, output_path=output_folder, site_id=site_id,
-                data_type=data_type, start_date_obj=sdo, end_date_obj=edo, file_format=file_format_to_save
+            result = export_pipeline.run_export(
+                self.api_client, account_api_key, site_id, data_type, sdt, edt,
+                output_path=self.ui.output_path_var.get(), meters=msel_list, equipment_sn=isn, inverter_model=inverter_model,
+                max_workers=1, scheduler=self.scheduler if self.ui.parallel_fetch_var.get() else None,
+                check_if_cancelled_callback=self.check_if_cancelled,
+                status_callback=show_status, progress_callback=show_progress,
+                warning_callback=messagebox.showwarning, **self._export_options_from_ui()
             )
-            if export_message and "Excel export requires" in export_message:
-                messagebox.showwarning("Excel Export Issue", export_message)
-            elif not saved_fp and export_message:
-                 messagebox.showerror("File Save Error", export_message)
-                 if hasattr(self, 'status_label'): self.status_label.configure(text=f"Failed to save: {export_message[:100]}")
-                 self._restore_ui_after_fetch(); return
-            if saved_fp:
-                total_records = len(cdf)
-                date_range_str = f"{sdt.strftime('%Y-%m-%d')} to {edt.strftime('%Y-%m-%d')}"
-                final_status_message = f"Saved {total_records} export records for {date_range_str} to {os.path.basename(saved_fp)}"
-                if export_message and "Saved as CSV instead" in export_message:
-                    final_status_message += f" (as CSV due to missing Excel engine)"
-                if hasattr(self, 'status_label'): self.status_label.configure(text=final_status_message)
-                if hasattr(self, 'progress_bar'): self.progress_bar.set(1.0)
-                messagebox.showinfo("Success", f"Export data saved:\n{saved_fp}\n\n{total_records} data points.")
+            status_message = export_pipeline.summarize_export(result)
+            export_message = result["message"]
+            if result["status"] == "no_intervals":
+                messagebox.showinfo("Info", status_message)
+            elif result["status"] == "no_data":
+                messagebox.showwarning("No Data", status_message)
+            elif result["status"] in ("up_to_date", "no_new_data"):
+                show_status(status_message)
+            elif result["status"] == "save_error":
+                if export_message: messagebox.showerror("File Save Error", export_message)
+                else: messagebox.showerror("Save Error", "Failed to save file. Unknown error.")
+                show_status(status_message)
             else:
-                messagebox.showerror("Save Error", "Failed to save file. Unknown error.")
-                if hasattr(self, 'status_label'): self.status_label.configure(text="Failed to save file.")
+                if export_message and "Excel export requires" in export_message:
+                    messagebox.showwarning("Excel Export Issue", export_message)
+                elif export_message and "Parquet/Feather export requires" in export_message:
+                    messagebox.showwarning("Parquet/Feather Export Issue", export_message)
+                elif export_message and "continued on sheets" in export_message:
+                    messagebox.showinfo("Excel Row Limit", export_message)
+                show_status(status_message)
+                success_message = f"Export data saved:\n{result['saved_path']}\n\n{result['records']} data points."
+                if result["derived_files"]:
+                    success_message += "\n\nComputed locally from the same data (no extra API calls):\n" + "\n".join(os.path.basename(fp) for fp in result["derived_files"])
+                messagebox.showinfo("Success", success_message)
         except OperationCancelledError:
-            if hasattr(self, 'status_label'): self.status_label.configure(text="Export cancelled.")
-            if hasattr(self, 'progress_bar'): self.progress_bar.set(0)
+            show_status("Export cancelled.")
+            show_progress(0)
         except requests.exceptions.Timeout as e:
             messagebox.showerror("API Timeout",f"A timeout occurred: {e}.")
-            if hasattr(self, 'status_label'): self.status_label.configure(text="Error: API Timeout.")
+            show_status("Error: API Timeout.")
         except requests.exceptions.RequestException as e:
             messagebox.showerror("API Connection Error",f"Could not connect to API: {e}")
-            if hasattr(self, 'status_label'): self.status_label.configure(text=f"API Connection Error: {str(e)[:100]}")
+            show_status(f"API Connection Error: {str(e)[:100]}")
         except Exception as e:
             messagebox.showerror("Processing Error",f"An unexpected error occurred: {e}")
-            if hasattr(self, 'status_label'): self.status_label.configure(text=f"Error: {str(e)[:100]}")
+            show_status(f"Error: {str(e)[:100]}")
             import traceback
             traceback.print_exc()
         finally:
-            self._restore_ui_after_fetch()
+            self.root.after(0, self._restore_ui_after_fetch) # Queued behind the status and progress updates above
+
+    def start_fleet_export_thread(self):
+        if self.is_fetching:
+            messagebox.showwarning("In Progress","Another operation in progress.")
+            return
+        from utils import fleet_export
+        if not self.account_api_key_entry.get():
+            messagebox.showerror("Input Error","Account API Key required.")
+            return
+        sites = fleet_export.filter_sites({site_id: display for display, site_id in self.site_name_to_id_map.items()},
+                                          self.ui.fleet_filter_var.get())
+        if not sites:
+            messagebox.showerror("Input Error","No sites match the fleet filter. Fetch the site list first, or change the filter.")
+            return
+        data_type = self.ui.data_type_var.get()
+        if data_type == "production" and not self._selected_meters():
+            messagebox.showerror("Input Error","At least one meter type must be selected for production data.")
+            return
+        if self.ui.fleet_combined_var.get() and (self.ui.incremental_sync_var.get() or self.ui.derive_time_units_var.get() or self.ui.partition_dataset_var.get()):
+            messagebox.showerror("Input Error","A combined fleet file cannot be used with incremental sync, derived time units or a partitioned dataset.")
+            return
+        if not os.path.isdir(self.ui.output_path_var.get()):
+            messagebox.showerror("Input Error","Selected output folder is not a valid directory.")
+            return
+        sdt, edt = self._export_range_from_ui()
+        if sdt > edt:
+            messagebox.showerror("Input Error","Start date/time cannot be after end date/time.")
+            return
+        time_unit = "HOUR" if self.ui.derive_time_units_var.get() else self.ui.time_unit_var.get()
+        calls_per_site = helpers.estimate_chunks_needed(sdt.date(), edt.date(), data_type, time_unit)
+        calls_note = f"about {calls_per_site * len(sites)} API calls" if data_type == "production" else \
+            f"1 inventory call plus about {calls_per_site} calls per inverter for each site"
+        if not messagebox.askokcancel("Fleet Export", f"Export {data_type} data for {len(sites)} sites ({calls_note})?\n\n"
+                                      f"Sites run {helpers.MAX_CONCURRENT_API_REQUESTS} at a time within the shared API limits."):
+            return
+        self.is_fetching=True
+        if hasattr(self, 'fetch_button'): self.fetch_button.configure(state="disabled")
+        if hasattr(self, 'fleet_button'): self.fleet_button.configure(state="disabled")
+        if hasattr(self, 'fetch_sites_button'): self.fetch_sites_button.configure(state="disabled")
+        if hasattr(self, 'cancel_button'): self.cancel_button.pack(pady=5)
+        fleet_thread=threading.Thread(target=self._execute_fleet_export, args=(sites, sdt, edt))
+        fleet_thread.daemon=True
+        fleet_thread.start()
+
+    def _execute_fleet_export(self, sites, sdt, edt):
+        from utils import fleet_export
+        show_status, show_progress = self._show_status_async, self._show_progress_async
+        fleet = None
+        try:
+            fleet = fleet_export.FleetExport(
+                self.api_client, self.account_api_key_entry.get(), sites, self.ui.data_type_var.get(), sdt, edt,
+                self.ui.output_path_var.get(), combined=self.ui.fleet_combined_var.get(),
+                scheduler=self.scheduler if self.ui.parallel_fetch_var.get() else None,
+                check_if_cancelled_callback=self.check_if_cancelled, status_callback=show_status,
+                progress_callback=show_progress, meters=self._selected_meters(), **self._export_options_from_ui()
+            )
+            fleet.run()
+            while fleet.failed_site_ids():
+                failed = fleet.failed_site_ids()
+                listing = "\n".join(f"{fleet.results[s]['site_name'] or s}: {str(fleet.results[s]['error'])[:100]}" for s in failed[:10])
+                if len(failed) > 10: listing += f"\n... and {len(failed) - 10} more"
+                if not messagebox.askyesno("Fleet Export", f"{len(failed)} of {len(fleet.results)} sites failed:\n\n{listing}\n\nRetry the failed sites?"):
+                    break
+                fleet.retry_failed()
+            combined_fp, combined_message = fleet.close()
+            report_fp = fleet.write_report()
+            statuses = [result["status"] for result in fleet.results.values()]
+            failed_count = sum(status in fleet_export.FAILED_STATUSES for status in statuses)
+            summary = f"Saved fleet export: {statuses.count('saved')} sites exported, {statuses.count('up_to_date')} up to date, {statuses.count('no_data')} without data, {failed_count} failed."
+            show_status(f"{summary} Report: {os.path.basename(report_fp)}")
+            show_progress(1.0)
+            details = f"{summary}\n\nPer-site report:\n{report_fp}"
+            if combined_fp: details += f"\n\nCombined file:\n{combined_fp}"
+            elif combined_message and self.ui.fleet_combined_var.get(): details += f"\n\nCombined file: {combined_message}"
+            (messagebox.showwarning if failed_count else messagebox.showinfo)("Fleet Export", details)
+        except OperationCancelledError:
+            if fleet is not None: fleet.abort()
+            show_status(f"Fleet export cancelled after {len(fleet.results) if fleet else 0} sites.")
+            show_progress(0)
+        except Exception as e:
+            if fleet is not None: fleet.abort()
+            messagebox.showerror("Fleet Export Error",f"An unexpected error occurred: {e}")
+            show_status(f"Error: {str(e)[:100]}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            self.root.after(0, self._restore_ui_after_fetch)
 
     def _restore_ui_after_fetch(self):
         self.is_fetching=False
         if hasattr(self, 'fetch_button'): self.fetch_button.configure(state="normal")
+        if hasattr(self, 'fleet_button'): self.fleet_button.configure(state="normal")
         if hasattr(self, 'fetch_sites_button'): self.fetch_sites_button.configure(state="normal")
         if hasattr(self, 'cancel_button'): self.cancel_button.pack_forget()
         if hasattr(self, 'status_label'):
@@ -514,31 +662,30 @@ class SolarEdgeAPIApp:
         if start_datetime > end_datetime:
             messagebox.showerror("Input Error","Start date/time cannot be after end date/time.")
             return False
-        days_diff = (end_date_obj - start_date_obj).days
         current_data_type = self.ui.data_type_var.get()
         if current_data_type == "voltage":
             if not self.ui.inverter_entry.get():
                 messagebox.showerror("Input Error","Inverter Serial Number is required for voltage data.")
                 return False
-            if days_diff > 30:
-                 estimated_calls = (days_diff + 6) // 7
-                 if not messagebox.askokcancel("Long Date Range Warning",
-                                              f"Fetching voltage data for {days_diff+1} days will require approximately {estimated_calls} API calls. This may take a while. Continue?"):
-                    return False
         else:
             selected_meters = any([self.ui.production_var.get(), self.ui.consumption_var.get(), self.ui.self_consumption_var.get(), self.ui.feed_in_var.get(), self.ui.purchased_var.get()])
             if not selected_meters:
                 messagebox.showerror("Input Error","At least one meter type must be selected for production data.")
                 return False
-            current_time_unit = self.ui.time_unit_var.get()
-            estimated_calls = helpers.estimate_chunks_needed(start_date_obj, end_date_obj, current_data_type, current_time_unit)
-            if estimated_calls > 20 :
-                if not messagebox.askokcancel("Many API Calls Warning",
-                                             f"This export configuration will require approximately {estimated_calls} API calls. This could take significant time and API quota. Continue?"):
-                    return False
         if not os.path.isdir(self.ui.output_path_var.get()):
             messagebox.showerror("Input Error","Selected output folder is not a valid directory.")
             return False
+        # Dry run of the export: the exact calls it will make once the local store and the response cache are taken into account
+        from utils import export_pipeline
+        plan = export_pipeline.plan_export(
+            self.api_client, self.account_api_key_entry.get(), site_id_to_use, current_data_type, start_datetime, end_datetime,
+            meters=self._selected_meters() if current_data_type == "production" else None,
+            equipment_sn=self.ui.inverter_entry.get() if current_data_type == "voltage" else None, **self._export_options_from_ui()
+        )
+        if plan.api_calls > request_planner.LARGE_PLAN_CALLS or plan.exceeds_quota:
+            quota_note = "\n\nThat is more than the requests left today; the export will stop when they run out." if plan.exceeds_quota else ""
+            if not messagebox.askokcancel("Many API Calls Warning", f"This export needs {plan.summary()}.{quota_note}\n\nContinue?"):
+                return False
         return True
 
 if __name__ == "__main__":
@@ -549,4 +696,8 @@ if __name__ == "__main__":
         pass 
     root = ctk.CTk()
     app = SolarEdgeAPIApp(root)
-    root.mainloop()
+    root.after(WARM_UP_DELAY_MS, app.warm_up_in_background)
+    try:
+        root.mainloop()
+    finally:
+        app.close()
@@ -0,0 +1,205 @@
+import asyncio
+import json
+
+try:
+    import aiohttp
+except ImportError: # Optional dependency, only needed for the asyncio client
+    aiohttp = None
+
+from api.solaredge_client import (
+    SolarEdgeClient,
+    SolarEdgeEndpointsMixin,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_BASE_RETRY_DELAY,
+    _parse_error_details,
+    _client_error_exception,
+    _merge_bulk_responses,
+)
+from utils.helpers import OperationCancelledError
+from api.rate_limiter import get_shared_rate_limiter, site_ids_from_endpoint
+
+
+class AsyncSolarEdgeClient(SolarEdgeEndpointsMixin):
+    """
+    asyncio counterpart of SolarEdgeClient.
+
+    Exposes the same API methods (get_sites_list, get_site_overview, get_equipment_data,
+    get_energy_details, ...) as coroutines, with the same error messages and 429/Retry-After
+    handling. All requests share one aiohttp connection pool, so hundreds of sites can be
+    driven from a single event loop:
+
+        async with AsyncSolarEdgeClient() as client:
+            overviews = await asyncio.gather(*(client.get_site_overview(key, sid) for sid in site_ids))
+
+    Retry waits are awaitable and end immediately when cancel() is called; in-flight
+    requests can also be cancelled the usual asyncio way (task.cancel()).
+    """
+    BASE_URL = SolarEdgeClient.BASE_URL
+
+    def __init__(self, status_update_callback=None, pool_size=SolarEdgeClient.DEFAULT_POOL_SIZE,
+                 connect_timeout=SolarEdgeClient.DEFAULT_CONNECT_TIMEOUT, read_timeout=SolarEdgeClient.DEFAULT_READ_TIMEOUT,
+                 base_url=None, rate_limiter=None, cache=None):
+        """
+        :param status_update_callback: An optional function to call for updating status messages (e.g., for rate limit waits).
+        :param pool_size: Maximum number of simultaneous connections in the shared pool.
+        :param connect_timeout: Seconds to wait for a TCP/TLS connection to be established.
+        :param read_timeout: Seconds to wait for the server to send data once connected.
+        :param base_url: Overrides BASE_URL, e.g. to point the client at a local stub server.
+        :param rate_limiter: SolarEdgeRateLimiter shared with the threaded clients (default: the process-wide one);
+                             pass False to disable client-side rate limiting.
+        :param cache: Optional ResponseCache. Set `bypass_cache = True` to skip cache lookups (fresh responses are still stored).
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncSolarEdgeClient requires 'aiohttp'. Install it with: pip install aiohttp")
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.status_update_callback = status_update_callback
+        self.rate_limiter = get_shared_rate_limiter() if rate_limiter is None else rate_limiter
+        self.cache = cache
+        self.bypass_cache = False
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self._session = None
+        self._cancel_event = None
+
+    def _get_session(self):
+        # Created lazily so the client can be constructed outside a running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    def _get_cancel_event(self):
+        if self._cancel_event is None:
+            self._cancel_event = asyncio.Event()
+        return self._cancel_event
+
+    def cancel(self):
+        """Requests cancellation: pending retry waits and future requests raise OperationCancelledError."""
+        self._get_cancel_event().set()
+
+    def reset_cancellation(self):
+        """Clears a previous cancel() so the client can be used for a new operation."""
+        if self._cancel_event is not None:
+            self._cancel_event.clear()
+
+    def check_if_cancelled(self):
+        if self._cancel_event is not None and self._cancel_event.is_set():
+            raise OperationCancelledError("Cancelled by user")
+
+    async def _wait(self, seconds):
+        """Sleeps for `seconds`, waking up immediately (with OperationCancelledError) on cancel()."""
+        try:
+            await asyncio.wait_for(self._get_cancel_event().wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            return
+        raise OperationCancelledError("Cancelled by user")
+
+    async def _acquire_permit(self, api_key, site_ids):
+        """Awaits a rate-limiter permit without blocking the event loop."""
+        while True:
+            self.check_if_cancelled()
+            wait = self.rate_limiter.try_acquire(api_key, site_ids)
+            if wait <= 0:
+                return
+            await self._wait(min(wait, 0.25))
+
+    async def _fetch_bulk(self, requests_to_make, container_key, item_key):
+        # Groups are requested concurrently; the rate limiter keeps this within the concurrency limit
+        responses = await asyncio.gather(*(self._request_data(e, p) for e, p in requests_to_make))
+        return _merge_bulk_responses(responses, container_key, item_key)
+
+    async def close(self):
+        """Closes the shared connection pool."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+        return False
+
+    async def _request_data(self, endpoint, params):
+        """
+        Internal coroutine handling the actual HTTP request. Mirrors SolarEdgeClient._request_data.
+        """
+        max_retries = DEFAULT_MAX_RETRIES
+        base_retry_delay = DEFAULT_BASE_RETRY_DELAY
+        url = f"{self.base_url}{endpoint}"
+        site_ids = site_ids_from_endpoint(endpoint)
+
+        if self.cache is not None and not self.bypass_cache:
+            cached_data = self.cache.get(endpoint, params)
+            if cached_data is not None:
+                return cached_data # Served locally: no API quota used
+
+        for attempt in range(max_retries):
+            self.check_if_cancelled()
+
+            try:
+                if self.rate_limiter:
+                    await self._acquire_permit(params.get("api_key"), site_ids)
+                try:
+                    async with self._get_session().get(url, params=params) as response:
+                        status_code = response.status
+                        response_body = await response.read()
+                        response_text = response_body.decode(response.get_encoding(), errors="replace")
+                        retry_after_header = response.headers.get('Retry-After')
+                finally:
+                    if self.rate_limiter: self.rate_limiter.release()
+
+                if status_code == 200:
+                    try:
+                        json_data = json.loads(response_text)
+                        if self.cache is not None:
+                            self.cache.put(endpoint, params, response_body)
+                        return json_data
+                    except json.JSONDecodeError as je:
+                        raise Exception(f"API returned invalid JSON (Status 200, URL: {url})\nResponse: {response_text[:200]}...\nError: {je}")
+
+                error_prefix = f"API Error (Status {status_code}, URL: {url})"
+                error_details = _parse_error_details(response_text)
+                full_error_message = f"{error_prefix}: {error_details}"
+
+                if status_code == 429: # Rate limiting
+                    retry_after = int(retry_after_header or base_retry_delay * (attempt + 1))
+                    if self.rate_limiter: self.rate_limiter.note_rate_limited(retry_after)
+                    if self.status_update_callback:
+                        self.status_update_callback(f"Rate limit. Retrying in {retry_after}s (Attempt {attempt+1}/{max_retries})")
+                    await self._wait(retry_after)
+                    continue
+                elif status_code in [400, 401, 403, 404]:
+                    raise _client_error_exception(status_code, endpoint, params, full_error_message, error_details)
+                else: # Server-side errors or other unexpected issues
+                    if attempt < max_retries - 1:
+                        wait_time = base_retry_delay * (attempt + 1)
+                        if self.status_update_callback:
+                            self.status_update_callback(f"{full_error_message}. Retrying in {wait_time}s (Attempt {attempt+1}/{max_retries})")
+                        await self._wait(wait_time)
+                        continue
+                    else: # Last attempt failed
+                        raise Exception(full_error_message)
+
+            except asyncio.TimeoutError:
+                if attempt < max_retries - 1:
+                    wait_time = base_retry_delay * (attempt + 1)
+                    if self.status_update_callback:
+                        self.status_update_callback(f"Request timed out for {url}. Retrying in {wait_time}s (Attempt {attempt+1}/{max_retries})")
+                    await self._wait(wait_time)
+                    continue
+                else:
+                    raise Exception(f"Request timed out after {max_retries} attempts for {url}.")
+
+            except aiohttp.ClientError as e_req: # Other connection errors
+                if attempt < max_retries - 1:
+                    wait_time = base_retry_delay * (attempt + 1)
+                    if self.status_update_callback:
+                        self.status_update_callback(f"Connection error for {url}. Retrying in {wait_time}s (Attempt {attempt+1}/{max_retries})")
+                    await self._wait(wait_time)
+                    continue
+                else:
+                    raise Exception(f"Failed to connect to {url} after {max_retries} attempts: {e_req}")
+
+        raise Exception(f"Max retries exceeded for {url} without explicit error handling completion.")
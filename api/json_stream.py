@@ -0,0 +1,83 @@
+import codecs
+import json
+
+_WHITESPACE = " \t\r\n"
+
+
+class JSONArrayNotFoundError(ValueError):
+    """Raised when the streamed document does not contain the requested array."""
+    pass
+
+
+def iter_json_array_items(byte_chunks, array_key):
+    """
+    Incrementally decodes the items of the first JSON array stored under `array_key`
+    (e.g. "telemetries" in an equipment data.json response) from an iterable of byte chunks.
+
+    Only the undecoded tail of the stream is buffered, so memory stays proportional to one item
+    plus one chunk rather than to the whole response. The items are expected to be JSON objects
+    or arrays, which is what SolarEdge returns for telemetry lists.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    key_token = f'"{array_key}"'
+    buffer = ""
+    pos = 0
+    chunks = iter(byte_chunks)
+    exhausted = False
+
+    def read_more():
+        nonlocal buffer, pos, exhausted
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            exhausted = True
+            buffer = buffer[pos:] + text_decoder.decode(b"", final=True)
+            pos = 0
+            return False
+        # Drop what has already been consumed before growing the buffer
+        buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+        return True
+
+    # 1. Find `"array_key"` followed by `:` and `[`
+    while True:
+        key_index = buffer.find(key_token, pos)
+        if key_index != -1:
+            pos = key_index + len(key_token)
+            break
+        # Keep a tail long enough to contain a key split across chunks
+        pos = max(pos, len(buffer) - len(key_token))
+        if not read_more():
+            raise JSONArrayNotFoundError(f"No '{array_key}' array in response.")
+    for expected in (":", "["):
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                break
+            if not read_more():
+                raise JSONArrayNotFoundError(f"Truncated response while looking for '{array_key}'.")
+        if buffer[pos] != expected:
+            raise JSONArrayNotFoundError(f"'{array_key}' is not an array in response.")
+        pos += 1
+
+    # 2. Decode one item at a time
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE + ",":
+            pos += 1
+        if pos >= len(buffer):
+            if not read_more():
+                raise JSONArrayNotFoundError(f"Truncated response inside '{array_key}'.")
+            continue
+        if buffer[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if exhausted:
+                raise
+            read_more() # Item not complete yet
+            continue
+        pos = end
+        yield item
@@ -0,0 +1,263 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from utils.helpers import MAX_CONCURRENT_API_REQUESTS
+
+# SolarEdge API: "Daily limitation: 300 requests per account token and 300 requests per site ID
+# from the same source IP." The daily counters are reset at midnight UTC here.
+DAILY_ACCOUNT_REQUEST_LIMIT = 300
+DAILY_SITE_REQUEST_LIMIT = 300
+DEFAULT_USAGE_FILE = os.path.join(os.path.expanduser("~"), ".solaredge_api_usage.json")
+
+logger = logging.getLogger(__name__)
+
+_SITE_ENDPOINT_RE = re.compile(r"^/(?:site|equipment)/(\d+)(?:/|$)")
+_BULK_SITES_ENDPOINT_RE = re.compile(r"^/sites/(\d+(?:,\d+)*)(?:/|$)")
+
+
+class QuotaExceededError(Exception):
+    """Raised when a request would exceed the daily SolarEdge request budget."""
+    pass
+
+
+def site_ids_from_endpoint(endpoint):
+    """Returns the site IDs a request to `endpoint` is charged against (empty for account-level calls)."""
+    match = _SITE_ENDPOINT_RE.match(endpoint)
+    if match:
+        return [match.group(1)]
+    match = _BULK_SITES_ENDPOINT_RE.match(endpoint)
+    if match:
+        return match.group(1).split(",")
+    return []
+
+
+def _account_key_id(api_key):
+    # Never persist the API key itself
+    return hashlib.sha256(str(api_key).encode("utf-8")).hexdigest()[:16]
+
+
+def _utc_today():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _seconds_until_utc_midnight():
+    now = datetime.now(timezone.utc)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - now).total_seconds()
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, refilled continuously at `rate` tokens per second. Not thread-safe on its own."""
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def wait_time(self):
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+
+class SolarEdgeRateLimiter:
+    """
+    Process-wide limiter for SolarEdge API calls.
+
+    Enforces the documented limits before a request is sent instead of reacting to HTTP 429:
+    a daily budget per account key and per site ID, at most `max_concurrent` calls in flight,
+    and a token bucket that smooths out bursts. Daily usage is persisted to `usage_file`
+    (merged with other processes using the same file) so restarting the app does not reset it.
+
+    Use acquire()/release() or the permit() context manager around each HTTP request;
+    try_acquire() is the non-blocking primitive used by the asyncio client.
+    """
+    def __init__(self, daily_account_limit=DAILY_ACCOUNT_REQUEST_LIMIT, daily_site_limit=DAILY_SITE_REQUEST_LIMIT,
+                 max_concurrent=MAX_CONCURRENT_API_REQUESTS, requests_per_second=10, burst=10,
+                 usage_file=DEFAULT_USAGE_FILE, flush_interval=5.0):
+        self.daily_account_limit = daily_account_limit
+        self.daily_site_limit = daily_site_limit
+        self.max_concurrent = max_concurrent
+        self.usage_file = usage_file
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._bucket = TokenBucket(requests_per_second, burst)
+        self._in_flight = 0
+        self._blocked_until = 0.0 # monotonic time; set after a 429 so every caller backs off together
+
+        self._usage_date = _utc_today()
+        self._account_usage = {}
+        self._site_usage = {}
+        self._unflushed_account = {}
+        self._unflushed_site = {}
+        self._last_flush = time.monotonic()
+        self._load_usage()
+
+    # --- Persistence ---
+
+    def _read_usage_file(self):
+        if not self.usage_file or not os.path.exists(self.usage_file):
+            return {}
+        try:
+            with open(self.usage_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("date") != self._usage_date:
+            return {} # Stale file from a previous day
+        return data
+
+    def _load_usage(self):
+        data = self._read_usage_file()
+        self._account_usage = {k: int(v) for k, v in data.get("accounts", {}).items()}
+        self._site_usage = {k: int(v) for k, v in data.get("sites", {}).items()}
+
+    def _roll_over_day_if_needed(self):
+        today = _utc_today()
+        if today != self._usage_date:
+            self._usage_date = today
+            self._account_usage, self._site_usage = {}, {}
+            self._unflushed_account, self._unflushed_site = {}, {}
+
+    def flush(self):
+        """Writes this process's unflushed usage to the usage file, merging with what other processes recorded."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self.usage_file or (not self._unflushed_account and not self._unflushed_site):
+            return
+        data = self._read_usage_file()
+        accounts = {k: int(v) for k, v in data.get("accounts", {}).items()}
+        sites = {k: int(v) for k, v in data.get("sites", {}).items()}
+        for k, v in self._unflushed_account.items(): accounts[k] = accounts.get(k, 0) + v
+        for k, v in self._unflushed_site.items(): sites[k] = sites.get(k, 0) + v
+        try:
+            tmp_path = f"{self.usage_file}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"date": self._usage_date, "accounts": accounts, "sites": sites}, f)
+            os.replace(tmp_path, self.usage_file)
+        except OSError as e:
+            logger.warning("Could not persist API usage to %s: %s", self.usage_file, e)
+            return
+        self._unflushed_account, self._unflushed_site = {}, {}
+        # Pick up requests made by other processes in the meantime
+        self._account_usage = {k: max(v, self._account_usage.get(k, 0)) for k, v in accounts.items()}
+        self._site_usage = {k: max(v, self._site_usage.get(k, 0)) for k, v in sites.items()}
+
+    # --- Permits ---
+
+    def try_acquire(self, api_key, site_ids=()):
+        """
+        Attempts to take a permit without blocking.
+        Returns 0 if the permit was granted, otherwise the number of seconds to wait before retrying.
+        Raises QuotaExceededError if the daily budget for the account or one of the sites is used up.
+        """
+        account_id = _account_key_id(api_key)
+        site_ids = [str(s) for s in site_ids]
+        with self._lock:
+            self._roll_over_day_if_needed()
+            if self._account_usage.get(account_id, 0) >= self.daily_account_limit:
+                raise QuotaExceededError(
+                    f"Daily SolarEdge API quota of {self.daily_account_limit} requests for this API key is used up. "
+                    f"It resets in {_seconds_until_utc_midnight() / 3600:.1f} hours.")
+            for site_id in site_ids:
+                if self._site_usage.get(site_id, 0) >= self.daily_site_limit:
+                    raise QuotaExceededError(
+                        f"Daily SolarEdge API quota of {self.daily_site_limit} requests for site {site_id} is used up. "
+                        f"It resets in {_seconds_until_utc_midnight() / 3600:.1f} hours.")
+
+            blocked_for = self._blocked_until - time.monotonic()
+            if blocked_for > 0:
+                return blocked_for
+            if self._in_flight >= self.max_concurrent:
+                return 0.05 # Woken up by release() polling; concurrent slots free up quickly
+            bucket_wait = self._bucket.wait_time()
+            if bucket_wait > 0:
+                return bucket_wait
+
+            self._bucket.take()
+            self._in_flight += 1
+            self._account_usage[account_id] = self._account_usage.get(account_id, 0) + 1
+            self._unflushed_account[account_id] = self._unflushed_account.get(account_id, 0) + 1
+            for site_id in site_ids:
+                self._site_usage[site_id] = self._site_usage.get(site_id, 0) + 1
+                self._unflushed_site[site_id] = self._unflushed_site.get(site_id, 0) + 1
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+            return 0.0
+
+    def acquire(self, api_key, site_ids=(), check_if_cancelled_callback=None):
+        """Blocks until a permit is granted. The callback is polled while waiting and may raise OperationCancelledError."""
+        while True:
+            if check_if_cancelled_callback:
+                check_if_cancelled_callback()
+            wait = self.try_acquire(api_key, site_ids)
+            if wait <= 0:
+                return
+            time.sleep(min(wait, 0.25))
+
+    def release(self):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+
+    @contextmanager
+    def permit(self, api_key, site_ids=(), check_if_cancelled_callback=None):
+        self.acquire(api_key, site_ids, check_if_cancelled_callback)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def note_rate_limited(self, retry_after_seconds):
+        """Called after an HTTP 429 so that every caller, not just the one that hit it, waits out Retry-After."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after_seconds)
+
+    # --- Reporting ---
+
+    def remaining_quota(self, api_key, site_id=None):
+        """
+        Returns the requests left today: {"account": n} plus {"site": n} when site_id is given.
+        """
+        with self._lock:
+            self._roll_over_day_if_needed()
+            remaining = {"account": max(0, self.daily_account_limit - self._account_usage.get(_account_key_id(api_key), 0))}
+            if site_id is not None:
+                remaining["site"] = max(0, self.daily_site_limit - self._site_usage.get(str(site_id), 0))
+            return remaining
+
+
+_shared_rate_limiter = None
+_shared_rate_limiter_lock = threading.Lock()
+
+
+def get_shared_rate_limiter():
+    """Returns the process-wide limiter shared by every client instance and thread."""
+    global _shared_rate_limiter
+    with _shared_rate_limiter_lock:
+        if _shared_rate_limiter is None:
+            _shared_rate_limiter = SolarEdgeRateLimiter()
+            atexit.register(_shared_rate_limiter.flush)
+        return _shared_rate_limiter
@@ -0,0 +1,170 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from api.rate_limiter import _account_key_id, site_ids_from_endpoint
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".solaredge_response_cache.sqlite")
+DEFAULT_MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# TTLs in seconds. None means "never expires", 0 means "do not cache".
+CURRENT_POWER_FLOW_TTL = 15
+OVERVIEW_TTL = 5 * 60
+INVENTORY_TTL = 60 * 60
+SITES_LIST_TTL = 10 * 60
+RECENT_HISTORY_TTL = 5 * 60 # energyDetails / equipment data whose range is still within the last day
+IMMUTABLE_AFTER = timedelta(days=1)
+
+_HISTORICAL_ENDPOINT_RE = re.compile(r"/(energyDetails\.json|data\.json)$")
+
+
+def _parse_api_time(time_str):
+    try:
+        return datetime.strptime(str(time_str), "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def ttl_for_request(endpoint, params, now=None):
+    """
+    Returns how long a successful response for this request may be reused.
+    Historical energyDetails / equipment data chunks whose end time is more than a day in the
+    past never change, so they are cached forever (None).
+    """
+    now = now or datetime.now()
+    if _HISTORICAL_ENDPOINT_RE.search(endpoint):
+        end_time = _parse_api_time(params.get("endTime"))
+        if end_time is not None and end_time < now - IMMUTABLE_AFTER:
+            return None
+        return RECENT_HISTORY_TTL
+    if endpoint.endswith("/currentPowerFlow.json"):
+        return CURRENT_POWER_FLOW_TTL
+    if endpoint.endswith("/overview.json") or endpoint.endswith("/overview"):
+        return OVERVIEW_TTL
+    if endpoint.endswith("/inventory.json"):
+        return INVENTORY_TTL
+    if endpoint == "/sites/list":
+        return SITES_LIST_TTL
+    return 0
+
+
+def cache_key_for_request(endpoint, params):
+    """
+    Endpoint plus normalised (sorted, stringified) params with the api_key removed.
+    Account-level endpoints such as /sites/list depend on which account is asking,
+    so those keys include a hash of the API key instead.
+    """
+    normalised = sorted((str(k), str(v)) for k, v in params.items() if k != "api_key")
+    if not site_ids_from_endpoint(endpoint) and "api_key" in params:
+        normalised.append(("account", _account_key_id(params["api_key"])))
+    return endpoint + "?" + "&".join(f"{k}={v}" for k, v in normalised)
+
+
+class ResponseCache:
+    """
+    Persistent, size-bounded LRU cache for SolarEdge API responses, stored in a SQLite file.
+
+    Entries expire according to ttl_for_request(); when the total stored size exceeds
+    `max_bytes`, the least recently used entries are evicted. Thread-safe.
+    """
+    def __init__(self, cache_file=DEFAULT_CACHE_FILE, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.cache_file = cache_file
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, endpoint, params):
+        """Returns the decoded JSON for a cached, unexpired response, or None."""
+        key = cache_key_for_request(endpoint, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT body, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def contains(self, endpoint, params):
+        """True if an unexpired response is cached. Unlike get(), does not decode it or count as a hit."""
+        key = cache_key_for_request(endpoint, params)
+        with self._lock:
+            row = self._conn.execute("SELECT expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        return row is not None and (row[0] is None or row[0] > time.time())
+
+    def put(self, endpoint, params, body_bytes):
+        """Stores the raw JSON body of a successful response, if its endpoint is cacheable."""
+        ttl = ttl_for_request(endpoint, params)
+        if ttl == 0:
+            return
+        key = cache_key_for_request(endpoint, params)
+        now = time.time()
+        compressed = zlib.compress(body_bytes)
+        expires_at = None if ttl is None else now + ttl
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, compressed, len(compressed), expires_at, now))
+            self._total_bytes += len(compressed) - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict_locked()
+
+    def _evict_locked(self):
+        # Drop expired entries first, then least recently used ones until 90% of the budget is free
+        target = int(self.max_bytes * 0.9)
+        now = time.time()
+        self._conn.execute("BEGIN")
+        try:
+            expired = self._conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)).rowcount
+            self.evictions += max(0, expired)
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if self._total_bytes > target:
+                to_delete = []
+                for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+                    if self._total_bytes <= target:
+                        break
+                    to_delete.append((key,))
+                    self._total_bytes -= size
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+                self.evictions += len(to_delete)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._total_bytes = 0
+
+    def stats(self):
+        """Returns {"hits", "misses", "evictions", "entries", "bytes"}."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": entries, "bytes": self._total_bytes}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
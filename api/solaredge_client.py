@@ -1,5 +1,7 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import threading
 import time
 
 # Custom exception for cancellation, can be shared or defined here if not already accessible
@@ -7,70 +9,422 @@ import time
 # If SolarEdgeClient is to be truly independent, it should define its own or expect a generic one.
 # Using the centralized one from utils.helpers
 from utils.helpers import OperationCancelledError
+from api.rate_limiter import get_shared_rate_limiter, site_ids_from_endpoint
+from api.json_stream import iter_json_array_items, JSONArrayNotFoundError
 
-class SolarEdgeClient:
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BASE_RETRY_DELAY = 5 # seconds
+
+
+def _parse_error_details(response_text):
+    """
+    Extracts a human-readable message from a SolarEdge error response body.
+    The API is inconsistent here: the message may be top-level, under "String" or under "error".
+    Shared by SolarEdgeClient and AsyncSolarEdgeClient so both map errors identically.
+    """
+    try:
+        json_error = json.loads(response_text)
+        if isinstance(json_error, dict):
+            error_details = json_error.get("message", "")
+            if not error_details and "String" in json_error:
+                string_obj = json_error["String"]
+                if isinstance(string_obj, dict): error_details = string_obj.get("message", "")
+                elif isinstance(string_obj, str): error_details = string_obj
+            if not error_details and "error" in json_error:
+                error_obj = json_error["error"]
+                if isinstance(error_obj, dict): error_details = error_obj.get("message", "")
+                elif isinstance(error_obj, str): error_details = error_obj
+            if not error_details: error_details = str(json_error)
+        elif isinstance(json_error, str): error_details = json_error
+        else: error_details = str(json_error)
+    except json.JSONDecodeError:
+        error_details = f"Non-JSON response: {response_text[:200]}..."
+    except Exception as e_parse:
+        error_details = f"Error parsing error response: {str(e_parse)} - Raw: {response_text[:200]}..."
+    return error_details
+
+
+def _client_error_exception(status_code, endpoint, params, full_error_message, error_details):
+    """Builds the exception raised for non-retryable 4xx responses (400, 401, 403, 404)."""
+    # Specific handling for 403 on alerts
+    if status_code == 403 and "alerts" in endpoint.lower() and ("startTime" in params and "endTime" in params):
+        return Exception(f"Access Denied (403) for alerts.\nThis might be due to date range limits (try <1 month) or API key permissions.\nDetails: {error_details}")
+    return Exception(full_error_message)
+
+
+def _batched(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _tee_chunks(chunks, copy_to=None):
+    """Yields `chunks`, appending each one to the list `copy_to` as well, if one is given."""
+    for chunk in chunks:
+        if copy_to is not None:
+            copy_to.append(chunk)
+        yield chunk
+
+
+class _PooledHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that remembers the urllib3 connection pools it hands out, so the
+    client can report how many requests were served over an already-open connection.
+    """
+    def __init__(self, *args, **kwargs):
+        self._seen_pools = []
+        self._seen_pools_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _remember_pool(self, pool):
+        with self._seen_pools_lock:
+            if not any(p is pool for p in self._seen_pools):
+                self._seen_pools.append(pool)
+        return pool
+
+    def get_connection_with_tls_context(self, *args, **kwargs): # requests >= 2.32
+        return self._remember_pool(super().get_connection_with_tls_context(*args, **kwargs))
+
+    def get_connection(self, *args, **kwargs): # older requests versions
+        return self._remember_pool(super().get_connection(*args, **kwargs))
+
+    def connection_stats(self):
+        with self._seen_pools_lock:
+            pools = list(self._seen_pools)
+        # num_requests / num_connections are maintained by urllib3's HTTPConnectionPool
+        total_requests = sum(getattr(p, "num_requests", 0) for p in pools)
+        total_connections = sum(getattr(p, "num_connections", 0) for p in pools)
+        return total_requests, total_connections
+
+
+# SolarEdge API: multi-site ("bulk") endpoints accept a comma-separated list of up to 100 site IDs.
+MAX_SITES_PER_BULK_REQUEST = 100
+
+
+def _split_site_ids(site_ids, group_size=MAX_SITES_PER_BULK_REQUEST):
+    """Splits site IDs into groups the bulk endpoints accept, dropping duplicates while keeping order."""
+    unique_ids = list(dict.fromkeys(str(s) for s in site_ids))
+    return [unique_ids[i:i + group_size] for i in range(0, len(unique_ids), group_size)]
+
+
+def _merge_bulk_responses(responses, container_key, item_key):
+    """
+    Turns the responses of several bulk calls into {site_id: per-site payload}.
+    Bulk responses look like {container_key: {"count": n, "<list>": [{"siteId": 1, item_key: {...}}, ...]}}.
+    """
+    results = {}
+    for response in responses:
+        container = (response or {}).get(container_key) or {}
+        site_entries = next((v for v in container.values() if isinstance(v, list)), [])
+        for entry in site_entries:
+            if isinstance(entry, dict) and "siteId" in entry:
+                results[entry["siteId"]] = entry.get(item_key)
+    return results
+
+
+class SolarEdgeEndpointsMixin:
+    """
+    The SolarEdge API calls, expressed in terms of `self._request_data(endpoint, params)`.
+    Shared by SolarEdgeClient and AsyncSolarEdgeClient; for the async client `_request_data`
+    is a coroutine function, so each method returns an awaitable.
+
+    The multi-site methods additionally rely on `self._fetch_bulk(requests, container_key, item_key)`,
+    which each client implements (sequentially or concurrently) on top of `_request_data`.
+    """
+
+    SITES_LIST_MAX_PAGE_SIZE = 100 # SolarEdge API: "size: ... maximum 100"
+
+    # --- Specific API Call Methods ---
+
+    def get_sites_list(self, api_key, start_index, size):
+        """Fetches the list of sites. `size` is capped at the API's maximum page size."""
+        endpoint = "/sites/list"
+        params = {
+            "api_key": api_key,
+            "startIndex": start_index,
+            "size": min(size, self.SITES_LIST_MAX_PAGE_SIZE)
+        }
+        return self._request_data(endpoint, params)
+
+    def get_site_overview(self, api_key, site_id):
+        """Fetches overview data for a specific site."""
+        endpoint = f"/site/{site_id}/overview.json"
+        params = {"api_key": api_key}
+        return self._request_data(endpoint, params)
+
+    def get_site_inventory(self, api_key, site_id):
+        """Fetches inventory data for a specific site."""
+        endpoint = f"/site/{site_id}/inventory.json"
+        params = {"api_key": api_key}
+        return self._request_data(endpoint, params)
+
+    def get_site_current_power_flow(self, api_key, site_id):
+        """Fetches current power flow data for a specific site."""
+        endpoint = f"/site/{site_id}/currentPowerFlow.json"
+        params = {"api_key": api_key}
+        return self._request_data(endpoint, params)
+
+    def get_site_alerts(self, api_key, site_id, start_time_str, end_time_str):
+        """Fetches alerts for a specific site within a date range."""
+        endpoint = f"/site/{site_id}/alerts.json"
+        params = {
+            "api_key": api_key,
+            "startTime": start_time_str,
+            "endTime": end_time_str
+        }
+        return self._request_data(endpoint, params)
+
+    def equipment_data_request(self, api_key, site_id, equipment_sn, start_time_str, end_time_str):
+        """(endpoint, params) of get_equipment_data, e.g. to look the request up in the response cache."""
+        # Note: The original code used `/equipment/{site_id}/{isn}/data.json`
+        # Standard SolarEdge might be `/equipment/{site_id}/{equipment_sn}/data` - check API docs
+        # For now, using the structure from the original code.
+        endpoint = f"/equipment/{site_id}/{equipment_sn}/data.json"
+        params = {
+            "api_key": api_key,
+            "startTime": start_time_str,
+            "endTime": end_time_str
+        }
+        return endpoint, params
+
+    def get_equipment_data(self, api_key, site_id, equipment_sn, start_time_str, end_time_str):
+        """Fetches equipment telemetry data (e.g., inverter voltage)."""
+        return self._request_data(*self.equipment_data_request(api_key, site_id, equipment_sn, start_time_str, end_time_str))
+
+    def energy_details_request(self, api_key, site_id, start_time_str, end_time_str, meters_str, time_unit):
+        """(endpoint, params) of get_energy_details, e.g. to look the request up in the response cache."""
+        endpoint = f"/site/{site_id}/energyDetails.json"
+        params = {
+            "api_key": api_key,
+            "startTime": start_time_str,
+            "endTime": end_time_str,
+            "meters": meters_str, # Comma-separated string of meter types
+            "timeUnit": time_unit
+        }
+        return endpoint, params
+
+    def get_energy_details(self, api_key, site_id, start_time_str, end_time_str, meters_str, time_unit):
+        """Fetches detailed energy information for a site."""
+        return self._request_data(*self.energy_details_request(api_key, site_id, start_time_str, end_time_str, meters_str, time_unit))
+
+    # --- Multi-site (bulk) API Call Methods ---
+    # Each returns {site_id: payload}; large fleets are split into groups of MAX_SITES_PER_BULK_REQUEST.
+
+    def _bulk_requests(self, site_ids, path_suffix, params):
+        return [(f"/sites/{','.join(group)}/{path_suffix}", dict(params)) for group in _split_site_ids(site_ids)]
+
+    def get_sites_overview(self, api_key, site_ids):
+        """Fetches overview data for many sites (payload per site as in get_site_overview()["overview"])."""
+        requests_to_make = self._bulk_requests(site_ids, "overview", {"api_key": api_key})
+        return self._fetch_bulk(requests_to_make, "sitesOverviews", "siteOverview")
+
+    def get_sites_energy(self, api_key, site_ids, start_date_str, end_date_str, time_unit):
+        """
+        Fetches site energy for many sites. Dates are "YYYY-MM-DD"; the same period limits as the
+        single-site energy endpoint apply (one year for DAY, one month for QUARTER_OF_AN_HOUR/HOUR).
+        Payload per site: {"measuredBy": ..., "values": [{"date": ..., "value": ...}]}.
+        """
+        params = {"api_key": api_key, "startDate": start_date_str, "endDate": end_date_str, "timeUnit": time_unit}
+        requests_to_make = self._bulk_requests(site_ids, "energy", params)
+        return self._fetch_bulk(requests_to_make, "sitesEnergy", "energyValues")
+
+    def get_sites_power(self, api_key, site_ids, start_time_str, end_time_str):
+        """
+        Fetches 15-minute power values for many sites (period limited to one month).
+        Payload per site: {"measuredBy": ..., "values": [{"date": ..., "value": ...}]}.
+        """
+        params = {"api_key": api_key, "startTime": start_time_str, "endTime": end_time_str}
+        requests_to_make = self._bulk_requests(site_ids, "power", params)
+        return self._fetch_bulk(requests_to_make, "powerDateValuesList", "powerDataValueSeries")
+
+
+class SolarEdgeClient(SolarEdgeEndpointsMixin):
     BASE_URL = "https://monitoringapi.solaredge.com"
+    DEFAULT_POOL_SIZE = 10
+    DEFAULT_CONNECT_TIMEOUT = 10 # seconds
+    DEFAULT_READ_TIMEOUT = 45 # seconds
 
-    def __init__(self, check_if_cancelled_callback=None, status_update_callback=None):
+    def __init__(self, check_if_cancelled_callback=None, status_update_callback=None,
+                 pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 base_url=None, rate_limiter=None, cache=None):
         """
         Initializes the SolarEdge API client.
         :param check_if_cancelled_callback: A function to call to check if the operation should be cancelled.
         :param status_update_callback: An optional function to call for updating status messages (e.g., for rate limit waits).
+        :param pool_size: Maximum number of keep-alive connections kept open to the API host.
+        :param connect_timeout: Seconds to wait for a TCP/TLS connection to be established.
+        :param read_timeout: Seconds to wait for the server to send a response once connected.
+        :param base_url: Overrides BASE_URL, e.g. to point the client at a local stub server.
+        :param rate_limiter: SolarEdgeRateLimiter to take a permit from before each request. Defaults to the
+                             process-wide shared limiter; pass False to disable client-side rate limiting.
+        :param cache: Optional ResponseCache. Set `bypass_cache = True` to skip cache lookups (fresh responses are still stored).
         """
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.rate_limiter = get_shared_rate_limiter() if rate_limiter is None else rate_limiter
+        self.cache = cache
+        self.bypass_cache = False
         self.check_if_cancelled = check_if_cancelled_callback
         self.status_update_callback = status_update_callback
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+
+        # One adapter (and therefore one urllib3 connection pool) is shared by every thread.
+        # Sessions themselves are not guaranteed thread-safe, so each thread gets its own
+        # lightweight Session mounted on the shared adapter.
+        self._adapter = _PooledHTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self._thread_local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+        self._closed = False
 
-    def _request_data(self, endpoint, params):
+    def _close_streamed_response(self, response):
+        response.close()
+        if self.rate_limiter: self.rate_limiter.release()
+
+    def iter_equipment_telemetries(self, api_key, site_id, equipment_sn, start_time_str, end_time_str, batch_size=1000):
+        """
+        Streaming variant of get_equipment_data: yields lists of at most `batch_size` telemetry dicts,
+        decoded incrementally from the response body instead of materialising the whole document.
+        Raises api.json_stream.JSONArrayNotFoundError if the response has no data.telemetries array.
+        With a response cache, the raw body is also kept (as bytes, not decoded objects) and cached once it
+        has been read to the end, so a later export of the same range is answered from the cache.
+        """
+        endpoint, params = self.equipment_data_request(api_key, site_id, equipment_sn, start_time_str, end_time_str)
+        if self.cache is not None and not self.bypass_cache:
+            cached_data = self.cache.get(endpoint, params)
+            if cached_data is not None:
+                telemetries = (cached_data.get("data") or {}).get("telemetries") if isinstance(cached_data, dict) else None
+                if not isinstance(telemetries, list):
+                    raise JSONArrayNotFoundError("No 'telemetries' array in response.")
+                yield from _batched(telemetries, batch_size)
+                return
+
+        response = self._request_data(endpoint, params, stream=True)
+        try:
+            body_chunks = [] if self.cache is not None else None
+            byte_chunks = _tee_chunks(response.iter_content(chunk_size=64 * 1024), body_chunks)
+            telemetries = iter_json_array_items(byte_chunks, "telemetries")
+            for batch in _batched(telemetries, batch_size):
+                if self.check_if_cancelled: self.check_if_cancelled()
+                yield batch
+            if body_chunks is not None:
+                for _ in byte_chunks: pass # The rest of the document after the array
+                self.cache.put(endpoint, params, b"".join(body_chunks))
+        except requests.exceptions.RequestException as e_req:
+            raise Exception(f"Connection lost while streaming {self.base_url}{endpoint}: {e_req}")
+        finally:
+            self._close_streamed_response(response)
+
+    def _fetch_bulk(self, requests_to_make, container_key, item_key):
+        # Groups go out one after another; each one already covers up to 100 sites
+        return _merge_bulk_responses([self._request_data(e, p) for e, p in requests_to_make], container_key, item_key)
+
+    def _get_session(self):
+        if self._closed:
+            raise RuntimeError("SolarEdgeClient has been closed.")
+        session = getattr(self._thread_local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            self._thread_local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def is_cached(self, endpoint, params):
+        """True if this request would be answered from the response cache, without using API quota."""
+        return self.cache is not None and not self.bypass_cache and self.cache.contains(endpoint, params)
+
+    def get_connection_stats(self):
+        """
+        Returns connection reuse counters for the shared pool:
+        {"requests": ..., "connections_opened": ..., "connections_reused": ...}
+        """
+        total_requests, total_connections = self._adapter.connection_stats()
+        return {
+            "requests": total_requests,
+            "connections_opened": total_connections,
+            "connections_reused": max(0, total_requests - total_connections),
+        }
+
+    def close(self):
+        """Closes all pooled connections. The client cannot be used afterwards."""
+        if self._closed:
+            return
+        self._closed = True
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._adapter.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _request_data(self, endpoint, params, stream=False):
         """
         Internal method to handle the actual HTTP request.
         This is what fetch_api_data will become, more or less.
+        With stream=True a successful (200) response is returned unread, still holding its
+        rate-limiter permit; the caller must consume it and pass it to _close_streamed_response().
         """
-        max_retries = 3
-        base_retry_delay = 5  # seconds
+        max_retries = DEFAULT_MAX_RETRIES
+        base_retry_delay = DEFAULT_BASE_RETRY_DELAY
+        site_ids = site_ids_from_endpoint(endpoint)
+
+        if self.cache is not None and not self.bypass_cache and not stream:
+            cached_data = self.cache.get(endpoint, params)
+            if cached_data is not None:
+                return cached_data # Served locally: no API quota used
 
         for attempt in range(max_retries):
             if self.check_if_cancelled:
                 self.check_if_cancelled() # Will raise OperationCancelledError if cancelled
 
             try:
-                # print(f"Debug: Client making API request to {self.BASE_URL}{endpoint} (attempt {attempt+1}/{max_retries})")
+                # print(f"Debug: Client making API request to {self.base_url}{endpoint} (attempt {attempt+1}/{max_retries})")
                 # print(f"Debug: Client params: {params}")
-                response = requests.get(f"{self.BASE_URL}{endpoint}", params=params, timeout=45)
+                if self.rate_limiter:
+                    # Waits for a permit (daily budget, concurrency, burst) instead of tripping a 429
+                    self.rate_limiter.acquire(params.get("api_key"), site_ids, self.check_if_cancelled)
+                try:
+                    response = self._get_session().get(f"{self.base_url}{endpoint}", params=params, timeout=self.timeout, stream=stream)
+                except BaseException:
+                    if self.rate_limiter: self.rate_limiter.release()
+                    raise
+                if stream and response.status_code == 200:
+                    return response # Permit is released by _close_streamed_response()
+                if self.rate_limiter: self.rate_limiter.release()
                 # print(f"Debug: Client response status: {response.status_code}")
 
                 if response.status_code == 200:
                     try:
                         json_data = response.json()
+                        if self.cache is not None:
+                            self.cache.put(endpoint, params, response.content)
                         return json_data
                     except json.JSONDecodeError as je:
-                        raise Exception(f"API returned invalid JSON (Status 200, URL: {self.BASE_URL}{endpoint})\nResponse: {response.text[:200]}...\nError: {je}")
+                        raise Exception(f"API returned invalid JSON (Status 200, URL: {self.base_url}{endpoint})\nResponse: {response.text[:200]}...\nError: {je}")
 
-                error_prefix = f"API Error (Status {response.status_code}, URL: {self.BASE_URL}{endpoint})"
-                error_details = ""
-                try:
-                    json_error = response.json()
-                    if isinstance(json_error, dict):
-                        error_details = json_error.get("message", "")
-                        if not error_details and "String" in json_error:
-                            string_obj = json_error["String"]
-                            if isinstance(string_obj, dict): error_details = string_obj.get("message", "")
-                            elif isinstance(string_obj, str): error_details = string_obj
-                        if not error_details and "error" in json_error:
-                            error_obj = json_error["error"]
-                            if isinstance(error_obj, dict): error_details = error_obj.get("message", "")
-                            elif isinstance(error_obj, str): error_details = error_obj
-                        if not error_details: error_details = str(json_error)
-                    elif isinstance(json_error, str): error_details = json_error
-                    else: error_details = str(json_error)
-                except json.JSONDecodeError:
-                    error_details = f"Non-JSON response: {response.text[:200]}..."
-                except Exception as e_parse:
-                    error_details = f"Error parsing error response: {str(e_parse)} - Raw: {response.text[:200]}..."
+                error_prefix = f"API Error (Status {response.status_code}, URL: {self.base_url}{endpoint})"
+                error_details = _parse_error_details(response.text)
 
                 full_error_message = f"{error_prefix}: {error_details}"
 
                 if response.status_code == 429: # Rate limiting
                     retry_after = int(response.headers.get('Retry-After', base_retry_delay * (attempt + 1)))
+                    if self.rate_limiter: self.rate_limiter.note_rate_limited(retry_after)
                     if self.status_update_callback:
                         self.status_update_callback(f"Rate limit. Retrying in {retry_after}s (Attempt {attempt+1}/{max_retries})")
 
@@ -79,10 +433,7 @@ class SolarEdgeClient:
                         time.sleep(1)
                     continue
                 elif response.status_code in [400, 401, 403, 404]:
-                    # Specific handling for 403 on alerts
-                    if response.status_code == 403 and "alerts" in endpoint.lower() and ("startTime" in params and "endTime" in params):
-                         raise Exception(f"Access Denied (403) for alerts.\nThis might be due to date range limits (try <1 month) or API key permissions.\nDetails: {error_details}")
-                    raise Exception(full_error_message)
+                    raise _client_error_exception(response.status_code, endpoint, params, full_error_message, error_details)
                 else: # Server-side errors or other unexpected issues
                     if attempt < max_retries - 1:
                         wait_time = base_retry_delay * (attempt + 1)
@@ -99,89 +450,24 @@ class SolarEdgeClient:
                 if attempt < max_retries - 1:
                     wait_time = base_retry_delay * (attempt + 1)
                     if self.status_update_callback:
-                        self.status_update_callback(f"Request timed out for {self.BASE_URL}{endpoint}. Retrying in {wait_time}s (Attempt {attempt+1}/{max_retries})")
+                        self.status_update_callback(f"Request timed out for {self.base_url}{endpoint}. Retrying in {wait_time}s (Attempt {attempt+1}/{max_retries})")
                     for _ in range(wait_time):
                         if self.check_if_cancelled: self.check_if_cancelled()
                         time.sleep(1)
                     continue
                 else:
-                    raise Exception(f"Request timed out after {max_retries} attempts for {self.BASE_URL}{endpoint}.")
+                    raise Exception(f"Request timed out after {max_retries} attempts for {self.base_url}{endpoint}.")
 
             except requests.exceptions.RequestException as e_req: # Other connection errors
                 if attempt < max_retries - 1:
                     wait_time = base_retry_delay * (attempt + 1)
                     if self.status_update_callback:
-                         self.status_update_callback(f"Connection error for {self.BASE_URL}{endpoint}. Retrying in {wait_time}s (Attempt {attempt+1}/{max_retries})")
+                         self.status_update_callback(f"Connection error for {self.base_url}{endpoint}. Retrying in {wait_time}s (Attempt {attempt+1}/{max_retries})")
                     for _ in range(wait_time):
                         if self.check_if_cancelled: self.check_if_cancelled()
                         time.sleep(1)
                     continue
                 else:
-                    raise Exception(f"Failed to connect to {self.BASE_URL}{endpoint} after {max_retries} attempts: {e_req}")
-
-        raise Exception(f"Max retries exceeded for {self.BASE_URL}{endpoint} without explicit error handling completion.")
-
-    # --- Specific API Call Methods ---
-
-    def get_sites_list(self, api_key, start_index, size):
-        """Fetches the list of sites."""
-        endpoint = "/sites/list"
-        params = {
-            "api_key": api_key,
-            "startIndex": start_index,
-            "size": size
-        }
-        return self._request_data(endpoint, params)
-
-    def get_site_overview(self, api_key, site_id):
-        """Fetches overview data for a specific site."""
-        endpoint = f"/site/{site_id}/overview.json"
-        params = {"api_key": api_key}
-        return self._request_data(endpoint, params)
-
-    def get_site_inventory(self, api_key, site_id):
-        """Fetches inventory data for a specific site."""
-        endpoint = f"/site/{site_id}/inventory.json"
-        params = {"api_key": api_key}
-        return self._request_data(endpoint, params)
-
-    def get_site_current_power_flow(self, api_key, site_id):
-        """Fetches current power flow data for a specific site."""
-        endpoint = f"/site/{site_id}/currentPowerFlow.json"
-        params = {"api_key": api_key}
-        return self._request_data(endpoint, params)
+                    raise Exception(f"Failed to connect to {self.base_url}{endpoint} after {max_retries} attempts: {e_req}")
 
-    def get_site_alerts(self, api_key, site_id, start_time_str, end_time_str):
-        """Fetches alerts for a specific site within a date range."""
-        endpoint = f"/site/{site_id}/alerts.json"
-        params = {
-            "api_key": api_key,
-            "startTime": start_time_str,
-            "endTime": end_time_str
-        }
-        return self._request_data(endpoint, params)
-
-    def get_equipment_data(self, api_key, site_id, equipment_sn, start_time_str, end_time_str):
-        """Fetches equipment telemetry data (e.g., inverter voltage)."""
-        # Note: The original code used `/equipment/{site_id}/{isn}/data.json`
-        # Standard SolarEdge might be `/equipment/{site_id}/{equipment_sn}/data` - check API docs
-        # For now, using the structure from the original code.
-        endpoint = f"/equipment/{site_id}/{equipment_sn}/data.json"
-        params = {
-            "api_key": api_key,
-            "startTime": start_time_str,
-            "endTime": end_time_str
-        }
-        return self._request_data(endpoint, params)
-
-    def get_energy_details(self, api_key, site_id, start_time_str, end_time_str, meters_str, time_unit):
-        """Fetches detailed energy information for a site."""
-        endpoint = f"/site/{site_id}/energyDetails.json"
-        params = {
-            "api_key": api_key,
-            "startTime": start_time_str,
-            "endTime": end_time_str,
-            "meters": meters_str, # Comma-separated string of meter types
-            "timeUnit": time_unit
-        }
-        return self._request_data(endpoint, params)
+        raise Exception(f"Max retries exceeded for {self.base_url}{endpoint} without explicit error handling completion.")
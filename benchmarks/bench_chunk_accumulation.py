@@ -0,0 +1,71 @@
+"""
+Benchmark: data_processor.ChunkAccumulator against the former per-chunk concat/dedupe/sort loop
+of fetch_and_save_data, over a synthetic 200-chunk voltage export (7-day chunks of 5-minute
+telemetry whose edges overlap by one sample, as chunk boundaries do).
+
+    python benchmarks/bench_chunk_accumulation.py [num_chunks]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import data_processor
+
+SAMPLES_PER_CHUNK = 7 * 24 * 12 # 7 days of 5-minute samples
+
+
+def make_chunks(num_chunks):
+    chunks = []
+    start = pd.Timestamp("2020-01-01")
+    for ci in range(num_chunks):
+        # One extra leading sample duplicates the previous chunk's last row
+        first = ci * SAMPLES_PER_CHUNK - (1 if ci else 0)
+        dates = start + pd.to_timedelta(np.arange(first, (ci + 1) * SAMPLES_PER_CHUNK) * 5, unit="min")
+        chunks.append(pd.DataFrame({
+            "date": dates,
+            "totalActivePower": np.random.default_rng(ci).random(len(dates)) * 5000,
+            "dcVoltage": 380.0,
+        }))
+    return chunks
+
+
+def legacy_accumulate(chunks):
+    """The loop ChunkAccumulator replaced: concat, dedupe and sort everything after every chunk."""
+    cdf = None
+    for df in chunks:
+        cdf = pd.concat([cdf, df], ignore_index=True) if cdf is not None else df
+        cdf = cdf.drop_duplicates(subset=['date']).sort_values('date').reset_index(drop=True)
+    return cdf
+
+
+def accumulate(chunks):
+    accumulator = data_processor.ChunkAccumulator()
+    for df in chunks:
+        accumulator.add(df)
+    return accumulator.result()
+
+
+def main():
+    num_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    chunks = make_chunks(num_chunks)
+
+    t0 = time.perf_counter()
+    legacy_df = legacy_accumulate(chunks)
+    legacy_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new_df = accumulate(chunks)
+    new_time = time.perf_counter() - t0
+
+    pd.testing.assert_frame_equal(new_df, legacy_df)
+    print(f"{num_chunks} chunks -> {len(new_df)} rows (outputs identical)")
+    print(f"concat+sort per chunk : {legacy_time * 1000:9.1f} ms")
+    print(f"ChunkAccumulator      : {new_time * 1000:9.1f} ms  ({legacy_time / new_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: the streaming Excel export (file_exporter.ExportWriter) against the former
+DataFrame.to_excel(engine='openpyxl') path, on synthetic 5-minute voltage telemetry.
+Reports wall time and peak Python memory (tracemalloc) for each.
+
+    python benchmarks/bench_excel_export.py [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import file_exporter
+
+CHUNK_ROWS = 7 * 24 * 12 # One 7-day voltage chunk of 5-minute samples
+
+
+def make_frame(rows):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "date": pd.date_range("2023-01-01", periods=rows, freq="5min"),
+        "totalActivePower": rng.random(rows) * 5000,
+        "dcVoltage": 380 + rng.random(rows),
+        "L1Data": rng.random(rows) * 230,
+        "inverterMode": "MPPT",
+    })
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    df = make_frame(rows)
+    chunks = [df.iloc[i:i + CHUNK_ROWS] for i in range(0, rows, CHUNK_ROWS)]
+    out_dir = tempfile.mkdtemp()
+
+    def legacy():
+        df.to_excel(os.path.join(out_dir, "legacy.xlsx"), index=False, engine="openpyxl")
+
+    def streaming():
+        writer = file_exporter.ExportWriter(os.path.join(out_dir, "streaming.xlsx"), "excel")
+        for chunk in chunks:
+            writer.append(chunk)
+        writer.close()
+
+    legacy_time, legacy_peak = measure(legacy)
+    new_time, new_peak = measure(streaming)
+    print(f"{rows} rows x {len(df.columns)} columns")
+    print(f"to_excel(openpyxl) : {legacy_time:7.1f} s  peak {legacy_peak / 2**20:7.1f} MiB")
+    print(f"ExportWriter       : {new_time:7.1f} s  peak {new_peak / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
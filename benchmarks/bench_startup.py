@@ -0,0 +1,79 @@
+"""
+Benchmark: GUI startup. Each measurement runs in a fresh interpreter so nothing is cached in sys.modules.
+
+- import time of SolarEdgeAPI, which now defers pandas, requests and the api/ and utils/ export stack
+  to first use, against importing that stack up front as SolarEdgeAPI used to
+- time to first frame: interpreter start until the main window is mapped and the event loop is idle
+  (needs a display; skipped otherwise)
+
+    python benchmarks/bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_BUDGET_S = 1.0 # Window interactive within this on thin-client terminals
+DEFERRED_MODULES = ("pandas", "numpy", "requests", "pyarrow", "utils.data_processor", "utils.file_exporter", "api.solaredge_client")
+
+IMPORT_SCRIPT = """
+import time, sys
+t0 = time.perf_counter()
+import SolarEdgeAPI
+{extra}
+elapsed = time.perf_counter() - t0
+loaded = [m for m in {deferred!r} if m in sys.modules]
+print(elapsed, ",".join(loaded))
+"""
+
+FIRST_FRAME_SCRIPT = """
+import time
+t0 = time.perf_counter()
+import customtkinter as ctk
+import SolarEdgeAPI
+root = ctk.CTk()
+app = SolarEdgeAPI.SolarEdgeAPIApp(root)
+def mapped(event=None):
+    root.after_idle(lambda: (print(time.perf_counter() - t0), root.destroy()))
+root.bind("<Map>", lambda event: mapped() if event.widget is root else None)
+root.mainloop()
+app.close()
+"""
+
+
+def run_python(script):
+    completed = subprocess.run([sys.executable, "-c", script], cwd=REPO_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed")
+    return completed.stdout.strip().splitlines()[-1]
+
+
+def median_import_time(runs, extra=""):
+    times = []
+    loaded = ""
+    for _ in range(runs):
+        elapsed, loaded = (run_python(IMPORT_SCRIPT.format(extra=extra, deferred=DEFERRED_MODULES)).split(" ") + [""])[:2]
+        times.append(float(elapsed))
+    return statistics.median(times), loaded
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    lazy_time, lazy_loaded = median_import_time(runs)
+    eager_time, _ = median_import_time(runs, extra="import api.solaredge_client, api.response_cache, utils.export_pipeline, utils.segment_store")
+    print(f"median of {runs} fresh interpreters")
+    print(f"import SolarEdgeAPI (lazy)         : {lazy_time * 1000:7.1f} ms  heavy modules loaded: {lazy_loaded or 'none'}")
+    print(f"import incl. export stack (eager)  : {eager_time * 1000:7.1f} ms")
+    try:
+        frame_times = [float(run_python(FIRST_FRAME_SCRIPT)) for _ in range(runs)]
+    except RuntimeError as e:
+        print(f"time to first frame                : skipped ({e})")
+        return
+    first_frame = statistics.median(frame_times)
+    verdict = "within" if first_frame <= STARTUP_BUDGET_S else "OVER"
+    print(f"time to first frame                : {first_frame * 1000:7.1f} ms  ({verdict} the {STARTUP_BUDGET_S:.1f} s budget)")
+
+
+if __name__ == "__main__":
+    main()
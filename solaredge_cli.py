@@ -0,0 +1,261 @@
+"""
+Headless export: the same fetch -> process -> export pipeline as the GUI's "Fetch and Save Export Data",
+driven from the command line. Never imports customtkinter, tkinter or tkcalendar, so it runs from cron
+on servers without a display.
+
+    python solaredge_cli.py --site 123456 --start 2024-01-01 --end 2024-01-31 --time-unit HOUR \\
+        --meters PRODUCTION,CONSUMPTION --format parquet --output /srv/exports
+
+    python solaredge_cli.py --fleet "Berlin,Hamburg" --start yesterday --end yesterday --time-unit DAY --combined
+
+The account API key is read from --api-key or the SOLAREDGE_API_KEY environment variable.
+Exit status: 0 when the export was saved (or there was nothing new to append), 1 on errors, no data or
+any fleet site still failing after --retries, 130 when interrupted.
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import requests
+
+from api.solaredge_client import SolarEdgeClient
+from api.response_cache import ResponseCache
+from utils import export_pipeline
+from utils import file_exporter
+from utils import fleet_export
+from utils import helpers
+from utils import request_scheduler
+from utils import sync_state
+from utils.helpers import OperationCancelledError
+from utils.timeseries_store import TimeSeriesStore
+from utils.segment_store import SegmentStore, segments_available
+
+API_KEY_ENV_VAR = "SOLAREDGE_API_KEY"
+DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d")
+
+
+def parse_datetime_arg(value, end_of_day=False):
+    """
+    Parses "YYYY-MM-DD[ HH:MM[:SS]]", "today" or "yesterday". A bare date means 00:00:00,
+    or 23:59:59 with end_of_day, matching the GUI's start/end hour pickers.
+    """
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    relative_days = {"today": today, "yesterday": today - timedelta(days=1)}
+    if value.lower() in relative_days:
+        parsed, date_only = relative_days[value.lower()], True
+    else:
+        for fmt in DATETIME_FORMATS:
+            try:
+                parsed, date_only = datetime.strptime(value, fmt), fmt == "%Y-%m-%d"
+                break
+            except ValueError:
+                continue
+        else:
+            raise argparse.ArgumentTypeError(f"invalid date '{value}' (expected YYYY-MM-DD, 'YYYY-MM-DD HH:MM', today or yesterday)")
+    if date_only and end_of_day:
+        parsed = parsed.replace(hour=23, minute=59, second=59)
+    return parsed
+
+
+def parse_meters_arg(value):
+    meters = [m.strip().upper() for m in value.split(",") if m.strip()]
+    unknown = [m for m in meters if m not in export_pipeline.ENERGY_METERS]
+    if not meters or unknown:
+        raise argparse.ArgumentTypeError(f"invalid meters '{value}' (choose from {','.join(export_pipeline.ENERGY_METERS)})")
+    return meters
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Export SolarEdge energy or inverter telemetry data without the GUI.")
+    parser.add_argument("--api-key", default=os.environ.get(API_KEY_ENV_VAR),
+                        help=f"Account API key (default: ${API_KEY_ENV_VAR})")
+    sites = parser.add_mutually_exclusive_group(required=True)
+    sites.add_argument("--site", help="Site ID")
+    sites.add_argument("--fleet", metavar="FILTER", nargs="?", const="",
+                       help="Export every site of the account, or those matching FILTER: comma-separated site IDs or name parts")
+    parser.add_argument("--data-type", choices=["production", "voltage"], default="production",
+                        help="production = energyDetails per meter, voltage = inverter telemetry (default: production)")
+    parser.add_argument("--meters", type=parse_meters_arg, default=["PRODUCTION"],
+                        help="Comma-separated production meters (default: PRODUCTION)")
+    parser.add_argument("--time-unit", choices=export_pipeline.EXPORT_TIME_UNITS, default="HOUR",
+                        help="Production time unit (default: HOUR)")
+    parser.add_argument("--inverter-serial", help="Inverter serial number (required for --data-type voltage with --site; "
+                                                  "fleet exports cover every inverter in each site's inventory)")
+    parser.add_argument("--start", required=True, type=parse_datetime_arg, help="Start: YYYY-MM-DD[ HH:MM[:SS]], today or yesterday")
+    parser.add_argument("--end", type=lambda v: parse_datetime_arg(v, end_of_day=True),
+                        help="End, inclusive; a bare date means the end of that day (default: now)")
+    parser.add_argument("--format", choices=file_exporter.EXPORT_FORMATS, default="csv", help="Output format (default: csv)")
+    parser.add_argument("--output", default=os.getcwd(), help="Output folder (default: current directory)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only fetch data newer than the last incremental run and append it to that run's file")
+    parser.add_argument("--store", action="store_true",
+                        help="Keep fetched data in the local time-series store and only fetch what it is missing")
+    parser.add_argument("--derive-time-units", action="store_true",
+                        help="Production: fetch HOUR data once and also save DAY/WEEK/MONTH files computed from it")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="Parquet/Feather: add the export to the month-partitioned SolarEdge_dataset folder")
+    parser.add_argument("--excel-sheet-per-month", action="store_true", help="Excel: one sheet per month")
+    parser.add_argument("--compact", action="store_true", help="Store values as float32/categoricals to save memory")
+    parser.add_argument("--sequential", action="store_true", help="Fetch export chunks one at a time (fleet: per site)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not reuse cached API responses")
+    parser.add_argument("--combined", action="store_true", help="Fleet: one file for all sites, with a site_id column")
+    parser.add_argument("--retries", type=int, default=1, help="Fleet: times to retry failed sites (default: 1)")
+    parser.add_argument("--max-sites", type=int, default=helpers.MAX_CONCURRENT_API_REQUESTS,
+                        help=f"Fleet: sites exported concurrently (default: {helpers.MAX_CONCURRENT_API_REQUESTS})")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print the API calls the export would make and their estimated cost, without fetching anything")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("--quiet", action="store_true", help="Do not print status messages, only warnings and errors")
+    verbosity.add_argument("--verbose", action="store_true", help="Also print debug messages, such as every planned API call")
+    return parser
+
+
+def run_fleet(args, api_client, scheduler, end_dt, export_options, log):
+    """Exports every site matching --fleet, retrying failed sites --retries times. Returns the exit status."""
+    sites = fleet_export.filter_sites(
+        fleet_export.list_sites(api_client, args.api_key, export_options["check_if_cancelled_callback"]), args.fleet)
+    if not sites:
+        print("No sites match the fleet filter.", file=sys.stderr)
+        return 1
+    fleet_options = dict(export_options)
+    file_format = fleet_options.pop("file_format")
+    fleet = fleet_export.FleetExport(api_client, args.api_key, sites, args.data_type, args.start, end_dt, args.output,
+                                     file_format=file_format, combined=args.combined, max_sites=args.max_sites,
+                                     scheduler=scheduler, status_callback=log, **fleet_options)
+    try:
+        fleet.run()
+        for attempt in range(args.retries):
+            if not fleet.failed_site_ids():
+                break
+            log(f"Retrying {len(fleet.failed_site_ids())} failed site(s) (retry {attempt + 1}/{args.retries})...")
+            fleet.retry_failed()
+    except BaseException:
+        fleet.abort()
+        raise
+    combined_fp, combined_message = fleet.close()
+    report_fp = fleet.write_report()
+    for row in fleet.report_rows():
+        print("\t".join(str(value) for value in row))
+    if combined_fp:
+        print(f"Combined: {combined_fp}")
+    elif args.combined and combined_message:
+        print(f"Combined file not written: {combined_message}", file=sys.stderr)
+    print(f"Report: {report_fp}")
+    failed = fleet.failed_site_ids()
+    if failed:
+        print(f"{len(failed)} of {len(fleet.results)} sites failed: {','.join(failed)}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.api_key:
+        parser.error(f"an account API key is required (--api-key or ${API_KEY_ENV_VAR})")
+    if args.data_type == "voltage" and args.site and not args.inverter_serial:
+        parser.error("--inverter-serial is required for --data-type voltage")
+    if args.dry_run and args.fleet is not None:
+        parser.error("--dry-run is only available with --site")
+    if args.combined and args.fleet is None:
+        parser.error("--combined requires --fleet")
+    if args.combined and (args.incremental or args.derive_time_units or args.partitioned):
+        parser.error("--combined cannot be used with --incremental, --derive-time-units or --partitioned")
+    end_dt = args.end or datetime.now().replace(microsecond=0)
+    if args.start > end_dt:
+        parser.error("--start cannot be after --end")
+    if not os.path.isdir(args.output):
+        parser.error(f"output folder '{args.output}' is not a directory")
+
+    # SIGTERM (e.g. a cron job being stopped) cancels the export cleanly, like the GUI's Cancel button
+    cancelled = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: cancelled.set())
+
+    def check_if_cancelled():
+        if cancelled.is_set():
+            raise OperationCancelledError("Terminated")
+
+    def log(message):
+        if not args.quiet:
+            print(message, file=sys.stderr)
+
+    # Library messages go to stderr like the status messages, so stdout only carries the results
+    logging.basicConfig(stream=sys.stderr, format="%(message)s")
+    for package in ("api", "utils"):
+        logging.getLogger(package).setLevel(logging.WARNING if args.quiet else logging.DEBUG if args.verbose else logging.INFO)
+
+    try:
+        response_cache = ResponseCache()
+    except Exception as e:
+        log(f"Warning: Response cache unavailable, continuing without it: {e}")
+        response_cache = None
+    timeseries_store = segment_store = None
+    if args.store:
+        timeseries_store = TimeSeriesStore()
+        segment_store = SegmentStore(timeseries_store=timeseries_store) if segments_available() else None
+    api_client = SolarEdgeClient(check_if_cancelled_callback=check_if_cancelled, status_update_callback=log, cache=response_cache)
+    api_client.bypass_cache = args.no_cache
+    # One queue for every site's requests; --sequential fetches each site's chunks one at a time instead
+    scheduler = None if args.sequential else request_scheduler.RequestScheduler(rate_limiter=api_client.rate_limiter)
+
+    export_options = dict(
+        file_format=args.format, time_unit=args.time_unit, meters=args.meters,
+        compact=args.compact, partitioned=args.partitioned, excel_sheet_per_month=args.excel_sheet_per_month,
+        derive_time_units=args.derive_time_units, incremental=args.incremental,
+        sync_state_store=sync_state.SyncStateStore() if args.incremental else None,
+        timeseries_store=timeseries_store, segment_store=segment_store,
+        check_if_cancelled_callback=check_if_cancelled
+    )
+    exit_code = 1
+    try:
+        if args.dry_run:
+            plan = export_pipeline.plan_export(api_client, args.api_key, args.site, args.data_type, args.start, end_dt,
+                                               equipment_sn=args.inverter_serial, **export_options)
+            for call in plan.calls:
+                print(f"{call.start}\t{call.end}\t{'cached' if call.cached else 'api'}")
+            print(f"Planned: {plan.summary()}")
+            exit_code = 0
+        elif args.fleet is not None:
+            exit_code = run_fleet(args, api_client, scheduler, end_dt, export_options, log)
+        else:
+            result = export_pipeline.run_export(
+                api_client, args.api_key, args.site, args.data_type, args.start, end_dt, args.output,
+                equipment_sn=args.inverter_serial,
+                max_workers=1, scheduler=scheduler, status_callback=log,
+                warning_callback=lambda title, message: print(f"Warning: {title}: {message}", file=sys.stderr),
+                **export_options
+            )
+            if result["message"] and result["status"] == "saved":
+                print(f"Note: {result['message']}", file=sys.stderr)
+            print(export_pipeline.summarize_export(result))
+            for derived_fp in result["derived_files"]:
+                print(f"Derived: {derived_fp}")
+            exit_code = 0 if result["status"] in ("saved", "up_to_date", "no_new_data") else 1
+    except OperationCancelledError:
+        print("Export cancelled.", file=sys.stderr)
+        exit_code = 130
+    except KeyboardInterrupt:
+        print("Export interrupted.", file=sys.stderr)
+        exit_code = 130
+    except requests.exceptions.RequestException as e:
+        print(f"API error: {e}", file=sys.stderr)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+    finally:
+        if scheduler is not None:
+            scheduler.close()
+        api_client.close()
+        if response_cache is not None:
+            response_cache.close()
+        if timeseries_store is not None:
+            timeseries_store.close()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
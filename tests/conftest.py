@@ -0,0 +1,66 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class StubSolarEdgeServer:
+    """
+    Local HTTP server standing in for the SolarEdge API. `routes` maps a path to a list of responses
+    (status, body, headers) served in turn, the last one repeating; body may be a dict (sent as JSON),
+    str or bytes. Every request is recorded in `requests` as (path, query params).
+    """
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Keep-alive, like the real API
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                stub.requests.append((url.path, {k: v[0] for k, v in parse_qs(url.query).items()}))
+                responses = stub.routes.get(url.path) or [(404, {"String": f"No stub for {url.path}"}, {})]
+                status, body, headers = responses.pop(0) if len(responses) > 1 else responses[0]
+                if isinstance(body, dict):
+                    body = json.dumps(body)
+                if isinstance(body, str):
+                    body = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+
+    def add(self, path, *responses):
+        """Serves `responses`, each (status, body) or (status, body, headers), for GET requests to `path`."""
+        self.routes[path] = [r if len(r) == 3 else (r[0], r[1], {}) for r in responses]
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    server = StubSolarEdgeServer()
+    yield server
+    server.close()
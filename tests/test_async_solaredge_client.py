@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import api.async_solaredge_client as async_solaredge_client
+from api.async_solaredge_client import AsyncSolarEdgeClient
+from api.solaredge_client import DEFAULT_MAX_RETRIES
+from utils.helpers import OperationCancelledError
+
+API_KEY = "test-key"
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(async_solaredge_client, "DEFAULT_BASE_RETRY_DELAY", 0)
+
+
+def run(stub_server, call, **client_kwargs):
+    """Runs `call(client)` on a fresh AsyncSolarEdgeClient pointed at the stub server."""
+    async def main():
+        async with AsyncSolarEdgeClient(base_url=stub_server.url, rate_limiter=False, **client_kwargs) as client:
+            return await call(client)
+    return asyncio.run(main())
+
+
+def test_returns_decoded_json(stub_server):
+    stub_server.add("/site/1/overview.json", (200, {"overview": {"lifeTimeData": {"energy": 42}}}))
+
+    assert run(stub_server, lambda c: c.get_site_overview(API_KEY, 1)) == {"overview": {"lifeTimeData": {"energy": 42}}}
+    assert stub_server.requests == [("/site/1/overview.json", {"api_key": API_KEY})]
+
+
+def test_gathers_many_sites_on_one_pool(stub_server):
+    for site_id in range(1, 6):
+        stub_server.add(f"/site/{site_id}/overview.json", (200, {"overview": {"site": site_id}}))
+
+    async def call(client):
+        return await asyncio.gather(*(client.get_site_overview(API_KEY, s) for s in range(1, 6)))
+
+    assert [r["overview"]["site"] for r in run(stub_server, call)] == [1, 2, 3, 4, 5]
+
+
+def test_sites_list_page_size_is_capped(stub_server):
+    stub_server.add("/sites/list", (200, {"sites": {"count": 0, "site": []}}))
+
+    run(stub_server, lambda c: c.get_sites_list(API_KEY, 0, 500))
+    assert stub_server.requests == [("/sites/list", {"api_key": API_KEY, "startIndex": "0", "size": "100"})]
+    assert AsyncSolarEdgeClient.SITES_LIST_MAX_PAGE_SIZE == 100
+
+
+def test_maps_errors_like_the_threaded_client(stub_server):
+    stub_server.add("/site/1/overview.json", (404, {"String": "Invalid site ID"}))
+    stub_server.add("/site/1/alerts.json", (403, {"String": "Forbidden"}))
+
+    with pytest.raises(Exception, match=r"API Error \(Status 404.*Invalid site ID"):
+        run(stub_server, lambda c: c.get_site_overview(API_KEY, 1))
+    with pytest.raises(Exception, match=r"Access Denied \(403\) for alerts"):
+        run(stub_server, lambda c: c.get_site_alerts(API_KEY, 1, "2024-01-01 00:00:00", "2024-03-01 00:00:00"))
+
+
+def test_retries_server_errors_and_rate_limits(stub_server):
+    stub_server.add("/site/1/overview.json",
+                    (502, {"String": "Bad gateway"}), (429, {}, {"Retry-After": "0"}), (200, {"overview": {}}))
+    statuses = []
+
+    assert run(stub_server, lambda c: c.get_site_overview(API_KEY, 1), status_update_callback=statuses.append) == {"overview": {}}
+    assert len(stub_server.requests) == 3
+    assert statuses[0].startswith("API Error (Status 502")
+    assert statuses[1].startswith("Rate limit.")
+
+
+def test_gives_up_after_the_last_retry(stub_server):
+    stub_server.add("/site/1/overview.json", (500, {"String": "Internal error"}))
+
+    with pytest.raises(Exception, match=r"API Error \(Status 500.*Internal error"):
+        run(stub_server, lambda c: c.get_site_overview(API_KEY, 1))
+    assert len(stub_server.requests) == DEFAULT_MAX_RETRIES
+
+
+def test_bulk_requests_are_merged_per_site(stub_server):
+    stub_server.add("/sites/1,2/overview", (200, {"sitesOverviews": {"count": 2, "siteEnergyList": [
+        {"siteId": 1, "siteOverview": {"energy": 1}}, {"siteId": 2, "siteOverview": {"energy": 2}}]}}))
+
+    assert run(stub_server, lambda c: c.get_sites_overview(API_KEY, [1, 2, 1])) == {1: {"energy": 1}, 2: {"energy": 2}}
+
+
+def test_cancel_stops_further_requests(stub_server):
+    stub_server.add("/site/1/overview.json", (200, {"overview": {}}))
+
+    async def call(client):
+        client.cancel()
+        return await client.get_site_overview(API_KEY, 1)
+
+    with pytest.raises(OperationCancelledError):
+        run(stub_server, call)
+    assert stub_server.requests == []
@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from utils import data_processor
+from utils.data_processor import process_voltage_data, process_voltage_data_stream
+
+
+@pytest.fixture(autouse=True)
+def fresh_schema_cache(monkeypatch):
+    monkeypatch.setattr(data_processor, "_telemetry_schemas", {})
+
+
+def telemetries(hour, count, **phases):
+    return [dict({"date": f"2024-01-01 {hour:02d}:{m:02d}:00"}, **phases) for m in range(count)]
+
+
+def test_nested_fields_are_flattened_into_typed_columns():
+    df = process_voltage_data(telemetries(0, 3, L1Data={"acVoltage": 230.5, "dcVoltage": None}, inverterMode="MPPT"))
+
+    assert list(df.columns) == ["date", "L1Data.acVoltage", "L1Data.dcVoltage", "inverterMode"]
+    assert df["L1Data.acVoltage"].tolist() == [230.5] * 3
+    assert df["date"].dtype.kind == "M"
+
+
+def test_phase_missing_from_the_first_batch_is_flattened_when_it_appears():
+    first = telemetries(0, 60, L1Data={"acVoltage": 230.0})
+    later = telemetries(1, 3, L1Data={"acVoltage": 231.0}, L2Data={"acVoltage": 232.0, "reactivePower": {"value": 1}})
+
+    df = process_voltage_data_stream([first, later], inverter_model="SE5000")
+
+    assert list(df.columns) == ["date", "L1Data.acVoltage", "L2Data.acVoltage", "L2Data.reactivePower.value"]
+    assert df["L2Data.acVoltage"].tolist() == [0.0] * 60 + [232.0] * 3
+    assert not any(isinstance(v, dict) for v in df.to_numpy().ravel())
+
+
+def test_phase_first_seen_after_the_schema_sample():
+    records = telemetries(0, data_processor.TELEMETRY_SCHEMA_SAMPLE_SIZE, L1Data={"acVoltage": 230.0})
+    records += telemetries(1, 5, L1Data={"acVoltage": 230.0}, L2Data={"acVoltage": 232.0})
+
+    df = process_voltage_data(records, inverter_model="SE5000")
+
+    assert "L2Data" not in df.columns
+    assert df["L2Data.acVoltage"].tolist()[-5:] == [232.0] * 5
+    # The learned field is cached for the model, so the next site's frames have it too
+    assert "L2Data" in data_processor._telemetry_schemas["SE5000"]
+    assert "L2Data.acVoltage" in process_voltage_data(telemetries(2, 1, L2Data={"acVoltage": 1}), inverter_model="SE5000")
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import pytest
+
+from api.solaredge_client import SolarEdgeClient
+from utils.export_pipeline import run_export
+from utils.timeseries_store import TimeSeriesStore, production_series
+
+API_KEY = "test-key"
+JANUARY = (datetime(2024, 1, 1), datetime(2024, 1, 31, 23, 59, 59))
+KEYS = [production_series("HOUR", "PRODUCTION")]
+ENERGY = {"energyDetails": {"timeUnit": "HOUR", "unit": "Wh", "meters": [
+    {"type": "Production", "values": [{"date": f"2024-01-01 {h:02d}:00:00", "value": 10.0 * h} for h in range(24)]}]}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimeSeriesStore(str(tmp_path / "store.sqlite"))
+    yield store
+    store.close()
+
+
+def export_january(stub_server, store, output_path):
+    with SolarEdgeClient(base_url=stub_server.url, rate_limiter=False) as client:
+        return run_export(client, API_KEY, 1, "production", *JANUARY, str(output_path), time_unit="HOUR",
+                          meters=["PRODUCTION"], max_workers=1, timeseries_store=store)
+
+
+def test_well_formed_response_marks_the_range_fetched(stub_server, store, tmp_path):
+    stub_server.add("/site/1/energyDetails.json", (200, ENERGY))
+
+    assert export_january(stub_server, store, tmp_path)["records"] == 24
+    assert store.missing_ranges(1, KEYS, *JANUARY) == []
+
+
+@pytest.mark.parametrize("body", [{}, {"energyDetails": {"timeUnit": "HOUR"}}, {"unexpected": []}])
+def test_malformed_response_leaves_the_range_missing(stub_server, store, tmp_path, body):
+    stub_server.add("/site/1/energyDetails.json", (200, body), (200, ENERGY))
+
+    assert export_january(stub_server, store, tmp_path)["status"] == "no_data"
+    assert store.missing_ranges(1, KEYS, *JANUARY) == [JANUARY]
+
+    # The next export asks for the range again instead of serving a permanent gap
+    assert export_january(stub_server, store, tmp_path)["records"] == 24
+    assert len(stub_server.requests) == 2
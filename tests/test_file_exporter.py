@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import file_exporter
+from utils.file_exporter import ExportWriter
+
+FIRST = pd.DataFrame({"date": pd.date_range("2024-01-31 22:00", periods=3, freq="h"),
+                      "Production": np.array([1, 2, 3], dtype="int64"),
+                      "Inverter": pd.Categorical(["SN1", "SN2", "SN1"])})
+SECOND = pd.DataFrame({"date": pd.date_range("2024-02-01 01:00", periods=2, freq="h"),
+                       "Production": np.array([1.5, 2.5], dtype="float32"),
+                       "Consumption": [7, 8]}) # A column the first chunk did not have
+
+
+def read_export(path):
+    if path.endswith(".csv"):
+        return pd.read_csv(path, parse_dates=["date"])
+    if path.endswith(".xlsx"):
+        return pd.read_excel(path, engine="openpyxl")
+    return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_feather(path)
+
+
+@pytest.mark.parametrize("file_format", ["csv", "excel", "parquet", "feather"])
+def test_round_trip(tmp_path, file_format):
+    if file_format == "excel":
+        pytest.importorskip("openpyxl")
+    elif file_format in file_exporter.COLUMNAR_FORMATS:
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"export.{file_exporter.FILE_EXTENSIONS[file_format]}")
+
+    with ExportWriter(path, file_format) as writer:
+        writer.append(FIRST)
+        writer.append(SECOND)
+        assert writer.close() == (path, None)
+
+    exported = read_export(path)
+    assert list(exported.columns) == ["date", "Production", "Inverter", "Consumption"]
+    assert exported["date"].tolist() == FIRST["date"].tolist() + SECOND["date"].tolist()
+    assert exported["Production"].tolist() == [1.0, 2.0, 3.0, 1.5, 2.5]
+    assert exported["Inverter"].tolist()[:3] == ["SN1", "SN2", "SN1"]
+    assert exported["Inverter"].isna().tolist() == [False] * 3 + [True] * 2
+    assert exported["Consumption"].isna().tolist() == [True] * 3 + [False] * 2
+    assert not os.path.exists(f"{path}.part")
+
+
+def test_columnar_export_does_not_go_through_csv(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "export.parquet")
+    frame = FIRST.assign(Production=FIRST["Production"].astype("float32"))
+
+    def no_csv(*args, **kwargs):
+        raise AssertionError("Parquet export was parsed back from CSV")
+    monkeypatch.setattr(pd, "read_csv", no_csv)
+    monkeypatch.setattr(pd.DataFrame, "to_csv", no_csv)
+    with ExportWriter(path, "parquet") as writer:
+        writer.append(frame.iloc[:2])
+        writer.append(frame.iloc[2:])
+
+    exported = pd.read_parquet(path)
+    assert exported["Production"].dtype == np.float32 # Not re-inferred from text
+    assert exported["date"].tolist() == FIRST["date"].tolist()
+
+
+def test_columnar_export_is_written_in_large_batches(tmp_path, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(file_exporter, "SPOOL_READ_ROWS", 10)
+    path = str(tmp_path / "export.parquet")
+    frame = pd.DataFrame({"date": pd.date_range("2024-01-01", periods=24, freq="h"), "Production": 1.0})
+
+    with ExportWriter(path, "parquet") as writer:
+        for start in range(0, 24, 3): # Chunks smaller than a row group
+            writer.append(frame.iloc[start:start + 3])
+
+    metadata = pq.ParquetFile(path).metadata
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [12, 12]
+
+
+def test_partitioned_export_has_one_file_per_month(tmp_path):
+    pytest.importorskip("pyarrow")
+    root = str(tmp_path / "dataset")
+
+    with ExportWriter(str(tmp_path / "export.parquet"), "parquet", partition_root=root) as writer:
+        writer.append(FIRST)
+        writer.append(SECOND)
+        assert writer.close() == (root, None)
+
+    assert sorted(os.listdir(root)) == ["month=2024-01", "month=2024-02"]
+    exported = pd.read_parquet(root)
+    assert len(exported) == 5
+    assert exported["Production"].dtype == np.float64
+
+
+def test_abort_removes_the_spool(tmp_path):
+    path = str(tmp_path / "export.csv")
+    writer = ExportWriter(path, "csv")
+    writer.append(FIRST)
+    writer.abort()
+
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,101 @@
+import gc
+import threading
+import time
+import weakref
+from datetime import date, datetime
+
+import pytest
+
+from utils import helpers
+from utils.helpers import OperationCancelledError, estimate_chunks_needed, fetch_chunks_concurrently
+
+CHUNKS = [(datetime(2024, 1, i), datetime(2024, 1, i, 23, 59, 59)) for i in range(1, 21)]
+
+
+class ChunkResult:
+    """Stands in for a chunk's (raw JSON, DataFrame) result; weakly referenceable."""
+    def __init__(self, index):
+        self.index = index
+        self.payload = bytearray(1024)
+
+
+class Recorder:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.started = 0
+        self.refs = {}
+        self.lock = threading.Lock()
+
+    def fetch(self, ci, cs, ce):
+        with self.lock:
+            self.started += 1
+        time.sleep(self.delay)
+        result = ChunkResult(ci)
+        with self.lock:
+            self.refs[ci] = weakref.ref(result)
+        return result
+
+    def alive(self):
+        gc.collect()
+        with self.lock:
+            return sorted(ci for ci, ref in self.refs.items() if ref() is not None)
+
+
+def assert_consumed_results_are_freed(chunk_results, recorder, window):
+    for ci, cs, ce, result in chunk_results:
+        assert (cs, ce) == CHUNKS[ci]
+        assert result.index == ci
+        time.sleep(0.01) # A slow consumer: the workers would run ahead without the window
+        del result
+        # Results are released when the next one is requested: every earlier one must be gone by now
+        assert all(alive >= ci for alive in recorder.alive())
+        assert recorder.started <= ci + 1 + window
+    assert recorder.alive() == []
+    assert recorder.started == len(CHUNKS)
+
+
+def test_fetch_chunks_concurrently_keeps_a_bounded_window():
+    recorder = Recorder()
+    chunk_results = fetch_chunks_concurrently(CHUNKS, recorder.fetch, max_workers=2)
+
+    assert_consumed_results_are_freed(chunk_results, recorder, window=2 * helpers.CHUNKS_AHEAD_PER_WORKER)
+
+
+def test_fetch_chunks_sequentially():
+    recorder = Recorder()
+    progress = []
+
+    chunk_results = fetch_chunks_concurrently(CHUNKS, recorder.fetch, max_workers=1,
+                                              chunk_done_callback=lambda done, total: progress.append(done))
+    assert_consumed_results_are_freed(chunk_results, recorder, window=0)
+    assert progress == list(range(1, len(CHUNKS) + 1))
+
+
+def test_fetch_chunks_reports_progress_and_keeps_chunk_order():
+    recorder = Recorder(delay=0.005)
+    progress = []
+
+    results = list(fetch_chunks_concurrently(CHUNKS, recorder.fetch, max_workers=3,
+                                             chunk_done_callback=lambda done, total: progress.append((done, total))))
+
+    assert [ci for ci, _, _, _ in results] == list(range(len(CHUNKS)))
+    assert sorted(progress) == [(i, len(CHUNKS)) for i in range(1, len(CHUNKS) + 1)]
+
+
+def test_fetch_chunks_stops_after_an_error():
+    recorder = Recorder()
+
+    def fetch(ci, cs, ce):
+        if ci == 3:
+            raise OperationCancelledError("Cancelled by user")
+        return recorder.fetch(ci, cs, ce)
+
+    with pytest.raises(OperationCancelledError):
+        for _ in fetch_chunks_concurrently(CHUNKS, fetch, max_workers=2):
+            pass
+    assert recorder.started < len(CHUNKS)
+
+
+def test_estimate_chunks_needed():
+    assert estimate_chunks_needed(date(2024, 1, 1), date(2024, 12, 31), "production", "HOUR") == 12
+    assert estimate_chunks_needed(date(2024, 1, 1), date(2024, 1, 1), "voltage") == 1
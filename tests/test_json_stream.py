@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from api.json_stream import JSONArrayNotFoundError, iter_json_array_items
+
+ITEMS = [{"date": "2024-01-01 00:00:00", "L1Data": {"acVoltage": 230.1}, "mode": "MPPT"},
+         {"date": "2024-01-01 00:05:00", "L1Data": {"acVoltage": 229.8}, "mode": "Ångström ☀"},
+         [1, 2, {"nested": [3, 4]}]]
+DOCUMENT = json.dumps({"data": {"count": 3, "telemetries": ITEMS}}, ensure_ascii=False).encode("utf-8")
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, len(DOCUMENT)])
+def test_decodes_items_split_across_chunks(chunk_size):
+    # Chunk boundaries fall inside the key, inside items and inside multi-byte UTF-8 characters
+    assert list(iter_json_array_items(split(DOCUMENT, chunk_size), "telemetries")) == ITEMS
+
+
+def test_whitespace_between_tokens():
+    document = b'{ "telemetries"  :\n [ {"a": 1} ,\n\t{"a": 2}\n ] }'
+    assert list(iter_json_array_items(split(document, 4), "telemetries")) == [{"a": 1}, {"a": 2}]
+
+
+def test_empty_array():
+    assert list(iter_json_array_items([b'{"data": {"telemetries": []}}'], "telemetries")) == []
+
+
+def test_missing_array():
+    with pytest.raises(JSONArrayNotFoundError):
+        list(iter_json_array_items(split(b'{"data": {"count": 0}}', 3), "telemetries"))
+
+
+def test_key_that_is_not_an_array():
+    with pytest.raises(JSONArrayNotFoundError, match="not an array"):
+        list(iter_json_array_items([b'{"telemetries": {"a": 1}}'], "telemetries"))
+
+
+@pytest.mark.parametrize("cut", [
+    DOCUMENT.index(b'"telemetries"') + 5, # Inside the key
+    DOCUMENT.index(b'"telemetries"') + len(b'"telemetries"'), # Before the colon
+    DOCUMENT.index(b"[") + 1, # Before the first item
+    DOCUMENT.index(b"230.1"), # Inside an item
+    DOCUMENT.rindex(b"]"), # After the last item, before the closing bracket
+])
+def test_truncated_document(cut):
+    with pytest.raises(ValueError):
+        list(iter_json_array_items(split(DOCUMENT[:cut], 5), "telemetries"))
+
+
+def test_items_before_the_truncation_are_yielded():
+    cut = DOCUMENT.index(b"229.8")
+    items = iter_json_array_items(split(DOCUMENT[:cut], 5), "telemetries")
+    assert next(items) == ITEMS[0]
+    with pytest.raises(ValueError):
+        next(items)
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from api.rate_limiter import QuotaExceededError, SolarEdgeRateLimiter, TokenBucket, site_ids_from_endpoint
+
+API_KEY = "test-key"
+
+
+def make_limiter(tmp_path, **kwargs):
+    kwargs.setdefault("requests_per_second", 1000)
+    kwargs.setdefault("burst", 1000)
+    return SolarEdgeRateLimiter(usage_file=str(tmp_path / "usage.json"), **kwargs)
+
+
+@pytest.mark.parametrize("endpoint, site_ids", [
+    ("/site/123/overview.json", ["123"]),
+    ("/site/123/energyDetails.json", ["123"]),
+    ("/equipment/123/SN1/data.json", ["123"]),
+    ("/sites/1,2,3/overview", ["1", "2", "3"]),
+    ("/sites/list", []),
+])
+def test_site_ids_from_endpoint(endpoint, site_ids):
+    assert site_ids_from_endpoint(endpoint) == site_ids
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate=10, capacity=2)
+    bucket.take()
+    bucket.take()
+    assert 0 < bucket.wait_time() <= 0.1
+
+
+def test_daily_quota_per_account_and_site(tmp_path):
+    limiter = make_limiter(tmp_path, daily_account_limit=5, daily_site_limit=2)
+
+    for _ in range(2):
+        limiter.acquire(API_KEY, ["1"])
+        limiter.release()
+    assert limiter.remaining_quota(API_KEY, "1") == {"account": 3, "site": 0}
+    with pytest.raises(QuotaExceededError, match="site 1"):
+        limiter.try_acquire(API_KEY, ["1"])
+
+    for site_id in ("2", "3", "4"):
+        limiter.acquire(API_KEY, [site_id])
+        limiter.release()
+    with pytest.raises(QuotaExceededError, match="API key"):
+        limiter.try_acquire(API_KEY, ["5"])
+
+
+def test_concurrency_limit(tmp_path):
+    limiter = make_limiter(tmp_path, max_concurrent=2)
+
+    assert limiter.try_acquire(API_KEY) == 0
+    assert limiter.try_acquire(API_KEY) == 0
+    assert limiter.try_acquire(API_KEY) > 0
+    limiter.release()
+    assert limiter.try_acquire(API_KEY) == 0
+
+
+def test_rate_limited_response_blocks_every_caller(tmp_path):
+    limiter = make_limiter(tmp_path)
+    limiter.note_rate_limited(30)
+
+    assert 29 < limiter.try_acquire(API_KEY) <= 30
+    assert limiter.remaining_quota(API_KEY) == {"account": limiter.daily_account_limit}
+
+
+def test_usage_is_persisted_without_the_api_key(tmp_path):
+    limiter = make_limiter(tmp_path)
+    with limiter.permit(API_KEY, ["1"]):
+        pass
+    limiter.flush()
+
+    with open(tmp_path / "usage.json", encoding="utf-8") as f:
+        usage = json.load(f)
+    assert usage["sites"] == {"1": 1}
+    assert list(usage["accounts"].values()) == [1]
+    assert API_KEY not in json.dumps(usage)
+    assert make_limiter(tmp_path).remaining_quota(API_KEY, "1") == {"account": 299, "site": 299}
+
+
+def test_usage_of_other_processes_is_merged(tmp_path):
+    first, second = make_limiter(tmp_path), make_limiter(tmp_path)
+    for limiter in (first, second):
+        with limiter.permit(API_KEY, ["1"]):
+            pass
+        limiter.flush()
+
+    assert second.remaining_quota(API_KEY, "1") == {"account": 298, "site": 298}
+
+
+def test_unwritable_usage_file_is_logged(tmp_path, caplog):
+    limiter = SolarEdgeRateLimiter(usage_file=str(tmp_path / "missing-folder" / "usage.json"))
+    with limiter.permit(API_KEY):
+        pass
+
+    with caplog.at_level("WARNING", logger="api.rate_limiter"):
+        limiter.flush()
+    assert "Could not persist API usage" in caplog.text
+    assert limiter.remaining_quota(API_KEY) == {"account": limiter.daily_account_limit - 1}
@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import pytest
+
+from utils.request_planner import PlannedCall, RequestPlan, max_call_end, plan_calls
+
+
+def dt(*args):
+    return datetime(*args)
+
+
+@pytest.mark.parametrize("data_type, time_unit, call_start, limit", [
+    ("production", "HOUR", dt(2024, 1, 1), dt(2024, 1, 31, 23, 59, 59)),
+    ("production", "HOUR", dt(2024, 1, 15, 6), dt(2024, 2, 14, 23, 59, 59)),
+    ("production", "QUARTER_OF_AN_HOUR", dt(2024, 1, 31), dt(2024, 2, 28, 23, 59, 59)), # Clamped to 29 February
+    ("production", "HOUR", dt(2023, 12, 15), dt(2024, 1, 14, 23, 59, 59)),
+    ("production", "DAY", dt(2024, 1, 1), dt(2024, 12, 31, 23, 59, 59)),
+    ("production", "DAY", dt(2024, 2, 29), dt(2025, 2, 27, 23, 59, 59)), # No 29 February in 2025
+    ("production", "WEEK", dt(2024, 1, 1), None),
+    ("production", "MONTH", dt(2024, 1, 1), None),
+    ("voltage", None, dt(2024, 1, 1, 12), dt(2024, 1, 7, 23, 59, 59)),
+])
+def test_max_call_end(data_type, time_unit, call_start, limit):
+    assert max_call_end(data_type, time_unit, call_start) == limit
+
+
+def test_calendar_year_of_hourly_data_takes_one_call_per_month():
+    calls = plan_calls("production", "HOUR", [(dt(2024, 1, 1), dt(2024, 12, 31, 23, 59, 59))])
+
+    assert len(calls) == 12
+    assert calls[1] == (dt(2024, 2, 1), dt(2024, 2, 29, 23, 59, 59))
+    assert calls[-1] == (dt(2024, 12, 1), dt(2024, 12, 31, 23, 59, 59))
+
+
+def test_calls_starting_mid_month_run_to_the_same_day_next_month():
+    calls = plan_calls("production", "HOUR", [(dt(2024, 1, 15, 8), dt(2024, 3, 20, 18))])
+
+    assert calls == [(dt(2024, 1, 15, 8), dt(2024, 2, 14, 23, 59, 59)),
+                     (dt(2024, 2, 15), dt(2024, 3, 14, 23, 59, 59)),
+                     (dt(2024, 3, 15), dt(2024, 3, 20, 18))]
+
+
+def test_daily_data_across_a_year_boundary():
+    calls = plan_calls("production", "DAY", [(dt(2023, 7, 1), dt(2025, 1, 10, 23, 59, 59))])
+
+    assert calls == [(dt(2023, 7, 1), dt(2024, 6, 30, 23, 59, 59)),
+                     (dt(2024, 7, 1), dt(2025, 1, 10, 23, 59, 59))]
+
+
+def test_unlimited_time_units_take_one_call():
+    assert plan_calls("production", "MONTH", [(dt(2015, 1, 1), dt(2024, 12, 31))]) == [(dt(2015, 1, 1), dt(2024, 12, 31))]
+
+
+def test_telemetry_is_fetched_a_week_at_a_time():
+    calls = plan_calls("voltage", None, [(dt(2024, 1, 1), dt(2024, 1, 20, 23, 59, 59))])
+
+    assert [c[0] for c in calls] == [dt(2024, 1, 1), dt(2024, 1, 8), dt(2024, 1, 15)]
+
+
+def test_gaps_within_one_period_share_a_call():
+    gaps = [(dt(2024, 1, 1), dt(2024, 1, 5, 23, 59, 59)), (dt(2024, 1, 20), dt(2024, 1, 25, 23, 59, 59)),
+            (dt(2024, 2, 10), dt(2024, 2, 12, 23, 59, 59))]
+
+    assert plan_calls("production", "HOUR", gaps) == [(dt(2024, 1, 1), dt(2024, 1, 25, 23, 59, 59)),
+                                                      (dt(2024, 2, 10), dt(2024, 2, 12, 23, 59, 59))]
+
+
+def test_gap_crossing_the_limit_continues_in_the_next_call():
+    gaps = [(dt(2024, 1, 10), dt(2024, 1, 12, 23, 59, 59)), (dt(2024, 2, 1), dt(2024, 2, 20, 23, 59, 59))]
+
+    assert plan_calls("production", "HOUR", gaps) == [(dt(2024, 1, 10), dt(2024, 2, 9, 23, 59, 59)),
+                                                      (dt(2024, 2, 10), dt(2024, 2, 20, 23, 59, 59))]
+
+
+def test_nothing_to_fetch():
+    assert plan_calls("production", "HOUR", []) == []
+
+
+def test_request_plan_costs():
+    calls = [PlannedCall(dt(2024, 1, 1), dt(2024, 1, 31, 23, 59, 59), False),
+             PlannedCall(dt(2024, 2, 1), dt(2024, 2, 29, 23, 59, 59), True),
+             PlannedCall(dt(2024, 3, 1), dt(2024, 3, 31, 23, 59, 59), False)]
+    plan = RequestPlan("production", "HOUR", calls, meter_count=2, quota_left=1)
+
+    assert plan.api_calls == 2
+    assert plan.cached_calls == 1
+    assert plan.date_chunks == [(c.start, c.end) for c in calls]
+    assert plan.exceeds_quota
+    assert plan.summary().startswith("2 API calls (1 more from the cache), about 0.1 MB")
+    assert plan.summary().endswith("; 1 requests left today")
+
+
+def test_fully_cached_plan():
+    plan = RequestPlan("production", "HOUR", [PlannedCall(dt(2024, 1, 1), dt(2024, 1, 31), True)])
+
+    assert plan.bytes == 0
+    assert not plan.exceeds_quota
+    assert plan.summary() == "no API calls (1 answered from the cache)"
@@ -0,0 +1,137 @@
+import threading
+
+import pytest
+
+from utils import helpers
+from utils.helpers import OperationCancelledError
+from utils.request_scheduler import (PRIORITY_BULK, PRIORITY_EXPORT, PRIORITY_INTERACTIVE, RequestScheduler,
+                                     current_job)
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = RequestScheduler(max_concurrent=1)
+    yield scheduler
+    scheduler.close()
+
+
+def blocked_worker(scheduler):
+    """Occupies the (single) worker until the returned event is set, so the next submissions queue up."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+    job = scheduler.submit_calls("blocker", [block])
+    started.wait(5)
+    return release, job
+
+
+def test_results_come_back_in_submission_order(scheduler):
+    job = scheduler.submit_calls(1, [lambda i=i: i * 10 for i in range(5)])
+
+    assert list(job.results()) == [0, 10, 20, 30, 40]
+
+
+def test_priority_classes_then_started_sites_then_fewest_requests(scheduler):
+    order = []
+    release, _ = blocked_worker(scheduler)
+    bulk = scheduler.submit_calls("bulk", [lambda: order.append("bulk")], priority=PRIORITY_BULK)
+    long = scheduler.submit_calls("long", [lambda: order.append("long")] * 3, priority=PRIORITY_EXPORT)
+    short = scheduler.submit_calls("short", [lambda: order.append("short")], priority=PRIORITY_EXPORT)
+    details = scheduler.submit_calls("details", [lambda: order.append("details")], priority=PRIORITY_INTERACTIVE)
+    release.set()
+    for job in (bulk, long, short, details):
+        list(job.results())
+
+    assert order == ["details", "short", "long", "long", "long", "bulk"]
+
+
+def test_current_job_is_set_on_the_worker(scheduler):
+    job = scheduler.submit_calls(1, [current_job])
+
+    assert list(job.results()) == [job]
+    assert current_job() is None
+
+
+def test_an_error_is_raised_when_its_turn_comes(scheduler):
+    def fail():
+        raise ValueError("chunk 2 failed")
+    job = scheduler.submit_calls(1, [lambda: 1, fail, lambda: 3])
+    results = job.results()
+
+    assert next(results) == 1
+    with pytest.raises(ValueError, match="chunk 2 failed"):
+        next(results)
+
+
+def test_cancel_fails_requests_that_have_not_started(scheduler):
+    ran = []
+    release, _ = blocked_worker(scheduler)
+    job = scheduler.submit_calls(1, [lambda: ran.append(1)] * 3, priority=PRIORITY_EXPORT)
+    job.cancel()
+    release.set()
+
+    with pytest.raises(OperationCancelledError):
+        list(job.results())
+    assert ran == []
+
+
+def test_cancellation_callback_stops_the_job(scheduler):
+    cancelled = threading.Event()
+
+    def check():
+        if cancelled.is_set():
+            raise OperationCancelledError("Cancelled by user")
+
+    def first():
+        cancelled.set()
+        return 1
+    job = scheduler.submit_calls(1, [first, lambda: 2], check_if_cancelled_callback=check)
+
+    with pytest.raises(OperationCancelledError):
+        list(job.results())
+    assert job.done()
+
+
+def test_fetch_chunks_yields_chunk_order(scheduler):
+    chunks = [(i, i + 1) for i in range(4)]
+    progress = []
+
+    results = list(scheduler.fetch_chunks("1", chunks, lambda ci, cs, ce: cs * 100,
+                                          chunk_done_callback=lambda done, total: progress.append((done, total))))
+
+    assert results == [(i, i, i + 1, i * 100) for i in range(4)]
+    assert sorted(progress) == [(i, 4) for i in range(1, 5)]
+
+
+def test_closed_scheduler_rejects_work():
+    scheduler = RequestScheduler(max_concurrent=1)
+    scheduler.close()
+
+    with pytest.raises(RuntimeError):
+        scheduler.submit_calls(1, [lambda: 1])
+
+
+def test_fetch_chunks_keeps_a_bounded_window():
+    from tests.test_helpers import CHUNKS, Recorder, assert_consumed_results_are_freed
+    scheduler = RequestScheduler(max_concurrent=2)
+    recorder = Recorder()
+    try:
+        chunk_results = scheduler.fetch_chunks("1", CHUNKS, recorder.fetch)
+        assert_consumed_results_are_freed(chunk_results, recorder, window=2 * helpers.CHUNKS_AHEAD_PER_WORKER)
+    finally:
+        scheduler.close()
+
+
+def test_a_site_at_its_window_does_not_hold_up_other_sites(scheduler):
+    order = []
+    held = scheduler.submit_calls("held", [lambda i=i: order.append(("held", i)) for i in range(3)],
+                                  priority=PRIORITY_EXPORT, window=1)
+    other = scheduler.submit_calls("other", [lambda: order.append(("other", 0))], priority=PRIORITY_EXPORT)
+
+    list(other.results())
+    assert order.count(("held", 0)) == 1 and ("held", 1) not in order
+    assert list(held.results()) == [None, None, None]
+    assert [i for name, i in order if name == "held"] == [0, 1, 2]
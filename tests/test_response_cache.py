@@ -0,0 +1,90 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from api.response_cache import (ResponseCache, cache_key_for_request, ttl_for_request,
+                                CURRENT_POWER_FLOW_TTL, OVERVIEW_TTL, RECENT_HISTORY_TTL)
+
+NOW = datetime(2024, 6, 15, 12, 0, 0)
+HISTORICAL = ("/site/1/energyDetails.json", {"api_key": "key", "startTime": "2024-01-01 00:00:00",
+                                             "endTime": "2024-01-31 23:59:59", "meters": "PRODUCTION", "timeUnit": "HOUR"})
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    yield cache
+    cache.close()
+
+
+@pytest.mark.parametrize("endpoint, params, ttl", [
+    ("/site/1/energyDetails.json", {"endTime": "2024-06-01 23:59:59"}, None),
+    ("/site/1/energyDetails.json", {"endTime": "2024-06-15 00:00:00"}, RECENT_HISTORY_TTL),
+    ("/equipment/1/SN1/data.json", {"endTime": "2024-06-01 23:59:59"}, None),
+    ("/site/1/currentPowerFlow.json", {}, CURRENT_POWER_FLOW_TTL),
+    ("/site/1/overview.json", {}, OVERVIEW_TTL),
+    ("/sites/1,2/overview", {}, OVERVIEW_TTL),
+    ("/site/1/alerts.json", {}, 0),
+])
+def test_ttl_for_request(endpoint, params, ttl):
+    assert ttl_for_request(endpoint, params, now=NOW) == ttl
+
+
+def test_cache_key_ignores_the_api_key_and_param_order():
+    endpoint, params = HISTORICAL
+    assert cache_key_for_request(endpoint, dict(reversed(list(params.items())))) == \
+        cache_key_for_request(endpoint, dict(params, api_key="other-key"))
+    assert "api_key" not in cache_key_for_request(endpoint, params)
+
+
+def test_account_endpoints_are_keyed_per_account():
+    assert cache_key_for_request("/sites/list", {"api_key": "a", "size": 100}) != \
+        cache_key_for_request("/sites/list", {"api_key": "b", "size": 100})
+
+
+def test_put_and_get(cache):
+    body = {"energyDetails": {"meters": [{"type": "Production", "values": []}]}}
+    cache.put(*HISTORICAL, json.dumps(body).encode("utf-8"))
+
+    assert cache.contains(*HISTORICAL)
+    assert cache.get(*HISTORICAL) == body
+    assert cache.stats()["hits"] == 1
+    assert cache.get(HISTORICAL[0], dict(HISTORICAL[1], meters="CONSUMPTION")) is None
+
+
+def test_uncacheable_endpoints_are_not_stored(cache):
+    cache.put("/site/1/alerts.json", {"api_key": "key"}, b"{}")
+
+    assert not cache.contains("/site/1/alerts.json", {"api_key": "key"})
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_persist_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first = ResponseCache(path)
+    first.put(*HISTORICAL, b'{"a": 1}')
+    first.close()
+
+    second = ResponseCache(path)
+    try:
+        assert second.get(*HISTORICAL) == {"a": 1}
+    finally:
+        second.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=3000)
+    try:
+        requests = [(HISTORICAL[0], dict(HISTORICAL[1], startTime=f"2024-01-{day:02d} 00:00:00")) for day in range(1, 6)]
+        for endpoint, params in requests:
+            cache.put(endpoint, params, json.dumps({"noise": os.urandom(1000).hex()}).encode("utf-8")) # ~1.1 KB compressed
+            cache.get(*requests[0]) # Keep the first one recently used
+
+        assert cache.evictions > 0
+        assert cache.contains(*requests[0])
+        assert not cache.contains(*requests[1])
+        assert cache.stats()["bytes"] <= 3000
+    finally:
+        cache.close()
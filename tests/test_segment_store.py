@@ -0,0 +1,105 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from utils.segment_store import SegmentStore
+from utils.timeseries_store import TimeSeriesStore, production_series
+
+NOW = datetime(2024, 6, 15, 12, 0, 0)
+DATASET = "production/HOUR"
+KEYS = [production_series("HOUR", "PRODUCTION")]
+JANUARY = (datetime(2024, 1, 1), datetime(2024, 1, 31, 23, 59, 59))
+
+
+@pytest.fixture
+def stores(tmp_path):
+    store = TimeSeriesStore(str(tmp_path / "store.sqlite"))
+    yield store, SegmentStore(str(tmp_path / "segments"), timeseries_store=store)
+    store.close()
+
+
+def fetch_into_store(store, start, end, value=1.0):
+    """What run_export does with a fetched chunk: upsert its rows and record the range as fetched."""
+    frame = pd.DataFrame({"date": pd.date_range(start, end, freq="h")})
+    frame["Production"] = value
+    store.upsert_frame(1, DATASET, frame)
+    store.mark_fetched(1, KEYS, start, end, now=NOW)
+
+
+def test_partial_then_full_month_with_coverage_keys(stores):
+    store, segments = stores
+    fetch_into_store(store, datetime(2024, 1, 10), datetime(2024, 1, 20, 23, 59, 59))
+
+    assert segments.seal_from_store(1, DATASET, *JANUARY, now=NOW, coverage_keys=KEYS) == [] # Not fetched completely yet
+    assert len(segments.read_range(1, DATASET, *JANUARY)) == 264
+
+    fetch_into_store(store, *JANUARY)
+    assert segments.seal_from_store(1, DATASET, *JANUARY, now=NOW, coverage_keys=KEYS) == \
+        [segments.segment_path(1, DATASET, datetime(2024, 1, 1))]
+    assert len(segments.read_range(1, DATASET, *JANUARY)) == 744
+    assert segments.read_table(1, DATASET, *JANUARY)[1] == [] # Read from the segment, not the store
+
+
+def test_partial_segment_is_resealed_when_the_store_changes(stores):
+    store, segments = stores
+    fetch_into_store(store, datetime(2024, 1, 10), datetime(2024, 1, 20, 23, 59, 59))
+    assert len(segments.seal_from_store(1, DATASET, *JANUARY, now=NOW)) == 1
+    assert len(segments.read_range(1, DATASET, *JANUARY)) == 264
+
+    fetch_into_store(store, *JANUARY, value=2.0)
+    assert len(segments.seal_from_store(1, DATASET, *JANUARY, now=NOW)) == 1
+    frame = segments.read_range(1, DATASET, *JANUARY)
+    assert len(frame) == 744
+    assert (frame["Production"] == 2.0).all()
+
+
+def test_outdated_segment_of_an_incomplete_month_is_removed(stores):
+    store, segments = stores
+    fetch_into_store(store, datetime(2024, 1, 10), datetime(2024, 1, 20, 23, 59, 59))
+    segments.seal_from_store(1, DATASET, *JANUARY, now=NOW) # Sealed without coverage keys
+    fetch_into_store(store, datetime(2024, 1, 21), datetime(2024, 1, 25, 23, 59, 59))
+
+    assert segments.seal_from_store(1, DATASET, *JANUARY, now=NOW, coverage_keys=KEYS) == []
+    assert not os.path.exists(segments.segment_path(1, DATASET, datetime(2024, 1, 1)))
+    assert len(segments.read_range(1, DATASET, *JANUARY)) == 16 * 24
+
+
+def test_current_segments_are_not_rewritten(stores):
+    store, segments = stores
+    fetch_into_store(store, datetime(2024, 1, 1), datetime(2024, 2, 29, 23, 59, 59))
+
+    assert len(segments.seal_from_store(1, DATASET, datetime(2024, 1, 1), datetime(2024, 2, 29), now=NOW, coverage_keys=KEYS)) == 2
+    assert segments.seal_from_store(1, DATASET, datetime(2024, 1, 1), datetime(2024, 2, 29), now=NOW, coverage_keys=KEYS) == []
+
+
+def test_recent_months_are_not_sealed(stores):
+    store, segments = stores
+    fetch_into_store(store, datetime(2024, 5, 1), datetime(2024, 6, 14, 23, 59, 59))
+
+    sealed = segments.seal_from_store(1, DATASET, datetime(2024, 5, 1), datetime(2024, 6, 14), now=NOW)
+    assert sealed == [segments.segment_path(1, DATASET, datetime(2024, 5, 1))]
+    assert len(segments.read_range(1, DATASET, datetime(2024, 5, 1), datetime(2024, 6, 14, 23, 59, 59))) == 45 * 24
+
+
+def test_segment_without_a_revision_is_resealed(stores):
+    store, segments = stores
+    fetch_into_store(store, *JANUARY)
+    segments.write_month(1, DATASET, datetime(2024, 1, 1), store.read_frame(1, DATASET, *JANUARY).head(10))
+
+    assert len(segments.seal_from_store(1, DATASET, *JANUARY, now=NOW, coverage_keys=KEYS)) == 1
+    assert len(segments.read_range(1, DATASET, *JANUARY)) == 744
+
+
+def test_iter_frames_reads_segments_and_store_months_alike(stores):
+    store, segments = stores
+    fetch_into_store(store, datetime(2024, 1, 1), datetime(2024, 2, 29, 23, 59, 59))
+    segments.seal_from_store(1, DATASET, *JANUARY, now=NOW, coverage_keys=KEYS) # February stays in the store only
+
+    frames = list(segments.iter_frames(1, DATASET, datetime(2024, 1, 15), datetime(2024, 2, 10, 23, 59, 59)))
+    assert [len(f) for f in frames] == [17 * 24, 10 * 24]
+    assert [list(f.columns) for f in frames] == [["date", "Production"]] * 2
+    assert frames[0]["date"].dtype == frames[1]["date"].dtype
@@ -0,0 +1,159 @@
+import pytest
+
+import api.solaredge_client as solaredge_client
+from api.json_stream import JSONArrayNotFoundError
+from api.response_cache import ResponseCache
+from api.solaredge_client import SolarEdgeClient
+from utils.helpers import OperationCancelledError
+
+API_KEY = "test-key"
+TELEMETRIES = [{"date": f"2024-01-01 00:{m:02d}:00", "L1Data": {"acVoltage": 230.0 + m}} for m in range(0, 60, 5)]
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(solaredge_client, "DEFAULT_BASE_RETRY_DELAY", 0)
+
+
+@pytest.fixture
+def client(stub_server):
+    with SolarEdgeClient(base_url=stub_server.url, rate_limiter=False) as client:
+        yield client
+
+
+def test_returns_decoded_json_and_sends_params(stub_server, client):
+    stub_server.add("/site/1/overview.json", (200, {"overview": {"lifeTimeData": {"energy": 42}}}))
+
+    assert client.get_site_overview(API_KEY, 1) == {"overview": {"lifeTimeData": {"energy": 42}}}
+    assert stub_server.requests == [("/site/1/overview.json", {"api_key": API_KEY})]
+
+
+def test_reuses_the_pooled_connection(stub_server, client):
+    stub_server.add("/site/1/overview.json", (200, {"overview": {}}))
+
+    for _ in range(3):
+        client.get_site_overview(API_KEY, 1)
+
+    stats = client.get_connection_stats()
+    assert stats["requests"] == 3
+    assert stats["connections_opened"] == 1
+
+
+@pytest.mark.parametrize("body, message", [
+    ({"String": "Invalid site ID"}, "Invalid site ID"),
+    ({"message": "Invalid token"}, "Invalid token"),
+    ({"error": {"message": "Bad request"}}, "Bad request"),
+    ("not json", "Non-JSON response: not json"),
+])
+def test_maps_client_errors_without_retrying(stub_server, client, body, message):
+    stub_server.add("/site/1/overview.json", (404, body))
+
+    with pytest.raises(Exception, match=r"API Error \(Status 404") as excinfo:
+        client.get_site_overview(API_KEY, 1)
+    assert message in str(excinfo.value)
+    assert len(stub_server.requests) == 1
+
+
+def test_alerts_403_explains_the_date_range_limit(stub_server, client):
+    stub_server.add("/site/1/alerts.json", (403, {"String": "Forbidden"}))
+
+    with pytest.raises(Exception, match=r"Access Denied \(403\) for alerts"):
+        client.get_site_alerts(API_KEY, 1, "2024-01-01 00:00:00", "2024-03-01 00:00:00")
+
+
+def test_retries_server_errors_and_rate_limits(stub_server, client):
+    stub_server.add("/site/1/overview.json",
+                    (500, {"String": "Internal error"}), (429, {}, {"Retry-After": "0"}), (200, {"overview": {}}))
+    statuses = []
+    client.status_update_callback = statuses.append
+
+    assert client.get_site_overview(API_KEY, 1) == {"overview": {}}
+    assert len(stub_server.requests) == 3
+    assert statuses[0].startswith("API Error (Status 500")
+    assert statuses[1].startswith("Rate limit.")
+
+
+def test_gives_up_after_the_last_retry(stub_server, client):
+    stub_server.add("/site/1/overview.json", (503, {"String": "Unavailable"}))
+
+    with pytest.raises(Exception, match=r"API Error \(Status 503.*Unavailable"):
+        client.get_site_overview(API_KEY, 1)
+    assert len(stub_server.requests) == solaredge_client.DEFAULT_MAX_RETRIES
+
+
+def test_invalid_json_is_an_error(stub_server, client):
+    stub_server.add("/site/1/overview.json", (200, "{not json"))
+
+    with pytest.raises(Exception, match="API returned invalid JSON"):
+        client.get_site_overview(API_KEY, 1)
+
+
+def test_cancellation_is_checked_before_each_request(stub_server):
+    stub_server.add("/site/1/overview.json", (200, {"overview": {}}))
+
+    def cancelled():
+        raise OperationCancelledError("Cancelled by user")
+
+    with SolarEdgeClient(check_if_cancelled_callback=cancelled, base_url=stub_server.url, rate_limiter=False) as client:
+        with pytest.raises(OperationCancelledError):
+            client.get_site_overview(API_KEY, 1)
+    assert stub_server.requests == []
+
+
+def test_cached_responses_do_not_reach_the_api(stub_server, tmp_path):
+    stub_server.add("/site/1/energyDetails.json", (200, {"energyDetails": {"meters": []}}))
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    try:
+        with SolarEdgeClient(base_url=stub_server.url, rate_limiter=False, cache=cache) as client:
+            args = (API_KEY, 1, "2024-01-01 00:00:00", "2024-01-31 23:59:59", "PRODUCTION", "HOUR")
+            first = client.get_energy_details(*args)
+            assert client.get_energy_details(*args) == first
+            assert client.is_cached(*client.energy_details_request(*args))
+    finally:
+        cache.close()
+    assert len(stub_server.requests) == 1
+
+
+def test_streams_equipment_telemetries_in_batches(stub_server, client):
+    stub_server.add("/equipment/1/SN1/data.json", (200, {"data": {"count": len(TELEMETRIES), "telemetries": TELEMETRIES}}))
+
+    batches = list(client.iter_equipment_telemetries(API_KEY, 1, "SN1", "2024-01-01 00:00:00", "2024-01-01 00:59:59", batch_size=5))
+
+    assert [len(batch) for batch in batches] == [5, 5, 2]
+    assert [t for batch in batches for t in batch] == TELEMETRIES
+
+
+def test_streamed_response_without_telemetries(stub_server, client):
+    stub_server.add("/equipment/1/SN1/data.json", (200, {"data": {"count": 0}}))
+
+    with pytest.raises(JSONArrayNotFoundError):
+        list(client.iter_equipment_telemetries(API_KEY, 1, "SN1", "2024-01-01 00:00:00", "2024-01-01 00:59:59"))
+
+
+def test_streamed_telemetries_are_cached(stub_server, tmp_path):
+    stub_server.add("/equipment/1/SN1/data.json", (200, {"data": {"count": len(TELEMETRIES), "telemetries": TELEMETRIES}}))
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    args = (API_KEY, 1, "SN1", "2024-01-01 00:00:00", "2024-01-01 00:59:59")
+    try:
+        with SolarEdgeClient(base_url=stub_server.url, rate_limiter=False, cache=cache) as client:
+            streamed = [t for batch in client.iter_equipment_telemetries(*args, batch_size=5) for t in batch]
+            assert client.is_cached(*client.equipment_data_request(*args))
+            cached = [t for batch in client.iter_equipment_telemetries(*args, batch_size=5) for t in batch]
+    finally:
+        cache.close()
+    assert streamed == cached == TELEMETRIES
+    assert len(stub_server.requests) == 1
+
+
+def test_partly_read_stream_is_not_cached(stub_server, tmp_path):
+    stub_server.add("/equipment/1/SN1/data.json", (200, {"data": {"count": len(TELEMETRIES), "telemetries": TELEMETRIES}}))
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    args = (API_KEY, 1, "SN1", "2024-01-01 00:00:00", "2024-01-01 00:59:59")
+    try:
+        with SolarEdgeClient(base_url=stub_server.url, rate_limiter=False, cache=cache) as client:
+            batches = client.iter_equipment_telemetries(*args, batch_size=5)
+            next(batches)
+            batches.close()
+            assert not client.is_cached(*client.equipment_data_request(*args))
+    finally:
+        cache.close()
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from utils.sync_state import SyncStateStore, incremental_start, split_final_rows, sync_key
+
+
+def test_sync_key_ignores_meter_order():
+    assert sync_key(1, "production", ["PRODUCTION", "CONSUMPTION"], "HOUR") == \
+        sync_key("1", "production", ["CONSUMPTION", "PRODUCTION"], "HOUR")
+    assert sync_key(1, "voltage", "SN1") != sync_key(1, "voltage", "SN2")
+
+
+def test_state_round_trip(tmp_path):
+    store = SyncStateStore(str(tmp_path / "sync.json"))
+    key = sync_key(1, "production", ["PRODUCTION"], "HOUR")
+    assert store.get(key) is None
+
+    store.update(key, datetime(2024, 1, 31, 23), "/exports/site_1.csv")
+    assert store.get(key) == {"last_timestamp": datetime(2024, 1, 31, 23), "output_file": "/exports/site_1.csv"}
+
+    store.forget(key)
+    assert store.get(key) is None
+
+
+def test_incremental_start(tmp_path):
+    export = tmp_path / "export.csv"
+    entry = {"last_timestamp": datetime(2024, 1, 31, 23), "output_file": str(export)}
+    assert incremental_start(entry, "production") is None # The previous file is gone
+
+    export.write_text("date,Production\n")
+    assert incremental_start(entry, "production") == datetime(2024, 1, 31, 23)
+    assert incremental_start(entry, "voltage") == datetime(2024, 1, 31, 23) + timedelta(seconds=1)
+    assert incremental_start(None, "production") is None
+
+
+def test_production_holds_back_the_newest_bucket():
+    frame = pd.DataFrame({"date": pd.date_range("2024-01-01", periods=3, freq="h"), "Production": [1.0, 2.0, 3.0]})
+
+    rows, watermark = split_final_rows(frame, "production")
+    assert rows["Production"].tolist() == [1.0, 2.0]
+    assert watermark == datetime(2024, 1, 1, 2)
+
+    rows, watermark = split_final_rows(frame, "voltage")
+    assert len(rows) == 3
+    assert watermark == datetime(2024, 1, 1, 2)
+
+
+def test_nothing_to_split():
+    assert split_final_rows(pd.DataFrame(), "production")[1] is None
+    assert split_final_rows(None, "production") == (None, None)
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from utils.timeseries_store import TimeSeriesStore, production_series
+
+NOW = datetime(2024, 6, 15, 12, 0, 0)
+KEYS = [production_series("HOUR", "PRODUCTION")]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimeSeriesStore(str(tmp_path / "store.sqlite"))
+    yield store
+    store.close()
+
+
+def hourly_frame(start, hours, **columns):
+    frame = pd.DataFrame({"date": pd.date_range(start, periods=hours, freq="h")})
+    for name, value in (columns or {"Production": 1.0}).items():
+        frame[name] = value
+    return frame
+
+
+def test_upsert_is_idempotent(store):
+    frame = hourly_frame("2024-01-01", 24, Production=1.0)
+    store.upsert_frame(1, "production/HOUR", frame)
+    store.upsert_frame(1, "production/HOUR", frame.assign(Production=2.0))
+
+    stored = store.read_frame(1, "production/HOUR", datetime(2024, 1, 1), datetime(2024, 1, 1, 23))
+    assert len(stored) == 24
+    assert (stored["Production"] == 2.0).all()
+
+
+def test_read_frame_is_shaped_like_the_processed_frames(store):
+    store.upsert_frame(1, "production/HOUR", hourly_frame("2024-01-01", 3, Production=1.0))
+    store.upsert_frame(1, "production/HOUR", hourly_frame("2024-01-01 01:00", 3, Consumption=5.0))
+
+    stored = store.read_frame(1, "production/HOUR", datetime(2024, 1, 1), datetime(2024, 1, 1, 23))
+    assert list(stored.columns) == ["date", "Production", "Consumption"]
+    assert stored["date"].tolist() == list(pd.date_range("2024-01-01", periods=4, freq="h"))
+    assert stored["Production"].tolist() == [1.0, 1.0, 1.0, 0.0]
+    assert stored["Consumption"].tolist() == [0.0, 5.0, 5.0, 5.0]
+    assert store.columns(1, "production/HOUR") == ["Production", "Consumption"]
+
+
+def test_sites_and_datasets_are_separate(store):
+    store.upsert_frame(1, "production/HOUR", hourly_frame("2024-01-01", 3))
+
+    assert store.read_frame(2, "production/HOUR", datetime(2024, 1, 1), datetime(2024, 1, 2)).empty
+    assert store.read_frame(1, "production/DAY", datetime(2024, 1, 1), datetime(2024, 1, 2)).empty
+
+
+def test_iter_frames_reads_in_windows(store):
+    store.upsert_frame(1, "production/HOUR", hourly_frame("2024-01-01", 24 * 10))
+
+    frames = list(store.iter_frames(1, "production/HOUR", datetime(2024, 1, 1), datetime(2024, 1, 10, 23), window_days=3))
+    assert [len(f) for f in frames] == [72, 72, 72, 24]
+
+
+def test_missing_ranges_after_mark_fetched(store):
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 31, 23, 59, 59)
+    assert store.missing_ranges(1, KEYS, start, end) == [(start, end)]
+
+    store.mark_fetched(1, KEYS, datetime(2024, 1, 10), datetime(2024, 1, 20, 23, 59, 59), now=NOW)
+    assert store.missing_ranges(1, KEYS, start, end) == [
+        (start, datetime(2024, 1, 9, 23, 59, 59)), (datetime(2024, 1, 21), end)]
+
+    store.mark_fetched(1, KEYS, start, datetime(2024, 1, 9, 23, 59, 59), now=NOW) # Adjacent ranges merge
+    store.mark_fetched(1, KEYS, datetime(2024, 1, 21), end, now=NOW)
+    assert store.missing_ranges(1, KEYS, start, end) == []
+    assert store.missing_ranges(2, KEYS, start, end) == [(start, end)]
+
+
+def test_missing_ranges_is_the_union_over_coverage_keys(store):
+    keys = KEYS + [production_series("HOUR", "CONSUMPTION")]
+    store.mark_fetched(1, keys[:1], datetime(2024, 1, 1), datetime(2024, 1, 31, 23, 59, 59), now=NOW)
+    store.mark_fetched(1, keys[1:], datetime(2024, 1, 16), datetime(2024, 1, 31, 23, 59, 59), now=NOW)
+
+    assert store.missing_ranges(1, keys, datetime(2024, 1, 1), datetime(2024, 1, 31, 23, 59, 59)) == [
+        (datetime(2024, 1, 1), datetime(2024, 1, 15, 23, 59, 59))]
+
+
+def test_recent_data_is_not_marked_fetched(store):
+    store.mark_fetched(1, KEYS, NOW - timedelta(days=3), NOW, now=NOW)
+
+    assert store.missing_ranges(1, KEYS, NOW - timedelta(days=3), NOW) == [(NOW - timedelta(days=1, seconds=-1), NOW)]
+
+
+def test_upserts_bump_the_revision_of_the_months_written(store):
+    january, february = datetime(2024, 1, 1), datetime(2024, 2, 1)
+    assert store.month_revision(1, "production/HOUR", january) == 0
+
+    store.upsert_frame(1, "production/HOUR", hourly_frame("2024-01-31 22:00", 4)) # Ends in February
+    store.upsert_frame(1, "production/HOUR", hourly_frame("2024-01-10", 1))
+    assert store.month_revision(1, "production/HOUR", january) == 2
+    assert store.month_revision(1, "production/HOUR", february) == 1
+    assert store.month_revision(1, "production/DAY", january) == 0
@@ -52,9 +52,20 @@ class AppUI:
         self.time_unit_var = tk.StringVar(value="HOUR")
 
         self.file_format_var = tk.StringVar(value="csv")
+        self.parallel_fetch_var = tk.BooleanVar(value=True) # False = fetch export chunks one at a time
+        self.use_cache_var = tk.BooleanVar(value=True) # False = bypass the on-disk response cache for exports
+        self.incremental_sync_var = tk.BooleanVar(value=False) # True = only fetch data newer than the last export and append it
+        self.compact_mode_var = tk.BooleanVar(value=False) # True = store exported values as float32/categoricals to save memory
+        self.excel_sheet_per_month_var = tk.BooleanVar(value=False) # True = Excel exports get a sheet per month
+        self.use_store_var = tk.BooleanVar(value=False) # True = keep fetched data in the local time-series store and export from it
+        self.derive_time_units_var = tk.BooleanVar(value=False) # True = fetch HOUR production data once and also save DAY/WEEK/MONTH from it
+        self.partition_dataset_var = tk.BooleanVar(value=False) # True = Parquet/Feather exports go into SolarEdge_dataset/site_id=/data_type=/month=
+        self.fleet_filter_var = tk.StringVar(value="") # Fleet export: comma-separated site IDs or name parts; empty = every listed site
+        self.fleet_combined_var = tk.BooleanVar(value=False) # True = fleet export writes one file with a site_id column
         self.output_path_var = tk.StringVar(value=os.path.expanduser("~"))
 
         self.fetch_button = None # For data export
+        self.fleet_button = None # For fleet export
         self.cancel_button = None # For cancelling operations
 
         # Status elements (might be controlled by main app and passed or managed here)
@@ -223,10 +234,6 @@ class AppUI:
                      messagebox.showwarning("Invalid Site", f"'{selected_site_display_name}' is not a recognized site.")
                 return
 
-        if self.app.is_fetching: # Check main app's fetching status
-            # messagebox.showinfo("Busy", "An operation is already in progress. Site details will not be fetched now.")
-            return
-
         self.app.current_selected_site_id = site_id # Update current_selected_site_id in main app
 
         if self.site_details_tabview:
@@ -609,11 +616,36 @@ class AppUI:
         ffrf.grid(row=1,column=1,columnspan=2,sticky="w",pady=0)
         ctk.CTkRadioButton(ffrf,text="CSV",variable=self.file_format_var,value="csv").pack(side="left",padx=10,pady=0)
         ctk.CTkRadioButton(ffrf,text="Excel",variable=self.file_format_var,value="excel").pack(side="left",padx=10,pady=0)
+        ctk.CTkRadioButton(ffrf,text="Parquet",variable=self.file_format_var,value="parquet").pack(side="left",padx=10,pady=0)
+        ctk.CTkRadioButton(ffrf,text="Feather",variable=self.file_format_var,value="feather").pack(side="left",padx=10,pady=0)
 
         ctk.CTkLabel(parent_frame, text="Output Folder:").grid(row=2,column=0,sticky="w",padx=10,pady=2)
         # self.output_path_var is tk.StringVar initialized in __init__
         ctk.CTkEntry(parent_frame,textvariable=self.output_path_var,width=300).grid(row=2,column=1,sticky="we",padx=10,pady=2)
         ctk.CTkButton(parent_frame,text="Browse...",command=self.browse_output_folder,width=100).grid(row=2,column=2,sticky="w",padx=10,pady=2)
+
+        # self.parallel_fetch_var is tk.BooleanVar initialized in __init__
+        ctk.CTkCheckBox(parent_frame,text="Fetch export chunks in parallel (max 3 concurrent API calls)",variable=self.parallel_fetch_var).grid(row=3,column=0,columnspan=3,sticky="w",padx=10,pady=2)
+        # self.use_cache_var is tk.BooleanVar initialized in __init__
+        ctk.CTkCheckBox(parent_frame,text="Reuse cached API responses (historical data is cached permanently)",variable=self.use_cache_var).grid(row=4,column=0,columnspan=3,sticky="w",padx=10,pady=2)
+        # self.incremental_sync_var is tk.BooleanVar initialized in __init__
+        ctk.CTkCheckBox(parent_frame,text="Incremental sync (fetch only data since the last export and append to that file)",variable=self.incremental_sync_var).grid(row=5,column=0,columnspan=3,sticky="w",padx=10,pady=2)
+        # self.compact_mode_var is tk.BooleanVar initialized in __init__
+        ctk.CTkCheckBox(parent_frame,text="Compact mode (float32 values and categorical text columns for very large exports)",variable=self.compact_mode_var).grid(row=6,column=0,columnspan=3,sticky="w",padx=10,pady=2)
+        # self.partition_dataset_var is tk.BooleanVar initialized in __init__
+        ctk.CTkCheckBox(parent_frame,text="Parquet/Feather: add to a dataset partitioned by site, data type and month",variable=self.partition_dataset_var).grid(row=7,column=0,columnspan=3,sticky="w",padx=10,pady=2)
+        # self.excel_sheet_per_month_var is tk.BooleanVar initialized in __init__
+        ctk.CTkCheckBox(parent_frame,text="Excel: one sheet per month (sheets are always split at Excel's 1,048,576-row limit)",variable=self.excel_sheet_per_month_var).grid(row=8,column=0,columnspan=3,sticky="w",padx=10,pady=2)
+        # self.derive_time_units_var is tk.BooleanVar initialized in __init__
+        ctk.CTkCheckBox(parent_frame,text="Production: fetch HOUR data once and save HOUR, DAY, WEEK and MONTH files computed from it",variable=self.derive_time_units_var).grid(row=9,column=0,columnspan=3,sticky="w",padx=10,pady=2)
+        # self.use_store_var is tk.BooleanVar initialized in __init__
+        ctk.CTkCheckBox(parent_frame,text="Keep fetched data in the local time-series store and export from it (only missing ranges are fetched)",variable=self.use_store_var).grid(row=10,column=0,columnspan=3,sticky="w",padx=10,pady=2)
+
+        ctk.CTkLabel(parent_frame, text="Fleet Sites (IDs/names):").grid(row=11,column=0,sticky="w",padx=10,pady=2)
+        # self.fleet_filter_var is tk.StringVar initialized in __init__
+        ctk.CTkEntry(parent_frame,textvariable=self.fleet_filter_var,width=300).grid(row=11,column=1,columnspan=2,sticky="we",padx=10,pady=2)
+        # self.fleet_combined_var is tk.BooleanVar initialized in __init__
+        ctk.CTkCheckBox(parent_frame,text="Fleet export: one combined file for all sites (with a site_id column)",variable=self.fleet_combined_var).grid(row=12,column=0,columnspan=3,sticky="w",padx=10,pady=2)
         parent_frame.grid_columnconfigure(1,weight=1)
 
     def browse_output_folder(self):
@@ -635,6 +667,11 @@ class AppUI:
         # Or, more directly if SolarEdgeAPIApp refers to these as self.fetch_button
         self.app.fetch_button = self.fetch_button
 
+        # self.fleet_button is initialized to None in __init__
+        self.fleet_button = ctk.CTkButton(parent_frame,text="Fleet Export (All Sites Matching the Filter)",command=self.app.start_fleet_export_thread,font=ctk.CTkFont(size=14),height=34)
+        self.fleet_button.pack(pady=(0,10))
+        self.app.fleet_button = self.fleet_button
+
 
         # self.cancel_button is initialized to None in __init__
         self.cancel_button = ctk.CTkButton(parent_frame,text="Cancel Current Operation",command=self.app.cancel_fetch,font=ctk.CTkFont(size=14),height=30,fg_color="#D32F2F",hover_color="#C62828")
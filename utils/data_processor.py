@@ -1,38 +1,362 @@
+import logging
+import threading
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 # No specific from pandas import needed if using pd.DataFrame, pd.to_datetime, pd.merge
 
-def process_voltage_data(telemetries):
+# SolarEdge always sends local timestamps in this format
+SOLAREDGE_DATE_FORMAT="%Y-%m-%d %H:%M:%S"
+
+logger=logging.getLogger(__name__)
+
+def parse_solaredge_dates(values):
+    """
+    Parses API timestamps with the fixed SolarEdge format (no per-call format inference).
+    Falls back to inferring the format, with unparseable values as NaT, only if that fails.
+    """
+    try:
+        return pd.to_datetime(values,format=SOLAREDGE_DATE_FORMAT)
+    except (ValueError,TypeError):
+        return pd.to_datetime(values,errors='coerce')
+
+def compact_dataframe(df, float_rtol=1e-6, category_max_ratio=0.5):
+    """
+    Returns (compacted_df, report) where float64 columns become float32 if every value round-trips
+    within `float_rtol`, integer columns use the smallest integer type that fits, and string columns
+    with at most `category_max_ratio` distinct values per row become categoricals.
+    report is {"bytes_before", "bytes_after", "saved_pct"}.
+    """
+    bytes_before=int(df.memory_usage(deep=True).sum())
+    compacted={}
+    for col in df.columns:
+        series=df[col]
+        kind=series.dtype.kind
+        if kind=='f' and series.dtype!=np.float32:
+            as_float32=series.astype(np.float32)
+            if np.allclose(as_float32.to_numpy(dtype=np.float64),series.to_numpy(),rtol=float_rtol,atol=0,equal_nan=True):
+                series=as_float32
+        elif kind in 'iu':
+            series=pd.to_numeric(series,downcast='integer' if kind=='i' else 'unsigned')
+        elif (kind=='O' or pd.api.types.is_string_dtype(series.dtype)) and len(series):
+            non_null=series.dropna()
+            if len(non_null) and non_null.map(type).eq(str).all() and series.nunique()<=category_max_ratio*len(series):
+                series=series.astype('category')
+        compacted[col]=series
+    compact_df=pd.DataFrame(compacted,index=df.index)
+    bytes_after=int(compact_df.memory_usage(deep=True).sum())
+    saved_pct=(1-bytes_after/bytes_before)*100 if bytes_before else 0.0
+    return compact_df,{"bytes_before":bytes_before,"bytes_after":bytes_after,"saved_pct":saved_pct}
+
+def _compact_with_report(df, label):
+    df,report=compact_dataframe(df)
+    logger.debug("Compact %s frame (%d rows): %.0f KiB -> %.0f KiB (%.0f%% saved)",label,len(df),
+                 report['bytes_before']/1024,report['bytes_after']/1024,report['saved_pct'])
+    return df
+
+def _concat_frames(frames):
+    """pd.concat that keeps categorical columns categorical when the frames' categories differ."""
+    category_columns=set()
+    for frame in frames:
+        category_columns.update(c for c in frame.columns if isinstance(frame[c].dtype,pd.CategoricalDtype))
+    for col in category_columns:
+        if not all(col in f.columns and isinstance(f[col].dtype,pd.CategoricalDtype) for f in frames): continue
+        categories=union_categoricals([f[col] for f in frames]).categories
+        frames=[f.assign(**{col:f[col].cat.set_categories(categories)}) for f in frames]
+    return pd.concat(frames,ignore_index=True,sort=False)
+
+# Nested telemetry schemas learned so far, per inverter model (see telemetry_schema)
+TELEMETRY_SCHEMA_SAMPLE_SIZE=50
+_telemetry_schemas={}
+_telemetry_schemas_lock=threading.Lock()
+
+def learn_telemetry_schema(records, schema=None):
+    """
+    Returns {field: {leaf: "num" | "text" | nested schema}} for the object-valued fields of telemetry
+    records (e.g. {"L1Data": {"acVoltage": "num", ...}}), merged into `schema` if one is given.
+    Only the records passed in are inspected; telemetry_schema() feeds it a small sample.
+    """
+    schema=schema if schema is not None else {}
+    for record in records:
+        for key,value in record.items():
+            if isinstance(value,dict):
+                sub_schema=schema.get(key)
+                schema[key]=_learn_leaves(value,sub_schema if isinstance(sub_schema,dict) else {})
+    return schema
+
+def _learn_leaves(record, schema):
+    for key,value in record.items():
+        if isinstance(value,dict):
+            sub_schema=schema.get(key)
+            schema[key]=_learn_leaves(value,sub_schema if isinstance(sub_schema,dict) else {})
+        elif value is not None and (key not in schema or schema[key]=="num"):
+            schema[key]="num" if isinstance(value,(int,float)) and not isinstance(value,bool) else "text"
+    return schema
+
+def telemetry_schema(inverter_model, records):
+    """
+    The cached nested-field schema for an inverter model, learned from the first
+    TELEMETRY_SCHEMA_SAMPLE_SIZE records the first time the model is seen.
+    Telemetries of one model always have the same layout, so later batches and other sites reuse it;
+    fields the sample did not show are added by flatten_telemetry when they turn up.
+    """
+    key=inverter_model or "unknown"
+    with _telemetry_schemas_lock:
+        schema=_telemetry_schemas.get(key)
+        if schema is None:
+            schema=learn_telemetry_schema(records[:TELEMETRY_SCHEMA_SAMPLE_SIZE])
+            _telemetry_schemas[key]=schema
+    return schema
+
+def _expand_nested_column(series, schema, prefix):
+    """Expands one column of dicts into typed `prefix.leaf` columns; returns a list of (name, series)."""
+    present=series.dropna()
+    expanded=pd.DataFrame(present.tolist(),index=present.index) if len(present) else pd.DataFrame(index=present.index)
+    new_leaves=[c for c in expanded.columns if c not in schema]
+    if new_leaves: # A field the sample did not show: learn it once, from this column
+        with _telemetry_schemas_lock:
+            for leaf in new_leaves:
+                sample=expanded[leaf].dropna()
+                value=sample.iloc[0] if len(sample) else None
+                if isinstance(value,dict):
+                    schema[leaf]=learn_telemetry_schema([{leaf:v} for v in sample.iloc[:TELEMETRY_SCHEMA_SAMPLE_SIZE]])[leaf]
+                else:
+                    schema[leaf]="num" if value is None or pd.api.types.is_numeric_dtype(sample.dtype) else "text"
+    columns=[]
+    for leaf,kind in list(schema.items()):
+        name=f"{prefix}.{leaf}"
+        values=expanded[leaf].reindex(series.index) if leaf in expanded.columns else pd.Series(np.nan,index=series.index)
+        if isinstance(kind,dict):
+            columns.extend(_expand_nested_column(values,kind,name))
+        elif kind=="num":
+            columns.append((name,pd.to_numeric(values,errors='coerce')))
+        else:
+            columns.append((name,values))
+    return columns
+
+def _learn_new_nested_columns(df, schema):
+    """Adds the columns of dicts that `schema` does not know yet (e.g. L2Data missing from the sample) to it."""
+    for col in df.columns:
+        if col in schema or df[col].dtype!=object: continue
+        first=df[col].first_valid_index()
+        if first is None or not isinstance(df[col].at[first],dict): continue
+        with _telemetry_schemas_lock:
+            if col not in schema: # Another thread may have learned it meanwhile
+                sample=df[col].dropna().iloc[:TELEMETRY_SCHEMA_SAMPLE_SIZE]
+                schema[col]=learn_telemetry_schema([{col:v} for v in sample])[col]
+
+def flatten_telemetry(df, schema):
+    """
+    Replaces the nested object columns (L1Data, L2Data, ...) with one typed column per leaf, named like
+    `L1Data.acVoltage`, in place of the original column. Nested columns missing from `schema` are learned
+    into it first. Each nested column is expanded with a single DataFrame construction over its dicts
+    instead of walking the rows in Python.
+    """
+    _learn_new_nested_columns(df,schema)
+    if not schema or not any(c in schema for c in df.columns): return df
+    columns=[]
+    for col in df.columns:
+        if col in schema:
+            columns.extend(_expand_nested_column(df[col],schema[col],col))
+        else:
+            columns.append((col,df[col]))
+    return pd.DataFrame(dict(columns),index=df.index)
+
+def inverter_model_for_serial(inventory, serial_number):
+    """Looks up an inverter's model in a site inventory (the "Inventory" object of inventory.json); None if not listed."""
+    if not inventory or not serial_number: return None
+    for inverter in inventory.get("inverters") or []:
+        if str(inverter.get("serialNumber",inverter.get("SN",""))).upper()==str(serial_number).upper():
+            return inverter.get("model")
+    return None
+
+def _telemetry_frame(records, inverter_model):
+    df=pd.DataFrame(records)
+    return flatten_telemetry(df,telemetry_schema(inverter_model,records))
+
+def process_voltage_data(telemetries, compact=False, inverter_model=None):
     if not telemetries: return pd.DataFrame()
-    df=pd.DataFrame(telemetries)
+    df=_telemetry_frame(telemetries,inverter_model)
     if 'date' not in df.columns: return df
-    df['date']=pd.to_datetime(df['date'],errors='coerce')
+    df['date']=parse_solaredge_dates(df['date'])
     df=df.dropna(subset=['date'])
     df=df.fillna(0).sort_values('date').reset_index(drop=True)
     if 'date' in df.columns: # Re-check because previous dropna might remove it if all dates were bad
         df=df[['date']+[c for c in df.columns if c!='date']]
+    if compact: df=_compact_with_report(df,"voltage")
     return df
 
-def process_production_data(meters_data, time_unit):
+def process_voltage_data_stream(telemetry_batches, compact=False, inverter_model=None):
+    """
+    Streaming counterpart of process_voltage_data for batches yielded by
+    SolarEdgeClient.iter_equipment_telemetries. Each batch is converted to a small columnar frame
+    straight away, so the raw dicts of only one batch are alive at a time. Produces the same
+    frame as process_voltage_data on the concatenated telemetries.
+    """
+    batch_frames=[]
+    for batch in telemetry_batches:
+        if not batch: continue
+        batch_df=_telemetry_frame(batch,inverter_model)
+        if 'date' in batch_df.columns:
+            batch_df['date']=parse_solaredge_dates(batch_df['date'])
+        batch_frames.append(batch_df)
+    if not batch_frames: return pd.DataFrame()
+    df=pd.concat(batch_frames,ignore_index=True,sort=False) if len(batch_frames)>1 else batch_frames[0]
+    del batch_frames
+    if 'date' not in df.columns: return df
+    df=df.dropna(subset=['date'])
+    df=df.fillna(0).sort_values('date').reset_index(drop=True)
+    if 'date' in df.columns:
+        df=df[['date']+[c for c in df.columns if c!='date']]
+    if compact: df=_compact_with_report(df,"voltage")
+    return df
+
+class ChunkAccumulator:
+    """
+    Collects the processed frames of time-ordered export chunks and builds the final frame with a single concat.
+
+    Chunks from request_planner.plan_calls arrive in time order and can only overlap at their edges, so a
+    row is a duplicate exactly when its date is not after the last date already collected. Each chunk
+    is trimmed against that watermark on arrival, which keeps the whole export linear instead of
+    re-concatenating and re-sorting everything collected so far for every chunk.
+
+    With keep_frames=False only the trimming is done: add() returns each chunk's new rows for the
+    caller to stream to a file_exporter.ExportWriter, and nothing is retained.
+    """
+    def __init__(self, keep_frames=True):
+        self._frames=[]
+        self._last_date=None
+        self.keep_frames=keep_frames
+        self.row_count=0
+
+    def add(self, df):
+        """Trims df against the rows already seen and returns the new rows (None if there are none)."""
+        if df is None or df.empty: return None
+        if 'date' in df.columns:
+            if not df['date'].is_monotonic_increasing:
+                df=df.sort_values('date')
+            if self._last_date is not None:
+                df=df[df['date']>self._last_date]
+            df=df.drop_duplicates(subset=['date'])
+            if df.empty: return None
+            self._last_date=df['date'].iloc[-1]
+        if self.keep_frames: self._frames.append(df)
+        self.row_count+=len(df)
+        return df
+
+    def result(self):
+        """Returns the combined frame, or None if no rows were added."""
+        if not self._frames: return None
+        if len(self._frames)==1:
+            return self._frames[0].reset_index(drop=True)
+        return _concat_frames(self._frames)
+
+def process_production_data(meters_data, time_unit, compact=False):
+    """
+    Builds one wide frame (date + one column per meter type) from energyDetails meters.
+
+    Single pass: the (meter, date, value) triples of every meter are collected into flat arrays,
+    the dates are parsed once, and the values are scattered into a (date x meter) grid in one step,
+    instead of building and outer-merging a frame per meter. Output columns, order and dtypes match
+    the former merge chain: meters in response order, dates sorted, missing values as 0.
+    If a meter type appears twice, the first entry's values are used.
+    """
     if not meters_data: return pd.DataFrame()
-    all_meter_dfs=[]
+    meter_types=[]
+    meter_is_int=[]
+    date_parts=[]
+    value_parts=[]
     for meter_entry in meters_data:
         meter_type, values = meter_entry.get('type'), meter_entry.get('values')
         if not meter_type or not values: continue
+        if not any('date' in v for v in values) or not any('value' in v for v in values): continue
+        if meter_type in meter_types: continue
+
+        meter_values=np.asarray([v.get('value') for v in values])
+        meter_is_int.append(meter_values.dtype.kind in 'iu')
+        if meter_values.dtype.kind!='f':
+            meter_values=pd.to_numeric(pd.Series(meter_values,dtype=object),errors='coerce').to_numpy(dtype=np.float64)
+        meter_types.append(meter_type)
+        date_parts.append([v.get('date') for v in values])
+        value_parts.append(meter_values)
+
+    if not meter_types: return pd.DataFrame()
+
+    lengths=np.array([len(d) for d in date_parts])
+    meter_codes=np.repeat(np.arange(len(meter_types)),lengths)
+    all_values=np.concatenate(value_parts)
+    all_dates=parse_solaredge_dates(pd.Series([d for part in date_parts for d in part],dtype=object))
+
+    valid=all_dates.notna().to_numpy()
+    date_codes,unique_dates=pd.factorize(all_dates[valid],sort=True)
+    # Reverse so that, for a date repeated within a meter, the first value is the one that sticks
+    grid=np.full((len(unique_dates),len(meter_types)),np.nan)
+    grid[date_codes[::-1],meter_codes[valid][::-1]]=all_values[valid][::-1]
+
+    has_missing=np.isnan(grid).any(axis=0)
+    result_df=pd.DataFrame({'date':unique_dates})
+    for mi,meter_type in enumerate(meter_types):
+        column=np.nan_to_num(grid[:,mi],nan=0.0)
+        # The merge chain kept integer columns as int64 when no gaps were introduced
+        result_df[meter_type]=column.astype(np.int64) if meter_is_int[mi] and not has_missing[mi] else column
+    if compact: result_df=_compact_with_report(result_df,"production")
+    return result_df
+
+# Energy time units from finest to coarsest; each one can be derived locally from any finer one
+ENERGY_TIME_UNITS=("QUARTER_OF_AN_HOUR","HOUR","DAY","WEEK","MONTH","YEAR")
+
+def coarser_time_units(time_unit, up_to="MONTH"):
+    """The energy time units strictly coarser than time_unit, up to and including up_to."""
+    start=ENERGY_TIME_UNITS.index(time_unit)+1
+    return list(ENERGY_TIME_UNITS[start:ENERGY_TIME_UNITS.index(up_to)+1])
 
-        meter_df=pd.DataFrame(values)
-        if 'date' not in meter_df.columns or 'value' not in meter_df.columns: continue
+def energy_bucket_starts(dates, time_unit):
+    """
+    Calendar-aligned start of the time_unit bucket containing each timestamp, which is how energyDetails
+    labels its values: the quarter hour, the hour, midnight, the Monday of the week, the 1st of the month
+    or 1 January.
+    """
+    if time_unit=="QUARTER_OF_AN_HOUR": return dates.dt.floor("15min")
+    if time_unit=="HOUR": return dates.dt.floor("h")
+    days=dates.dt.normalize()
+    if time_unit=="DAY": return days
+    if time_unit=="WEEK": return days-pd.to_timedelta(days.dt.weekday,unit="D")
+    if time_unit=="MONTH": return days-pd.to_timedelta(days.dt.day-1,unit="D")
+    if time_unit=="YEAR": return days-pd.to_timedelta(days.dt.dayofyear-1,unit="D")
+    raise ValueError(f"Unsupported time unit: {time_unit}")
 
-        meter_df['date']=pd.to_datetime(meter_df['date'],errors='coerce')
-        meter_df=meter_df.dropna(subset=['date'])
-        meter_df.rename(columns={'value':meter_type},inplace=True)
-        meter_df[meter_type] = meter_df[meter_type].fillna(0)
-        all_meter_dfs.append(meter_df[['date',meter_type]])
+def resample_energy(df, time_unit):
+    """
+    Sums the meter columns of a process_production_data frame into coarser time_unit buckets.
+    energyDetails values are energy per bucket (Wh), so a coarser bucket is the sum of the finer ones it
+    contains. Buckets at the edges of the data only cover the part of the period that was fetched, as the
+    API's own values do for a range that starts or ends inside a period.
+    """
+    if df is None or df.empty or 'date' not in df.columns: return df
+    buckets=energy_bucket_starts(df['date'],time_unit)
+    result_df=df.drop(columns='date').groupby(buckets.to_numpy(),sort=True).sum()
+    result_df.insert(0,'date',result_df.index.astype(df['date'].dtype))
+    return result_df.reset_index(drop=True)
 
-    if not all_meter_dfs: return pd.DataFrame()
+class EnergyResampler:
+    """
+    Incremental resample_energy for time-ordered export chunks.
+    add() returns the buckets that are complete; the newest bucket is held back because the next chunk may
+    still add to it (a week or month usually spans two chunks), and flush() returns it at the end.
+    """
+    def __init__(self, time_unit):
+        self.time_unit=time_unit
+        self._pending=None
 
-    result_df = all_meter_dfs[0]
-    for i in range(1,len(all_meter_dfs)):
-        if 'date' not in all_meter_dfs[i].columns: continue
-        result_df=pd.merge(result_df,all_meter_dfs[i],on='date',how='outer')
+    def add(self, df):
+        if df is None or df.empty: return None
+        resampled=resample_energy(df,self.time_unit)
+        if self._pending is not None:
+            resampled=resample_energy(pd.concat([self._pending,resampled],ignore_index=True,sort=False),self.time_unit)
+        self._pending=resampled.iloc[[-1]]
+        completed=resampled.iloc[:-1]
+        return completed if not completed.empty else None
 
-    return result_df.fillna(0).sort_values('date').reset_index(drop=True)
+    def flush(self):
+        pending,self._pending=self._pending,None
+        return pending
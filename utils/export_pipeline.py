@@ -0,0 +1,366 @@
+"""
+The fetch -> process -> export pipeline behind "Fetch and Save Export Data", without any GUI dependency.
+
+run_export() is used by SolarEdgeAPIApp (which supplies its widgets' values and callbacks that update the
+status bar) and by the headless solaredge_cli.py. This module must not import customtkinter, tkinter or
+tkcalendar, so exports can run from cron on servers without a display.
+"""
+import logging
+import os
+from datetime import datetime
+
+from api.json_stream import JSONArrayNotFoundError
+from utils import data_processor
+from utils import file_exporter
+from utils import helpers
+from utils import request_planner
+from utils import request_scheduler
+from utils import sync_state
+from utils.timeseries_store import production_series, voltage_dataset
+
+ENERGY_METERS = ("PRODUCTION", "CONSUMPTION", "SELFCONSUMPTION", "FEEDIN", "PURCHASED")
+EXPORT_TIME_UNITS = ("HOUR", "DAY", "WEEK", "MONTH")
+
+
+API_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+logger = logging.getLogger(__name__)
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+def _export_scope(site_id, data_type, start_dt, end_dt, time_unit, meters, equipment_sn, derive_time_units,
+                  incremental, sync_state_store):
+    """
+    What run_export fetches for its arguments: {"time_unit", "derive_units", "sync_id", "sync_entry", "resume_from",
+    "start", "end", "store_dataset", "store_columns", "coverage_keys"}.
+    """
+    time_unit = time_unit if data_type == "production" else None
+    # Derived time units: fetch HOUR data once and compute DAY/WEEK/MONTH locally (new exports only)
+    derive_units = data_type == "production" and derive_time_units and not incremental
+    if derive_units: time_unit = "HOUR"
+    # Incremental sync: continue from the last exported timestamp up to now and append to the previous file
+    sync_id = sync_state.sync_key(site_id, data_type, equipment_sn if data_type == "voltage" else meters, time_unit)
+    sync_entry = sync_state_store.get(sync_id) if incremental and sync_state_store is not None else None
+    resume_from = sync_state.incremental_start(sync_entry, data_type)
+    if resume_from is not None:
+        start_dt, end_dt = resume_from, datetime.now().replace(microsecond=0)
+    if data_type == "voltage":
+        store_dataset, store_columns = voltage_dataset(equipment_sn), None
+        coverage_keys = [store_dataset]
+    else:
+        store_dataset, store_columns = f"production/{time_unit}", meters
+        coverage_keys = [production_series(time_unit, m) for m in meters]
+    return {"time_unit": time_unit, "derive_units": derive_units, "sync_id": sync_id, "sync_entry": sync_entry,
+            "resume_from": resume_from, "start": start_dt, "end": end_dt, "store_dataset": store_dataset,
+            "store_columns": store_columns, "coverage_keys": coverage_keys}
+
+
+def _plan_fetch(api_client, api_key, site_id, data_type, scope, meters, equipment_sn, timeseries_store, check_if_cancelled):
+    """RequestPlan for scope's range: what timeseries_store already holds is skipped, cached calls are marked."""
+    start_dt, end_dt, time_unit = scope["start"], scope["end"], scope["time_unit"]
+    if start_dt > end_dt:
+        fetch_ranges = []
+    elif timeseries_store is not None:
+        fetch_ranges = timeseries_store.missing_ranges(site_id, scope["coverage_keys"], start_dt, end_dt)
+    else:
+        fetch_ranges = [(start_dt, end_dt)]
+    calls = []
+    for cs, ce in request_planner.plan_calls(data_type, time_unit, fetch_ranges, check_if_cancelled):
+        sts, ets = cs.strftime(API_TIME_FORMAT), ce.strftime(API_TIME_FORMAT)
+        if data_type == "voltage":
+            request = api_client.equipment_data_request(api_key, site_id, equipment_sn, sts, ets)
+        else:
+            request = api_client.energy_details_request(api_key, site_id, sts, ets, ",".join(meters), time_unit)
+        calls.append(request_planner.PlannedCall(cs, ce, api_client.is_cached(*request)))
+    quota_left = min(api_client.rate_limiter.remaining_quota(api_key, site_id).values()) if api_client.rate_limiter else None
+    return request_planner.RequestPlan(data_type, time_unit, calls, meter_count=len(meters), quota_left=quota_left)
+
+
+def plan_export(api_client, api_key, site_id, data_type, start_dt, end_dt, time_unit=None, meters=None, equipment_sn=None,
+                derive_time_units=False, incremental=False, sync_state_store=None, timeseries_store=None,
+                check_if_cancelled_callback=None, **export_options):
+    """
+    Dry run of run_export with the same arguments: returns the request_planner.RequestPlan of the API calls it
+    would make (the same calls, in the same order), without making any. Options that do not change the requests,
+    such as file_format or the callbacks, are accepted and ignored.
+    """
+    meters = list(meters or [])
+    scope = _export_scope(site_id, data_type, start_dt, end_dt, time_unit, meters, equipment_sn, derive_time_units,
+                          incremental, sync_state_store)
+    return _plan_fetch(api_client, api_key, site_id, data_type, scope, meters, equipment_sn, timeseries_store,
+                       check_if_cancelled_callback or _noop)
+
+
+def run_export(api_client, api_key, site_id, data_type, start_dt, end_dt, output_path, file_format="csv",
+               time_unit=None, meters=None, equipment_sn=None, inverter_model=None,
+               max_workers=helpers.MAX_CONCURRENT_API_REQUESTS, compact=False, partitioned=False,
+               excel_sheet_per_month=False, derive_time_units=False, incremental=False, sync_state_store=None,
+               timeseries_store=None, segment_store=None, file_label=None, scheduler=None, priority=None,
+               check_if_cancelled_callback=None, status_callback=None, progress_callback=None, warning_callback=None):
+    """
+    Fetches one site's production or voltage data for [start_dt, end_dt] and saves it to output_path.
+
+    Args:
+        api_client (SolarEdgeClient): Client used for the API calls (its cache and rate limiter apply).
+        api_key (str): Account API key.
+        site_id: Site to export.
+        data_type (str): "production" (energyDetails of `meters` at `time_unit`) or "voltage" (telemetry of `equipment_sn`).
+        start_dt, end_dt (datetime): Export range, inclusive.
+        output_path (str): Folder the export is written to.
+        file_format (str): One of file_exporter.EXPORT_FORMATS.
+        inverter_model (str, optional): Model of equipment_sn, used to share the telemetry schema cache; defaults to the serial.
+        max_workers (int): Chunks fetched concurrently; 1 fetches them one at a time.
+        derive_time_units (bool): For production, fetch HOUR data and also save DAY/WEEK/MONTH files computed from it.
+            Ignored for incremental appends.
+        incremental (bool): Continue from the last run recorded in sync_state_store and append to its file.
+        timeseries_store (TimeSeriesStore, optional): Fetch only what the store is missing and export from the store.
+        segment_store (SegmentStore, optional): Read the store's history through sealed monthly segments.
+        file_label (str, optional): Data type part of the output file name; defaults to data_type.
+        scheduler (RequestScheduler, optional): Queue the chunk requests there, at `priority` (default
+            PRIORITY_EXPORT), instead of on a private pool of max_workers threads.
+        check_if_cancelled_callback: Raises OperationCancelledError when the export should stop.
+        status_callback(message): Progress messages. May be called from worker threads.
+        progress_callback(fraction): Overall progress from 0 to 1, or None while the amount of work is unknown.
+            May be called from worker threads.
+        warning_callback(title, message): Data or API warnings about the first chunk.
+
+    Returns:
+        dict: {"status", "saved_path", "message", "records", "derived_files", "start", "end", "resume_from", "quota_left"}.
+            status is "saved", "up_to_date", "no_new_data", "no_intervals", "no_data" or "save_error";
+            message is the exporter's message (e.g. a CSV fallback or Excel row-limit note), if any.
+
+    Raises:
+        OperationCancelledError, requests.exceptions.RequestException and processing errors; a partially written
+        export file is removed first.
+    """
+    check_if_cancelled = check_if_cancelled_callback or _noop
+    status = status_callback or _noop
+    progress = progress_callback or _noop
+    warn = warning_callback or _noop
+    meters = list(meters or [])
+    scope = _export_scope(site_id, data_type, start_dt, end_dt, time_unit, meters, equipment_sn, derive_time_units,
+                          incremental, sync_state_store)
+    time_unit, derive_units = scope["time_unit"], scope["derive_units"]
+    sync_id, sync_entry, resume_from = scope["sync_id"], scope["sync_entry"], scope["resume_from"]
+    start_dt, end_dt = scope["start"], scope["end"]
+    result = {"status": None, "saved_path": None, "message": None, "records": 0, "derived_files": [],
+              "start": start_dt, "end": end_dt, "resume_from": resume_from, "quota_left": None}
+    if resume_from is not None:
+        logger.info("Incremental sync for %s: fetching %s to %s, appending to %s", sync_id, start_dt, end_dt, sync_entry['output_file'])
+        if start_dt > end_dt:
+            result["status"] = "up_to_date"
+            return result
+
+    status("Calculating export chunks...")
+    progress(None)
+
+    # Local store: only the ranges it does not hold yet are fetched, and the export is then read back from it
+    store = timeseries_store
+    store_dataset, store_columns, coverage_keys = scope["store_dataset"], scope["store_columns"], scope["coverage_keys"]
+    plan = _plan_fetch(api_client, api_key, site_id, data_type, scope, meters, equipment_sn, store, check_if_cancelled)
+    date_chunks = plan.date_chunks
+
+    num_chunks = len(date_chunks)
+    if num_chunks == 0 and store is None:
+        result["status"] = "no_intervals"
+        return result
+
+    logger.info("Site %s, %s to %s%s: planned %s", site_id, start_dt, end_dt,
+                " (only what the local store is missing)" if store is not None else "", plan.summary())
+    for i, call in enumerate(plan.calls):
+        logger.debug("  Chunk %d: %s to %s (%d days)%s", i+1, call.start, call.end, (call.end - call.start).days + 1,
+                     " (cached)" if call.cached else "")
+
+    status(f"Preparing {num_chunks} export requests...")
+    progress(0.1)
+
+    # Nested telemetry schemas are cached per inverter model; fall back to the serial if the model is unknown
+    if data_type == "voltage":
+        inverter_model = inverter_model or equipment_sn
+
+    def fetch_chunk(ci, cs, ce):
+        # Runs on a worker thread when max_workers > 1 or a scheduler is used
+        sts=cs.strftime(API_TIME_FORMAT)
+        ets=ce.strftime(API_TIME_FORMAT)
+        ad=None
+        df=None
+        if data_type=="voltage":
+            # Telemetry responses can be large: decode them incrementally instead of holding the whole document.
+            # The streamed body is not kept, so `ad` is a summary with the same shape for the checks below.
+            try:
+                df = data_processor.process_voltage_data_stream(api_client.iter_equipment_telemetries(
+                    api_key=api_key, site_id=site_id, equipment_sn=equipment_sn, start_time_str=sts, end_time_str=ets
+                ), compact=compact, inverter_model=inverter_model)
+                ad = {"data": {"telemetries": []}}
+            except JSONArrayNotFoundError:
+                ad = {"data": {}}
+        else:
+            ad = api_client.get_energy_details(
+                api_key=api_key, site_id=site_id, start_time_str=sts, end_time_str=ets,
+                meters_str=",".join(meters), time_unit=time_unit
+            )
+            if ad and "energyDetails" in ad and "meters" in ad["energyDetails"]:
+                df = data_processor.process_production_data(ad["energyDetails"]["meters"],ad["energyDetails"]["timeUnit"],compact=compact)
+        return ad, df
+
+    def on_chunk_done(done_count, total_count):
+        status(f"Fetched export chunk {done_count}/{total_count}...")
+        progress(0.1+(done_count/total_count)*0.8)
+
+    # New exports are streamed to disk chunk by chunk; incremental appends are small and are collected first
+    chunk_accumulator=data_processor.ChunkAccumulator(keep_frames=resume_from is not None)
+    export_writer=None
+    derived_writers={} # time unit -> (EnergyResampler, ExportWriter) when derive_units
+    pending_df=None # Newest chunk is written last so incremental sync can hold back its final bucket
+    adws=False
+    store_samples_written=store_rows_read=0
+    try:
+        if resume_from is None:
+            file_label = file_label or data_type
+            for unit in [time_unit]+(data_processor.coarser_time_units(time_unit) if derive_units else []):
+                writer = file_exporter.open_export_writer(
+                    output_path=output_path, site_id=site_id, data_type=f"{file_label}_{unit}" if derive_units else file_label,
+                    start_date_obj=start_dt.date(), end_date_obj=end_dt.date(), file_format=file_format,
+                    partitioned=partitioned, excel_sheet_per_month=excel_sheet_per_month
+                )
+                if export_writer is None: export_writer = writer
+                else: derived_writers[unit] = (data_processor.EnergyResampler(unit), writer)
+
+        def write_export_rows(rows):
+            export_writer.append(rows)
+            for resampler, writer in derived_writers.values():
+                writer.append(resampler.add(rows))
+
+        def collect_rows(df):
+            nonlocal pending_df
+            new_rows=chunk_accumulator.add(df)
+            if export_writer is not None and new_rows is not None:
+                if pending_df is not None: write_export_rows(pending_df)
+                pending_df=new_rows
+
+        if scheduler is not None:
+            status(f"Queued {num_chunks} export chunks...")
+            chunk_results = scheduler.fetch_chunks(
+                site_id, date_chunks, fetch_chunk, priority=request_scheduler.PRIORITY_EXPORT if priority is None else priority,
+                api_key=api_key, check_if_cancelled_callback=check_if_cancelled, chunk_done_callback=on_chunk_done
+            )
+        else:
+            status(f"Fetching {num_chunks} export chunks ({max_workers} at a time)...")
+            chunk_results = helpers.fetch_chunks_concurrently(
+                date_chunks, fetch_chunk, max_workers=max_workers,
+                check_if_cancelled_callback=check_if_cancelled, chunk_done_callback=on_chunk_done
+            )
+        for ci,cs,ce,(ad,df) in chunk_results:
+            check_if_cancelled()
+            # Only a response of the expected shape (even with no values) tells the store the range holds nothing more
+            if data_type=="voltage":
+                well_formed=bool(ad) and isinstance(ad.get("data"),dict) and "telemetries" in ad["data"]
+                tel=ad["data"]["telemetries"] if well_formed else None
+                if df is not None and df.empty and not tel and not adws:
+                    status(f"Chunk {ci+1} (V): No telemetries.")
+                    adws=True
+                    if ci==0: warn("Data Warn","Chunk (V): No telemetries.")
+                elif ad and not (df is not None and not df.empty):
+                    status(f"Chunk {ci+1} (V): Bad API resp.")
+                    adws=True
+                    if ci==0: warn("API Warn","Chunk (V): Bad structure.")
+            else:
+                well_formed=bool(ad) and isinstance(ad.get("energyDetails"),dict) and "meters" in ad["energyDetails"]
+                if df is not None and df.empty and not adws and \
+                   (not ad or not ad.get("energyDetails") or not ad["energyDetails"].get("meters") or \
+                    all(not m.get("values") for m in ad["energyDetails"]["meters"])):
+                    status(f"Chunk {ci+1}(P): No meter values.")
+                    adws=True
+                    if ci==0: warn("Data Warn","Chunk(P):No meter vals.")
+                elif ad and not (df is not None and not df.empty):
+                    status(f"Chunk {ci+1}(P):Bad API resp.")
+                    adws=True
+                    if ci==0: warn("API Warn","Chunk(P):Bad struct.")
+            if (df is None or df.empty) and not adws and ad:
+                status(f"Chunk {ci+1} processed,0 pts.")
+            if df is not None and not df.empty:
+                adws=False
+                if store is not None: store_samples_written += store.upsert_frame(site_id, store_dataset, df)
+                else: collect_rows(df)
+            if store is not None and well_formed:
+                store.mark_fetched(site_id, coverage_keys, cs, ce)
+        if api_client.cache is not None:
+            logger.debug("Response cache: %d hits, %d misses so far", api_client.cache.hits, api_client.cache.misses)
+        if store is not None:
+            status("Reading export from the local store...")
+            if store_columns is not None:
+                # Responses name the meters "Production", "SelfConsumption", ...; requests use "PRODUCTION", "SELFCONSUMPTION", ...
+                store_columns = [c for c in store.columns(site_id, store_dataset) if c.upper() in meters]
+            history_reader = store
+            if segment_store is not None:
+                sealed = segment_store.seal_from_store(site_id, store_dataset, start_dt, end_dt, coverage_keys=coverage_keys)
+                if sealed: logger.debug("Sealed %d monthly segment(s) for %s", len(sealed), store_dataset)
+                history_reader = segment_store
+            for frame in history_reader.iter_frames(site_id, store_dataset, start_dt, end_dt, columns=store_columns):
+                check_if_cancelled()
+                store_rows_read += len(frame)
+                collect_rows(frame)
+            logger.debug("Local store: wrote %d samples, read back %d rows of %s", store_samples_written, store_rows_read, store_dataset)
+        check_if_cancelled()
+        if chunk_accumulator.row_count==0:
+            result["status"] = "no_new_data" if resume_from is not None else "no_data"
+            return result
+        status("Saving export file...")
+        progress(0.9)
+        sync_watermark = None
+        if resume_from is not None:
+            cdf=chunk_accumulator.result()
+            cdf, sync_watermark = sync_state.split_final_rows(cdf, data_type)
+            total_records = len(cdf)
+            if total_records == 0: # Only the held-back bucket came back: nothing to append, the watermark stays
+                result["status"] = "no_new_data"
+                return result
+            saved_fp, export_message = file_exporter.append_data_to_file(cdf, sync_entry["output_file"])
+        else:
+            if incremental:
+                pending_df, sync_watermark = sync_state.split_final_rows(pending_df, data_type)
+            write_export_rows(pending_df)
+            total_records = export_writer.rows_written
+            saved_fp, export_message = export_writer.close()
+        for unit, (resampler, writer) in derived_writers.items():
+            writer.append(resampler.flush())
+            derived_fp, derived_message = writer.close()
+            if derived_fp: result["derived_files"].append(derived_fp)
+            else: logger.warning("Could not save derived %s export: %s", unit, derived_message)
+        if incremental and sync_state_store is not None and saved_fp and sync_watermark is not None:
+            sync_state_store.update(sync_id, sync_watermark, saved_fp)
+        result.update(status="saved" if saved_fp else "save_error", saved_path=saved_fp,
+                      message=export_message, records=total_records)
+        if saved_fp:
+            if api_client.rate_limiter:
+                result["quota_left"] = api_client.rate_limiter.remaining_quota(api_key, site_id)
+            progress(1.0)
+        return result
+    finally:
+        for writer in [export_writer]+[w for _, w in derived_writers.values()]:
+            if writer is not None and not writer.closed:
+                writer.abort() # Cancelled or failed: do not leave a partial file behind
+
+
+def summarize_export(result):
+    """One-line description of a run_export result, as shown in the status bar."""
+    if result["status"] == "up_to_date":
+        return "Export is already up to date."
+    if result["status"] == "no_new_data":
+        return f"No new data since last sync ({result['resume_from'].strftime('%Y-%m-%d %H:%M')})."
+    if result["status"] == "no_intervals":
+        return "No export intervals calculated."
+    if result["status"] == "no_data":
+        return "No data for export."
+    if result["status"] == "save_error":
+        return f"Failed to save: {(result['message'] or 'Unknown error.')[:100]}"
+    date_range_str = f"{result['start'].strftime('%Y-%m-%d')} to {result['end'].strftime('%Y-%m-%d')}"
+    summary = f"Saved {result['records']} export records for {date_range_str} to {os.path.basename(result['saved_path'])}"
+    if result["message"] and "Saved as CSV instead" in result["message"]:
+        summary += " (as CSV due to missing Excel/Arrow engine)"
+    if result["quota_left"]:
+        summary += f" | API quota left today: {result['quota_left']['account']} (account), {result['quota_left']['site']} (site)"
+    return summary
@@ -1,10 +1,195 @@
+import csv
 import os
+import re
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+EXPORT_FORMATS = ("csv", "excel", "parquet", "feather")
+FILE_EXTENSIONS = {"csv": "csv", "excel": "xlsx", "parquet": "parquet", "feather": "feather"}
+COLUMNAR_FORMATS = ("parquet", "feather")
+COLUMNAR_COMPRESSION = "zstd"
+DATASET_DIRNAME = "SolarEdge_dataset" # Root folder of partitioned Parquet/Feather exports
+EXCEL_MAX_ROWS = 1048576 # Rows per worksheet, including the header row
+EXCEL_DATE_FORMAT = "yyyy-mm-dd hh:mm:ss"
+SPOOL_READ_ROWS = 100000 # Rows read back at a time when a spooled export is converted or rewritten
+EXCEL_FALLBACK_MESSAGE = (
+    "Excel export requires 'openpyxl'. Saved as CSV instead: {filename}\n\n"
+    "To enable Excel export, please install the package: pip install openpyxl"
+)
+PYARROW_FALLBACK_MESSAGE = (
+    "Parquet/Feather export requires 'pyarrow'. Saved as CSV instead: {filename}\n\n"
+    "To enable Parquet/Feather export, please install the package: pip install pyarrow"
+)
+
+def _import_pyarrow():
+    """Returns (pyarrow, pyarrow.parquet, pyarrow.ipc); raises ImportError if pyarrow is not installed."""
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+    return pyarrow, pyarrow.parquet, pyarrow.ipc
+
+def _open_columnar_writer(full_file_path, schema, file_format):
+    """Opens a pyarrow writer (supports write_table() and use as a context manager) for one Parquet or Feather file."""
+    pa, pq, ipc = _import_pyarrow()
+    if file_format == "parquet":
+        return pq.ParquetWriter(full_file_path, schema, compression=COLUMNAR_COMPRESSION)
+    # Feather v2 is the Arrow IPC file format
+    return ipc.new_file(full_file_path, schema, options=ipc.IpcWriteOptions(compression=COLUMNAR_COMPRESSION))
+
+def _month_runs(table):
+    """Splits a date-ordered Arrow table into ("YYYY-MM", rows) runs of consecutive rows in the same month."""
+    months = table.column('date').to_numpy().astype("datetime64[M]")
+    starts = [0] + list(np.flatnonzero(months[1:] != months[:-1]) + 1)
+    for start, end in zip(starts, starts[1:] + [len(months)]):
+        yield str(months[start]), table.slice(start, end - start)
+
+def _write_columnar_tables(tables, schema, file_format, full_file_path, partition_root=None):
+    """
+    Writes an iterable of Arrow tables with `schema` (in date order) to one Parquet/Feather file, or, with
+    partition_root, to one file per month at `<partition_root>/month=YYYY-MM/<file name>` (Hive-style
+    partitioning, so pyarrow.dataset / pandas.read_parquet can read the whole dataset back).
+    Only one file is open at a time. Returns the number of files written.
+    """
+    file_name = os.path.basename(full_file_path)
+    writer = None
+    current_month = None
+    files_written = 0
+    try:
+        for table in tables:
+            if partition_root is None or 'date' not in table.column_names:
+                groups = [(None, table)]
+            else:
+                groups = _month_runs(table)
+            for month, part in groups:
+                if writer is None or month != current_month:
+                    if writer is not None:
+                        writer.close()
+                    if month is None:
+                        target = full_file_path if partition_root is None else os.path.join(partition_root, file_name)
+                    else:
+                        target = os.path.join(partition_root, f"month={month}", file_name)
+                    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                    writer = _open_columnar_writer(target, schema, file_format)
+                    current_month = month
+                    files_written += 1
+                writer.write_table(part)
+    finally:
+        if writer is not None:
+            writer.close()
+    return files_written
+
+class _StreamingWorkbook:
+    """
+    Writes an .xlsx file row by row without keeping the sheets in memory: xlsxwriter in constant_memory
+    mode if it is installed, otherwise an openpyxl write-only workbook. Raises ImportError if neither is.
+    """
+    def __init__(self, full_file_path):
+        self.full_file_path = full_file_path
+        self._sheet = None
+        try:
+            import xlsxwriter
+            self._xlsx = xlsxwriter.Workbook(full_file_path, {"constant_memory": True, "default_date_format": EXCEL_DATE_FORMAT})
+            self._openpyxl = None
+        except ImportError:
+            from openpyxl import Workbook
+            self._xlsx = None
+            self._openpyxl = Workbook(write_only=True)
+        self._row = 0
+
+    def add_sheet(self, name):
+        if self._xlsx is not None:
+            self._sheet = self._xlsx.add_worksheet(name)
+        else:
+            self._sheet = self._openpyxl.create_sheet(name)
+        self._row = 0
+
+    def append(self, row):
+        if self._xlsx is not None:
+            self._sheet.write_row(self._row, 0, row)
+        else:
+            self._sheet.append(row)
+        self._row += 1
+
+    def close(self):
+        if self._xlsx is not None:
+            self._xlsx.close()
+        else:
+            self._openpyxl.save(self.full_file_path)
+
+def _write_excel_frames(frames, columns, full_file_path, sheet_per_month=False):
+    """
+    Streams an iterable of frames (in date order) into an .xlsx file.
+    A sheet that reaches Excel's EXCEL_MAX_ROWS limit continues on a new sheet (Sheet1, Sheet2, ... or,
+    with sheet_per_month, 2024-01, 2024-01 (2), ...), each with its own header row.
+    Returns the list of sheet names written. Raises ImportError if no Excel engine is installed.
+    """
+    workbook = _StreamingWorkbook(full_file_path)
+    sheet_names = []
+    sheet_key = object() # Month (or None) of the current sheet
+    sheet_part = 0
+    rows_in_sheet = 0
+    try:
+        for frame in frames:
+            if sheet_per_month and 'date' in frame.columns:
+                groups = frame.groupby(frame['date'].dt.strftime("%Y-%m"), sort=False)
+            else:
+                groups = [(None, frame)]
+            for key, part in groups:
+                part = part.astype(object).where(part.notna(), None)
+                for row in part.itertuples(index=False, name=None):
+                    if key != sheet_key or rows_in_sheet >= EXCEL_MAX_ROWS - 1:
+                        sheet_part = sheet_part + 1 if key == sheet_key else 1
+                        if key is None:
+                            name = f"Sheet{len(sheet_names) + 1}"
+                        else:
+                            name = key if sheet_part == 1 else f"{key} ({sheet_part})"
+                        workbook.add_sheet(name)
+                        workbook.append(list(columns))
+                        sheet_names.append(name)
+                        sheet_key = key
+                        rows_in_sheet = 0
+                    workbook.append(row)
+                    rows_in_sheet += 1
+    finally:
+        workbook.close()
+    return sheet_names
+
+def _merge_dtypes(old, new):
+    """The dtype a column needs to hold values of both dtypes (None means not seen yet)."""
+    if isinstance(new, pd.CategoricalDtype) or pd.api.types.is_string_dtype(new):
+        new = np.dtype(object)
+    if old is None:
+        return new
+    if old.kind in "iuf" and new.kind in "iuf":
+        return np.result_type(old, new)
+    if old.kind == new.kind:
+        return old
+    return np.dtype(object)
+
+def _dataset_format(dataset_dir):
+    """"parquet" or "feather", whichever files a partitioned dataset folder already holds (Parquet if it is empty)."""
+    for _, _, file_names in os.walk(dataset_dir):
+        for file_name in file_names:
+            if file_name.endswith(".feather"):
+                return "feather"
+            if file_name.endswith(".parquet"):
+                return "parquet"
+    return "parquet"
+
+def partitioned_dataset_dir(output_path, site_id, data_type):
+    """`<output_path>/SolarEdge_dataset/site_id=<id>/data_type=<type>`, the folder a partitioned export writes its month folders into."""
+    safe_site_id = str(site_id).replace("/", "-").replace("\\", "-")
+    return os.path.join(output_path, DATASET_DIRNAME, f"site_id={safe_site_id}", f"data_type={data_type}")
+
+def _export_base_filename(site_id, data_type, start_date_obj, end_date_obj):
+    timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_site_id = str(site_id).replace("/", "-").replace("\\", "-")
+    return f"SolarEdge_{data_type}_{safe_site_id}_{start_date_obj.strftime('%Y%m%d')}_{end_date_obj.strftime('%Y%m%d')}_{timestamp_str}"
+
 def save_data_to_file(dataframe, output_path, site_id, data_type, start_date_obj, end_date_obj, file_format):
     """
-    Saves the given DataFrame to a file (CSV or Excel).
+    Saves the given DataFrame to a file (CSV, Excel, Parquet or Feather).
 
     Args:
         dataframe (pd.DataFrame): The data to save.
@@ -13,7 +198,7 @@ def save_data_to_file(dataframe, output_path, site_id, data_type, start_date_obj
         data_type (str): The type of data (e.g., "production", "voltage"), used for the filename.
         start_date_obj (datetime.date): The start date of the data range.
         end_date_obj (datetime.date): The end date of the data range.
-        file_format (str): "csv" or "excel".
+        file_format (str): "csv", "excel", "parquet" or "feather".
 
     Returns:
         tuple: (full_file_path, message)
@@ -23,11 +208,9 @@ def save_data_to_file(dataframe, output_path, site_id, data_type, start_date_obj
     if dataframe is None or dataframe.empty:
         return None, "No data to save."
 
-    timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_site_id = str(site_id).replace("/", "-").replace("\\", "-")
-    base_filename = f"SolarEdge_{data_type}_{safe_site_id}_{start_date_obj.strftime('%Y%m%d')}_{end_date_obj.strftime('%Y%m%d')}_{timestamp_str}"
+    base_filename = _export_base_filename(site_id, data_type, start_date_obj, end_date_obj)
 
-    file_extension = "xlsx" if file_format == "excel" else "csv"
+    file_extension = FILE_EXTENSIONS.get(file_format, "csv")
     full_file_path = os.path.join(output_path, f"{base_filename}.{file_extension}")
 
     warning_message = None
@@ -37,18 +220,26 @@ def save_data_to_file(dataframe, output_path, site_id, data_type, start_date_obj
             dataframe.to_csv(full_file_path, index=False)
         elif file_format == "excel":
             try:
-                dataframe.to_excel(full_file_path, index=False, engine='openpyxl')
+                _write_excel_frames([dataframe], dataframe.columns, full_file_path)
             except ImportError:
                 # Fallback to CSV if openpyxl is not installed
                 old_full_file_path = full_file_path
                 file_extension = "csv"
                 full_file_path = os.path.join(output_path, f"{base_filename}.{file_extension}")
                 dataframe.to_csv(full_file_path, index=False)
-                warning_message = (
-                    f"Excel export requires 'openpyxl'. Saved as CSV instead: {os.path.basename(full_file_path)}\n\n"
-                    f"To enable Excel export, please install the package: pip install openpyxl"
-                )
+                warning_message = EXCEL_FALLBACK_MESSAGE.format(filename=os.path.basename(full_file_path))
                 # print(f"Warning: openpyxl not found. Falling back to CSV: {full_file_path}")
+        elif file_format in COLUMNAR_FORMATS:
+            try:
+                if file_format == "parquet":
+                    dataframe.to_parquet(full_file_path, index=False, engine='pyarrow', compression=COLUMNAR_COMPRESSION)
+                else:
+                    dataframe.to_feather(full_file_path, compression=COLUMNAR_COMPRESSION)
+            except ImportError:
+                # Fallback to CSV if pyarrow is not installed
+                full_file_path = os.path.join(output_path, f"{base_filename}.csv")
+                dataframe.to_csv(full_file_path, index=False)
+                warning_message = PYARROW_FALLBACK_MESSAGE.format(filename=os.path.basename(full_file_path))
         else:
             return None, f"Unsupported file format: {file_format}"
 
@@ -57,3 +248,329 @@ def save_data_to_file(dataframe, output_path, site_id, data_type, start_date_obj
     except Exception as e:
         # Catch any other exception during file saving
         return None, f"Error saving file {os.path.basename(full_file_path)}: {e}"
+
+def append_data_to_file(dataframe, full_file_path):
+    """
+    Appends rows to an export previously written by save_data_to_file (used by incremental sync).
+    The format is taken from the file extension. Columns are aligned with the existing file; if the
+    new rows bring columns the file does not have yet, the file is rewritten with the combined columns.
+    If full_file_path is a partitioned dataset folder (see partitioned_dataset_dir), the rows are
+    added as new Parquet files in their month folders and nothing is rewritten.
+
+    Returns:
+        tuple: (full_file_path, message) like save_data_to_file.
+    """
+    if dataframe is None or dataframe.empty:
+        return full_file_path, "No new data to append."
+    if not os.path.exists(full_file_path):
+        return None, f"Cannot append: {full_file_path} does not exist."
+
+    try:
+        if os.path.isdir(full_file_path):
+            file_format = _dataset_format(full_file_path)
+            file_name = datetime.now().strftime(f"SolarEdge_append_%Y%m%d_%H%M%S.{FILE_EXTENSIONS[file_format]}")
+            with ExportWriter(os.path.join(full_file_path, file_name), file_format, partition_root=full_file_path) as writer:
+                writer.append(dataframe)
+                return writer.close()
+        if full_file_path.lower().endswith(".csv"):
+            existing_columns = list(pd.read_csv(full_file_path, nrows=0).columns)
+            new_columns = [c for c in dataframe.columns if c not in existing_columns]
+            if not new_columns:
+                dataframe.reindex(columns=existing_columns, fill_value=0).to_csv(full_file_path, mode="a", header=False, index=False)
+                return full_file_path, None
+            existing_df = pd.read_csv(full_file_path, parse_dates=['date'] if 'date' in existing_columns else False)
+        elif full_file_path.lower().endswith(".xlsx"):
+            # Excel files cannot be appended to in place; read (every sheet), combine and rewrite
+            existing_sheets = pd.read_excel(full_file_path, sheet_name=None, engine='openpyxl')
+            existing_df = pd.concat(existing_sheets.values(), ignore_index=True)
+        elif full_file_path.lower().endswith(".parquet"):
+            existing_df = pd.read_parquet(full_file_path)
+        elif full_file_path.lower().endswith(".feather"):
+            existing_df = pd.read_feather(full_file_path)
+        else:
+            return None, f"Cannot append to unsupported file type: {os.path.basename(full_file_path)}"
+
+        combined_df = pd.concat([existing_df, dataframe], ignore_index=True).fillna(0)
+        if full_file_path.lower().endswith(".csv"):
+            combined_df.to_csv(full_file_path, index=False)
+        elif full_file_path.lower().endswith(".parquet"):
+            combined_df.to_parquet(full_file_path, index=False, engine='pyarrow', compression=COLUMNAR_COMPRESSION)
+        elif full_file_path.lower().endswith(".feather"):
+            combined_df.to_feather(full_file_path, compression=COLUMNAR_COMPRESSION)
+        else:
+            sheet_per_month = all(re.fullmatch(r"\d{4}-\d{2}( \(\d+\))?", name) for name in existing_sheets)
+            _write_excel_frames([combined_df], combined_df.columns, full_file_path, sheet_per_month=sheet_per_month)
+        return full_file_path, None
+
+    except Exception as e:
+        return None, f"Error appending to file {os.path.basename(full_file_path)}: {e}"
+
+class ExportWriter:
+    """
+    Writes an export one chunk at a time, so memory is bounded by the chunk size instead of the date range.
+
+    Rows are appended to a spool file (`<file>.part`) as they arrive. close() turns the spool into the
+    final file. A chunk may bring columns that earlier chunks did not have (a new meter or telemetry
+    field); they are added after the existing columns, and earlier rows are left empty for them, as
+    pd.concat would do.
+
+    For CSV and Excel the spool is CSV text: for CSV it is renamed into place, for Excel it is read back
+    SPOOL_READ_ROWS rows at a time and converted. For Parquet/Feather it is a sequence of Arrow IPC
+    streams, a new one whenever a chunk's column types differ from the previous chunk's, so numbers and
+    dates are never written out as text and parsed back. The column types are tracked as chunks arrive
+    (widened as needed, e.g. int to float) and close() casts every batch to them, so the output file has
+    one schema. With partition_root, the columnar output is split into one file per month under
+    partition_root (see _write_columnar_tables) and close() returns partition_root; full_file_path then
+    only supplies the file name and the CSV fallback path.
+
+    Excel output is streamed by _write_excel_frames, which starts a new sheet whenever one reaches
+    Excel's row limit, or for every month with excel_sheet_per_month.
+
+    Use open_export_writer() to create one with the standard export filename.
+    """
+    def __init__(self, full_file_path, file_format, partition_root=None, excel_sheet_per_month=False):
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported file format: {file_format}")
+        if partition_root is not None and file_format not in COLUMNAR_FORMATS:
+            raise ValueError("Only Parquet and Feather exports can be partitioned.")
+        self.full_file_path = full_file_path
+        self.file_format = file_format
+        self.partition_root = partition_root
+        self.excel_sheet_per_month = excel_sheet_per_month
+        self.columns = []
+        self.rows_written = 0
+        self._dtypes = {}
+        self._nullable = set()
+        self.closed = False
+        self._schema_grew = False
+        self._spool_path = f"{full_file_path}.part"
+        self._arrow_spool = None # Writer of the current IPC stream of a columnar spool
+        self._arrow_spool_schema = None
+        try:
+            self._pa = _import_pyarrow()[0] if file_format in COLUMNAR_FORMATS else None
+        except ImportError:
+            self._pa = None # close() falls back to CSV
+        if self._pa is not None:
+            self._spool = self._pa.OSFile(self._spool_path, "wb")
+        else:
+            self._spool = open(self._spool_path, "w", newline="", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        elif not self.closed:
+            self.close()
+
+    def append(self, dataframe):
+        """Writes the rows of one processed chunk."""
+        if self.closed:
+            raise ValueError("Cannot append to a closed ExportWriter.")
+        if dataframe is None or dataframe.empty:
+            return
+        new_columns = [c for c in dataframe.columns if c not in self.columns]
+        if new_columns:
+            if self.columns:
+                self._schema_grew = True
+            self.columns.extend(new_columns)
+        for col in self.columns:
+            if col in dataframe.columns:
+                self._dtypes[col] = _merge_dtypes(self._dtypes.get(col), dataframe[col].dtype)
+                if col in new_columns and self.rows_written:
+                    self._nullable.add(col) # Earlier rows have no value
+            else:
+                self._nullable.add(col)
+        if self._pa is not None:
+            self._append_arrow(dataframe)
+        else:
+            # Only the first chunk writes a header; close() fixes it up if later chunks added columns
+            dataframe.reindex(columns=self.columns).to_csv(self._spool, header=self.rows_written == 0, index=False)
+        self.rows_written += len(dataframe)
+
+    def _append_arrow(self, dataframe):
+        # Numbers and dates keep their type; anything else is spooled as text, as a CSV spool would have it
+        columns = {col: (values if values.dtype.kind in "iufM" else values.astype("string"))
+                   for col, values in dataframe.items()}
+        table = self._pa.Table.from_pandas(pd.DataFrame(columns), preserve_index=False)
+        if self._arrow_spool is not None and not self._arrow_spool_schema.equals(table.schema):
+            self._arrow_spool.close()
+            self._arrow_spool = None
+        if self._arrow_spool is None:
+            self._arrow_spool = self._pa.ipc.new_stream(self._spool, table.schema)
+            self._arrow_spool_schema = table.schema
+        self._arrow_spool.write_table(table)
+
+    def close(self):
+        """
+        Finalises the file.
+
+        Returns:
+            tuple: (full_file_path, message) like save_data_to_file.
+        """
+        if self.closed:
+            return self.full_file_path, None
+        self._close_spool()
+        self.closed = True
+        if self.rows_written == 0:
+            self._remove_spool()
+            return None, "No data to save."
+        try:
+            if self.file_format == "csv":
+                if self._schema_grew:
+                    self._rewrite_spool_csv(self.full_file_path)
+                    self._remove_spool()
+                else:
+                    os.replace(self._spool_path, self.full_file_path)
+                return self.full_file_path, None
+            if self.file_format == "excel":
+                return self._write_excel()
+            return self._write_columnar()
+        except Exception as e:
+            self._remove_spool()
+            return None, f"Error saving file {os.path.basename(self.full_file_path)}: {e}"
+
+    def abort(self):
+        """Discards everything written so far (e.g. when the export is cancelled)."""
+        self._close_spool()
+        self.closed = True
+        self._remove_spool()
+
+    def _close_spool(self):
+        if self._arrow_spool is not None:
+            self._arrow_spool.close()
+            self._arrow_spool = None
+        if not self._spool.closed:
+            self._spool.close()
+
+    def _remove_spool(self):
+        try:
+            os.remove(self._spool_path)
+        except FileNotFoundError:
+            pass
+
+    def _rewrite_spool_csv(self, target_path):
+        # Rows written before a column appeared are shorter than the final header; pad them
+        with open(self._spool_path, "r", newline="", encoding="utf-8") as src, \
+             open(target_path, "w", newline="", encoding="utf-8") as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst, lineterminator=os.linesep) # Same line endings as DataFrame.to_csv
+            next(reader, None)
+            writer.writerow(self.columns)
+            width = len(self.columns)
+            for row in reader:
+                writer.writerow(row + [""] * (width - len(row)))
+
+    def _final_dtypes(self):
+        """Per-column dtype for reading the spool back: numeric columns keep their (widened) type, text stays text."""
+        dtypes = {}
+        for col in self.columns:
+            dtype = self._dtypes.get(col, np.dtype(object))
+            if dtype.kind in "iu" and col in self._nullable:
+                dtype = np.dtype("float64") # Missing values need NaN
+            dtypes[col] = dtype
+        return dtypes
+
+    def _iter_spool_frames(self):
+        """Reads the spool back as frames of at most SPOOL_READ_ROWS rows with the final columns."""
+        read_dtypes = {col: (dtype if dtype.kind in "iuf" else str) for col, dtype in self._final_dtypes().items()
+                       if dtype.kind != "M"}
+        reader = pd.read_csv(
+            self._spool_path, header=None, skiprows=1, names=self.columns, chunksize=SPOOL_READ_ROWS,
+            dtype=read_dtypes, parse_dates=['date'] if 'date' in self.columns else False
+        )
+        for frame in reader:
+            yield frame
+
+    def _iter_spool_tables(self, schema):
+        """Reads a columnar spool back as Arrow tables of about SPOOL_READ_ROWS rows, cast to `schema`."""
+        pa = self._pa
+        pending, pending_rows = [], 0
+        with pa.OSFile(self._spool_path, "rb") as spool:
+            while spool.tell() < spool.size():
+                for batch in pa.ipc.open_stream(spool):
+                    columns = [batch.column(batch.schema.get_field_index(field.name)).cast(field.type)
+                               if field.name in batch.schema.names else pa.nulls(batch.num_rows, field.type)
+                               for field in schema]
+                    pending.append(pa.Table.from_arrays(columns, schema=schema))
+                    pending_rows += batch.num_rows
+                    if pending_rows >= SPOOL_READ_ROWS:
+                        yield pa.concat_tables(pending)
+                        pending, pending_rows = [], 0
+        if pending:
+            yield pa.concat_tables(pending)
+
+    def _fall_back_to_csv(self, message_template):
+        csv_path = os.path.splitext(self.full_file_path)[0] + ".csv"
+        if self._schema_grew:
+            self._rewrite_spool_csv(csv_path)
+            self._remove_spool()
+        else:
+            os.replace(self._spool_path, csv_path)
+        self.full_file_path = csv_path
+        return csv_path, message_template.format(filename=os.path.basename(csv_path))
+
+    def _write_excel(self):
+        try:
+            sheet_names = _write_excel_frames(self._iter_spool_frames(), self.columns, self.full_file_path,
+                                              sheet_per_month=self.excel_sheet_per_month)
+        except ImportError:
+            # Fallback to CSV if no Excel engine is installed
+            return self._fall_back_to_csv(EXCEL_FALLBACK_MESSAGE)
+        self._remove_spool()
+        if len(sheet_names) > 1 and not self.excel_sheet_per_month:
+            return self.full_file_path, f"Export exceeds Excel's {EXCEL_MAX_ROWS - 1} data rows per sheet; continued on sheets {', '.join(sheet_names)}."
+        return self.full_file_path, None
+
+    def _arrow_schema(self, pa):
+        fields = []
+        for col, dtype in self._final_dtypes().items():
+            if dtype.kind == "M":
+                arrow_type = pa.timestamp("us")
+            elif dtype.kind in "iuf" and self.partition_root is not None:
+                # Files in a dataset come from different exports; one numeric type keeps their schemas compatible
+                arrow_type = pa.float64()
+            elif dtype.kind in "iuf":
+                arrow_type = pa.from_numpy_dtype(dtype)
+            else:
+                arrow_type = pa.string()
+            fields.append(pa.field(col, arrow_type))
+        return pa.schema(fields)
+
+    def _write_columnar(self):
+        if self._pa is None:
+            # Fallback to CSV if pyarrow is not installed
+            return self._fall_back_to_csv(PYARROW_FALLBACK_MESSAGE)
+        schema = self._arrow_schema(self._pa)
+        _write_columnar_tables(self._iter_spool_tables(schema), schema, self.file_format,
+                               self.full_file_path, partition_root=self.partition_root)
+        self._remove_spool()
+        if self.partition_root is not None:
+            self.full_file_path = self.partition_root
+        return self.full_file_path, None
+
+def open_export_writer(output_path, site_id, data_type, start_date_obj, end_date_obj, file_format, partitioned=False,
+                       excel_sheet_per_month=False):
+    """
+    Creates an ExportWriter for a new export file, named like the files save_data_to_file writes.
+
+    Args:
+        output_path (str): The directory to save the file in.
+        site_id (str): The site ID, used for generating the filename.
+        data_type (str): The type of data (e.g., "production", "voltage"), used for the filename.
+        start_date_obj (datetime.date): The start date of the data range.
+        end_date_obj (datetime.date): The end date of the data range.
+        file_format (str): "csv", "excel", "parquet" or "feather".
+        partitioned (bool): For Parquet/Feather, write into the partitioned dataset under
+            partitioned_dataset_dir(output_path, site_id, data_type), one file per month.
+        excel_sheet_per_month (bool): For Excel, write each month to its own sheet.
+
+    Returns:
+        ExportWriter: call append() for every chunk, then close() (or abort()).
+    """
+    base_filename = _export_base_filename(site_id, data_type, start_date_obj, end_date_obj)
+    file_extension = FILE_EXTENSIONS.get(file_format, "csv")
+    partition_root = partitioned_dataset_dir(output_path, site_id, data_type) if partitioned and file_format in COLUMNAR_FORMATS else None
+    return ExportWriter(os.path.join(output_path, f"{base_filename}.{file_extension}"), file_format,
+                        partition_root=partition_root, excel_sheet_per_month=excel_sheet_per_month)
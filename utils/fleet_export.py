@@ -0,0 +1,283 @@
+"""
+Fleet export: one data type and date range for many sites, run concurrently through export_pipeline.run_export.
+
+Like export_pipeline, this module has no GUI dependency and is shared by SolarEdgeAPIApp and solaredge_cli.py.
+"""
+import csv
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+import requests
+
+from utils import data_processor
+from utils import export_pipeline
+from utils import file_exporter
+from utils import helpers
+from utils import request_scheduler
+from utils.helpers import OperationCancelledError
+
+FLEET_SITE_ID = "fleet" # Site part of the combined output's file name
+FAILED_STATUSES = ("failed", "save_error")
+REPORT_COLUMNS = ("site_id", "site_name", "status", "records", "attempts", "files", "error")
+
+logger = logging.getLogger(__name__)
+
+
+def list_sites(api_client, api_key, check_if_cancelled_callback=None):
+    """Every site of the account as the "site" objects of sites/list, paged like the GUI's site list."""
+    page_size = api_client.SITES_LIST_MAX_PAGE_SIZE
+    data = api_client.get_sites_list(api_key=api_key, start_index=0, size=page_size)
+    if not data or "sites" not in data or "site" not in data["sites"]:
+        return []
+    sites = list(data["sites"]["site"])
+    total = data["sites"].get("count", 0)
+    remaining_pages = [(start_index, page_size) for start_index in range(len(sites), total, page_size)] if len(sites) >= page_size else []
+
+    def fetch_page(page_index, start_index, size):
+        page_data = api_client.get_sites_list(api_key=api_key, start_index=start_index, size=size)
+        return page_data["sites"]["site"] if page_data and "sites" in page_data and "site" in page_data["sites"] else []
+
+    for _, _, _, page_sites in helpers.fetch_chunks_concurrently(
+            remaining_pages, fetch_page, check_if_cancelled_callback=check_if_cancelled_callback):
+        sites.extend(page_sites)
+    return sites
+
+
+def filter_sites(sites, site_filter):
+    """
+    Returns {site_id: site_name} for the sites matching site_filter: comma-separated terms, each matching a
+    site ID exactly or part of a site name (case-insensitive). An empty filter matches every site.
+    sites is a list of "site" objects or a {site_id: site_name} dict.
+    """
+    if isinstance(sites, dict):
+        sites = [{"id": site_id, "name": name} for site_id, name in sites.items()]
+    terms = [t.strip().lower() for t in (site_filter or "").split(",") if t.strip()]
+    matched = {}
+    for site in sites:
+        site_id, name = str(site.get("id")), site.get("name") or ""
+        if not terms or any(term == site_id or term in name.lower() for term in terms):
+            matched[site_id] = name
+    return matched
+
+
+def site_inverters(api_client, api_key, site_id):
+    """(serial number, model) of every inverter in a site's inventory, for fleet voltage exports."""
+    response = api_client.get_site_inventory(api_key=api_key, site_id=site_id)
+    inventory = response.get("Inventory") if response else None
+    return [(str(inv.get("serialNumber", inv.get("SN"))), inv.get("model"))
+            for inv in (inventory or {}).get("inverters") or [] if inv.get("serialNumber", inv.get("SN"))]
+
+
+class FleetExport:
+    """
+    Exports one data type and date range for a set of sites, max_sites of them at a time. Every site runs
+    export_pipeline.run_export with its chunks fetched one after another, so the shared rate limiter keeps the
+    whole fleet within the 3-concurrent-call and daily limits. Voltage exports cover every inverter listed in each
+    site's inventory.
+
+    Each site gets its own output file(s) in output_path, or, with combined=True, its rows are added to one
+    file with a leading site_id column (and equipment_sn for voltage). A site's rows are only added to the
+    combined file once the whole site succeeded, so a failed site can be retried without duplicating rows.
+
+    run() records a result per site in `results`; retry_failed() runs the failed sites again. Call close() when
+    done to finish the combined file.
+    """
+    def __init__(self, api_client, api_key, sites, data_type, start_dt, end_dt, output_path, file_format="csv",
+                 combined=False, max_sites=helpers.MAX_CONCURRENT_API_REQUESTS, scheduler=None, check_if_cancelled_callback=None,
+                 status_callback=None, progress_callback=None, **export_options):
+        """
+        Args:
+            sites (dict): {site_id: site_name}, e.g. from filter_sites().
+            combined (bool): Write one file for all sites instead of one per site.
+            max_sites (int): Sites exported concurrently.
+            scheduler (RequestScheduler, optional): Queue the sites' chunk requests there at PRIORITY_BULK, behind
+                interactive requests and single-site exports; without one each site fetches its chunks one at a time.
+            status_callback(message), progress_callback(fraction): As for run_export, but for the fleet as a whole.
+            **export_options: Passed on to run_export (time_unit, meters, compact, incremental, timeseries_store, ...).
+                Incremental sync, derived time units and partitioned datasets are per-site features and cannot be
+                combined into one file.
+        """
+        if combined and (export_options.get("incremental") or export_options.get("derive_time_units") or export_options.get("partitioned")):
+            raise ValueError("A combined fleet file cannot be used with incremental sync, derived time units or a partitioned dataset.")
+        self.api_client = api_client
+        self.api_key = api_key
+        self.sites = {str(site_id): name for site_id, name in sites.items()}
+        self.data_type = data_type
+        self.start_dt = start_dt
+        self.end_dt = end_dt
+        self.output_path = output_path
+        self.file_format = file_format
+        self.combined = combined
+        self.max_sites = max_sites
+        self.scheduler = scheduler
+        self.export_options = export_options
+        self.check_if_cancelled = check_if_cancelled_callback or export_pipeline._noop
+        self.status = status_callback or export_pipeline._noop
+        self.progress = progress_callback or export_pipeline._noop
+        self.results = {}
+        self._combined_writer = None
+        self._combined_lock = threading.Lock()
+        # Combined mode: sites are exported to CSV here first and moved into the combined file once they succeed
+        self._staging_dir = tempfile.mkdtemp(prefix=".fleet_", dir=output_path) if combined else None
+
+    def failed_site_ids(self):
+        return [site_id for site_id, result in self.results.items() if result["status"] in FAILED_STATUSES]
+
+    def retry_failed(self):
+        return self.run(self.failed_site_ids())
+
+    def run(self, site_ids=None):
+        """
+        Exports site_ids (default: every site without a result yet) and returns their results as
+        {site_id: {"site_id", "site_name", "status", "records", "attempts", "files", "error"}}. status is
+        "saved", "up_to_date" (an incremental run found nothing new), "no_data" (nothing in the range),
+        "failed" (an API or processing error) or "save_error".
+        Raises OperationCancelledError when cancelled; sites finished before that keep their results.
+        """
+        site_ids = [str(s) for s in site_ids] if site_ids is not None else [s for s in self.sites if s not in self.results]
+        total = len(site_ids)
+        done = [0]
+        done_lock = threading.Lock()
+
+        def export_site(site_id):
+            self.check_if_cancelled()
+            result = self._export_site(site_id)
+            with done_lock:
+                self.results[site_id] = result
+                done[0] += 1
+                done_count = done[0]
+            self.status(f"Site {done_count}/{total}: {result['site_name'] or site_id} {result['status']}"
+                        + (f" ({result['error'][:80]})" if result["error"] else ""))
+            self.progress(done_count / total)
+            return result
+
+        self.status(f"Exporting {total} site(s) ({self.max_sites} at a time)...")
+        self.progress(0)
+        executor = ThreadPoolExecutor(max_workers=max(1, self.max_sites), thread_name_prefix="fleet-site")
+        futures = [executor.submit(export_site, site_id) for site_id in site_ids]
+        run_results = {}
+        try:
+            for site_id, future in zip(site_ids, futures):
+                run_results[site_id] = future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+        return run_results
+
+    def _export_site(self, site_id):
+        previous = self.results.get(site_id)
+        result = {"site_id": site_id, "site_name": self.sites.get(site_id, ""), "status": None, "records": 0,
+                  "attempts": (previous["attempts"] if previous else 0) + 1, "files": [], "error": None}
+        output_path = os.path.join(self._staging_dir, site_id) if self.combined else self.output_path
+        if self.combined: os.makedirs(output_path, exist_ok=True)
+        exports = []
+        try:
+            if self.data_type == "voltage":
+                targets = [(sn, model, f"voltage_{sn}") for sn, model in site_inverters(self.api_client, self.api_key, site_id)]
+            else:
+                targets = [(None, None, None)]
+            for equipment_sn, inverter_model, file_label in targets:
+                export = export_pipeline.run_export(
+                    self.api_client, self.api_key, site_id, self.data_type, self.start_dt, self.end_dt, output_path,
+                    file_format="csv" if self.combined else self.file_format, equipment_sn=equipment_sn,
+                    inverter_model=inverter_model, file_label=file_label, max_workers=1,
+                    scheduler=self.scheduler, priority=request_scheduler.PRIORITY_BULK,
+                    check_if_cancelled_callback=self.check_if_cancelled, **self.export_options)
+                exports.append((equipment_sn, export))
+                if export["status"] == "save_error":
+                    result.update(status="save_error", error=export["message"] or "Failed to save file.")
+                    break
+            else:
+                saved = [(equipment_sn, export) for equipment_sn, export in exports if export["saved_path"]]
+                if self.combined:
+                    for equipment_sn, export in saved:
+                        self._add_to_combined(site_id, equipment_sn, export["saved_path"])
+                else:
+                    result["files"] = [fp for _, export in saved for fp in [export["saved_path"]] + export["derived_files"]]
+                result["records"] = sum(export["records"] for _, export in exports)
+                up_to_date = any(export["status"] in ("up_to_date", "no_new_data") for _, export in exports)
+                result["status"] = "saved" if saved else "up_to_date" if up_to_date else "no_data"
+        except OperationCancelledError:
+            raise
+        except requests.exceptions.RequestException as e:
+            result.update(status="failed", error=f"API error: {e}")
+        except Exception as e:
+            result.update(status="failed", error=str(e))
+        finally:
+            if self.combined:
+                shutil.rmtree(output_path, ignore_errors=True)
+        if result["status"] in FAILED_STATUSES and not self.combined and not self.export_options.get("incremental"):
+            # A site succeeds or fails as a whole: drop the files of inverters that did finish, the retry rewrites them
+            for _, export in exports:
+                for fp in [export["saved_path"]] + export["derived_files"]:
+                    if fp and os.path.isfile(fp): os.remove(fp)
+        logger.info("Fleet export of site %s: %s (%d records)%s", site_id, result['status'], result['records'],
+                    f", error: {result['error']}" if result["error"] else "")
+        return result
+
+    def _add_to_combined(self, site_id, equipment_sn, staged_path):
+        with self._combined_lock:
+            if self._combined_writer is None:
+                self._combined_writer = file_exporter.open_export_writer(
+                    output_path=self.output_path, site_id=FLEET_SITE_ID, data_type=self.data_type,
+                    start_date_obj=self.start_dt.date(), end_date_obj=self.end_dt.date(), file_format=self.file_format,
+                    excel_sheet_per_month=self.export_options.get("excel_sheet_per_month", False))
+            for frame in pd.read_csv(staged_path, chunksize=file_exporter.SPOOL_READ_ROWS):
+                frame['date'] = data_processor.parse_solaredge_dates(frame['date'])
+                frame.insert(0, 'site_id', site_id)
+                if equipment_sn is not None:
+                    frame.insert(1, 'equipment_sn', equipment_sn)
+                self._combined_writer.append(frame)
+
+    def report_rows(self):
+        """One row per site that was run, in REPORT_COLUMNS order."""
+        rows = []
+        for site_id in self.sites:
+            if site_id in self.results:
+                result = dict(self.results[site_id], files=";".join(self.results[site_id]["files"]))
+                rows.append(["" if result[c] is None else result[c] for c in REPORT_COLUMNS])
+        return rows
+
+    def write_report(self, output_path=None):
+        """Writes the per-site results to SolarEdge_fleet_report_<timestamp>.csv and returns its path."""
+        report_path = os.path.join(output_path or self.output_path,
+                                   f"SolarEdge_fleet_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+        with open(report_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(REPORT_COLUMNS)
+            writer.writerows(self.report_rows())
+        return report_path
+
+    def close(self):
+        """
+        Finishes the combined file (if any) and removes the staging folder.
+
+        Returns:
+            tuple: (combined_file_path, message) like ExportWriter.close(); (None, None) without a combined file.
+        """
+        saved = (None, None)
+        with self._combined_lock:
+            if self._combined_writer is not None:
+                saved = self._combined_writer.close()
+                self._combined_writer = None
+        if self._staging_dir is not None:
+            shutil.rmtree(self._staging_dir, ignore_errors=True)
+            self._staging_dir = None
+        return saved
+
+    def abort(self):
+        """Discards the combined file and the staging folder (per-site files already written are kept)."""
+        with self._combined_lock:
+            if self._combined_writer is not None:
+                self._combined_writer.abort()
+                self._combined_writer = None
+        if self._staging_dir is not None:
+            shutil.rmtree(self._staging_dir, ignore_errors=True)
+            self._staging_dir = None
@@ -1,67 +1,96 @@
-from datetime import timedelta, datetime
+from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+# SolarEdge API: "Concurrency limitation: maximum 3 concurrent API calls from the same source IP."
+MAX_CONCURRENT_API_REQUESTS = 3
+# Chunks fetched ahead of the consumer, per worker: enough to keep the workers busy while it processes a chunk,
+# few enough that memory depends on the chunk size rather than on the length of the date range
+CHUNKS_AHEAD_PER_WORKER = 2
 
 class OperationCancelledError(Exception):
     """Custom exception for when an operation is cancelled by the user."""
     pass
 
-def calculate_smart_chunks(start_dt, end_dt, max_chunk_days, check_if_cancelled_callback=None):
-    """
-    Smart chunking algorithm that works with any date range.
-    Breaks the date range into optimal chunks while respecting API limits.
-    Requires a callback function `check_if_cancelled_callback` which should raise
-    OperationCancelledError if cancellation is requested.
+def fetch_chunks_concurrently(date_chunks, fetch_chunk_callback, max_workers=MAX_CONCURRENT_API_REQUESTS,
+                              check_if_cancelled_callback=None, chunk_done_callback=None):
     """
-    chunks = []
-    current_start = start_dt
+    Fetches date chunks with a bounded worker pool and yields the results in chunk (time) order.
 
-    # print(f"Debug: Starting chunking - Start: {start_dt}, End: {end_dt}, Max chunk days: {max_chunk_days}")
+    `fetch_chunk_callback(chunk_index, chunk_start, chunk_end)` is run on a worker thread for
+    every chunk. `chunk_done_callback(completed_count, total_count)` is called as each chunk
+    lands, in completion order, so progress can be reported before earlier chunks finish.
+    With max_workers <= 1 the chunks are fetched sequentially on the calling thread.
 
-    while current_start <= end_dt:
-        if check_if_cancelled_callback:
-            check_if_cancelled_callback() # Check for cancellation at the start of each chunk calculation
+    Yields (chunk_index, chunk_start, chunk_end, result). At most max_workers * CHUNKS_AHEAD_PER_WORKER
+    chunks are submitted ahead of the consumer, and a result is dropped as soon as it has been yielded,
+    so only that many results are held at a time however long the date range is. If a chunk raises
+    (including OperationCancelledError from the cancellation callback), chunks not yet started are
+    cancelled and the exception is re-raised when that chunk's turn comes.
+    """
+    total = len(date_chunks)
+    if max_workers is None or max_workers <= 1:
+        for ci, (cs, ce) in enumerate(date_chunks):
+            if check_if_cancelled_callback:
+                check_if_cancelled_callback()
+            result = fetch_chunk_callback(ci, cs, ce)
+            if chunk_done_callback:
+                chunk_done_callback(ci + 1, total)
+            yield ci, cs, ce, result
+            del result
+        return
 
-        ideal_end = current_start + timedelta(days=max_chunk_days - 1)
-        chunk_end = min(ideal_end, end_dt)
+    completed = [0]
+    completed_lock = threading.Lock()
 
-        if chunk_end < end_dt: # Not the final chunk
-            chunk_end = chunk_end.replace(hour=23, minute=59, second=59)
-        # Else: it's the final chunk, use the exact end_dt which includes time
+    def _on_done(future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        with completed_lock:
+            completed[0] += 1
+            done_count = completed[0]
+        if chunk_done_callback:
+            chunk_done_callback(done_count, total)
 
-        chunks.append((current_start, chunk_end))
-        # print(f"Debug: Added chunk: {current_start} to {chunk_end}")
+    def _run(ci, cs, ce):
+        if check_if_cancelled_callback:
+            check_if_cancelled_callback() # Skip chunks queued before a cancellation
+        return fetch_chunk_callback(ci, cs, ce)
 
-        if chunk_end >= end_dt:
-            break
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chunk-fetch")
+    chunks_to_submit = enumerate(date_chunks)
+    in_flight = deque() # (chunk_index, chunk_start, chunk_end, future), in chunk order
 
-        current_start = (chunk_end + timedelta(seconds=1)).replace(hour=0, minute=0, second=0)
-        # print(f"Debug: Next chunk will start at: {current_start}")
+    def _submit_next():
+        for ci, (cs, ce) in chunks_to_submit:
+            future = executor.submit(_run, ci, cs, ce)
+            future.add_done_callback(_on_done)
+            in_flight.append((ci, cs, ce, future))
+            return
 
-    # print(f"Debug: Chunking complete. Created {len(chunks)} chunks.")
-    return chunks
+    try:
+        for _ in range(max_workers * CHUNKS_AHEAD_PER_WORKER):
+            _submit_next()
+        while in_flight:
+            ci, cs, ce, future = in_flight.popleft()
+            result = future.result()
+            del future # The consumer holds the only reference to the result from here on
+            _submit_next()
+            yield ci, cs, ce, result
+            del result
+    finally:
+        # Reached on normal completion, on error and when the consumer stops iterating early
+        for _, _, _, future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=True)
 
 def estimate_chunks_needed(start_date, end_date, data_type, time_unit=None):
     """
-    Estimate the number of API calls needed for a given date range.
+    Number of API calls needed for a given date range, with the period limits of utils.request_planner.
     start_date, end_date are date objects (not datetime).
     """
-    total_days = (end_date - start_date).days + 1
-
-    if data_type == "voltage":
-        return max(1, (total_days + 6) // 7)  # 7 days per chunk for voltage
-    elif data_type == "production":
-        if time_unit == "HOUR":
-            # SolarEdge API: "The period for hourly resolution is limited to one month."
-            # Assuming 30 days for safety, though some months are 31.
-            return max(1, (total_days + 29) // 30)
-        elif time_unit == "DAY":
-            # SolarEdge API: "The period for daily resolution is limited to one year."
-            return max(1, (total_days + 364) // 365)
-        elif time_unit in ["WEEK", "MONTH"]:
-            # SolarEdge API: "The period for weekly and monthly resolution is limited to the entire site's lifetime."
-            # For practical purposes, let's assume a very large number (e.g. 10 years) isn't one chunk.
-            # A 3-year limit per call seems reasonable if not specified otherwise.
-            return max(1, (total_days + (3*365 -1)) // (3*365) )
-        else: # Default for unknown production time_unit
-            return max(1, (total_days + 29) // 30)
-    else: # Default fallback for unknown data_type
-        return max(1, (total_days + 29) // 30)
+    from utils import request_planner # request_planner imports this module
+    start_dt = datetime.combine(start_date, datetime.min.time())
+    end_dt = datetime.combine(end_date, datetime.max.time()).replace(microsecond=0)
+    return max(1, len(request_planner.plan_calls(data_type, time_unit, [(start_dt, end_dt)])))
@@ -0,0 +1,165 @@
+"""
+Plans the API calls of an export: the fewest calls that cover what is not available locally yet, within each
+endpoint's period limit, and what they will cost in calls, bytes and time.
+
+Period limits (SolarEdge API documentation):
+- energyDetails at QUARTER_OF_AN_HOUR or HOUR: one month
+- energyDetails at DAY: one year
+- energyDetails at WEEK or MONTH: unlimited (the site's lifetime)
+- equipment data (inverter telemetry): one week
+
+Months and years are calendar ones: a call starting on 15 January may run until the end of 14 February,
+and one starting on 1 January covers the whole of January.
+"""
+import calendar
+import math
+from collections import namedtuple
+from datetime import timedelta
+
+from utils import helpers
+
+EQUIPMENT_DATA_PERIOD = timedelta(days=7)
+SECONDS_PER_CALL = 1.0 # Typical SolarEdge response time, excluding the download itself
+DOWNLOAD_BYTES_PER_SECOND = 1_000_000
+RESPONSE_OVERHEAD_BYTES = 200 # Envelope of an energyDetails or equipment data response
+METER_OVERHEAD_BYTES = 60 # {"type":"Production","values":[...]}
+ENERGY_VALUE_BYTES = 45 # {"date":"2024-01-01 00:00:00","value":1234.5},
+TELEMETRY_INTERVAL_SECONDS = 5 * 60
+TELEMETRY_BYTES = 900 # One three-phase telemetry record with L1Data-L3Data
+LARGE_PLAN_CALLS = 20 # validate_inputs asks for confirmation above this many API calls
+_UNIT_SECONDS = {"QUARTER_OF_AN_HOUR": 15 * 60, "HOUR": 60 * 60, "DAY": 24 * 60 * 60, "WEEK": 7 * 24 * 60 * 60}
+
+PlannedCall = namedtuple("PlannedCall", ["start", "end", "cached"])
+
+
+def _add_months(dt, months):
+    month_index = dt.month - 1 + months
+    year, month = dt.year + month_index // 12, month_index % 12 + 1
+    return dt.replace(year=year, month=month, day=min(dt.day, calendar.monthrange(year, month)[1]))
+
+
+def max_call_end(data_type, time_unit, call_start):
+    """
+    The latest end time a single call starting at call_start may ask for, or None if the period is unlimited.
+    Limits end at 23:59:59, so the next call starts at midnight.
+    """
+    day = call_start.replace(hour=0, minute=0, second=0, microsecond=0)
+    if data_type == "voltage":
+        limit = day + EQUIPMENT_DATA_PERIOD
+    elif time_unit in ("WEEK", "MONTH"):
+        return None
+    elif time_unit == "DAY":
+        limit = _add_months(day, 12)
+    else: # QUARTER_OF_AN_HOUR, HOUR and anything unknown get the strictest energy limit
+        limit = _add_months(day, 1)
+    return limit - timedelta(seconds=1)
+
+
+def plan_calls(data_type, time_unit, ranges, check_if_cancelled_callback=None):
+    """
+    The fewest (start, end) calls covering every range in `ranges`, a sorted list of non-overlapping (start, end)
+    datetimes such as TimeSeriesStore.missing_ranges() returns.
+
+    Each call starts at the first moment not covered yet and takes in every range that starts before its period
+    limit, so gaps separated by data the store already has are fetched together when one call can span them:
+    the stored stretch in between is downloaded again rather than spending a second call on the daily quota.
+    Starting each call at the first uncovered moment and extending it as far as allowed needs the fewest calls.
+    """
+    pending = [[range_start, range_end] for range_start, range_end in ranges if range_start <= range_end]
+    calls = []
+    i = 0
+    while i < len(pending):
+        if check_if_cancelled_callback:
+            check_if_cancelled_callback()
+        call_start = pending[i][0]
+        limit = max_call_end(data_type, time_unit, call_start)
+        call_end = None
+        while i < len(pending) and (limit is None or pending[i][0] <= limit):
+            if limit is None or pending[i][1] <= limit:
+                call_end = pending[i][1]
+                i += 1
+            else: # The range continues in the next call
+                call_end = limit
+                pending[i][0] = limit + timedelta(seconds=1)
+                break
+        calls.append((call_start, call_end))
+    return calls
+
+
+def interval_count(data_type, time_unit, start_dt, end_dt):
+    """Values per meter (energy) or telemetry records (voltage) a call for [start_dt, end_dt] returns at most."""
+    if data_type != "voltage" and time_unit == "MONTH":
+        return (end_dt.year - start_dt.year) * 12 + end_dt.month - start_dt.month + 1
+    seconds = TELEMETRY_INTERVAL_SECONDS if data_type == "voltage" else _UNIT_SECONDS.get(time_unit, _UNIT_SECONDS["HOUR"])
+    return max(1, math.ceil(((end_dt - start_dt).total_seconds() + 1) / seconds))
+
+
+def estimate_call_bytes(data_type, time_unit, start_dt, end_dt, meter_count=1):
+    """Approximate size of the JSON response of one call."""
+    intervals = interval_count(data_type, time_unit, start_dt, end_dt)
+    if data_type == "voltage":
+        return RESPONSE_OVERHEAD_BYTES + intervals * TELEMETRY_BYTES
+    return RESPONSE_OVERHEAD_BYTES + max(1, meter_count) * (METER_OVERHEAD_BYTES + intervals * ENERGY_VALUE_BYTES)
+
+
+class RequestPlan:
+    """
+    The calls an export makes, as PlannedCall(start, end, cached) in time order, and their cost. Cached calls are
+    answered by the response cache and use neither quota nor bandwidth; the call counts are exact, bytes and
+    seconds are estimates.
+    """
+    def __init__(self, data_type, time_unit, calls, meter_count=1, quota_left=None,
+                 concurrency=helpers.MAX_CONCURRENT_API_REQUESTS):
+        self.data_type = data_type
+        self.time_unit = time_unit
+        self.calls = list(calls)
+        self.meter_count = meter_count
+        self.quota_left = quota_left
+        self.concurrency = concurrency
+
+    @property
+    def date_chunks(self):
+        """Every call's (start, end), cached or not, in the form helpers.fetch_chunks_concurrently takes."""
+        return [(call.start, call.end) for call in self.calls]
+
+    @property
+    def api_calls(self):
+        return sum(1 for call in self.calls if not call.cached)
+
+    @property
+    def cached_calls(self):
+        return len(self.calls) - self.api_calls
+
+    @property
+    def bytes(self):
+        return sum(estimate_call_bytes(self.data_type, self.time_unit, call.start, call.end, self.meter_count)
+                   for call in self.calls if not call.cached)
+
+    @property
+    def seconds(self):
+        return math.ceil(self.api_calls / max(1, self.concurrency)) * SECONDS_PER_CALL + self.bytes / DOWNLOAD_BYTES_PER_SECOND
+
+    @property
+    def exceeds_quota(self):
+        return self.quota_left is not None and self.api_calls > self.quota_left
+
+    def summary(self):
+        """E.g. "14 API calls (3 more from the cache), about 2.1 MB and 6 s; 286 requests left today"."""
+        if not self.api_calls:
+            text = "no API calls" + (f" ({self.cached_calls} answered from the cache)" if self.cached_calls else "")
+        else:
+            text = f"{self.api_calls} API call{'s' if self.api_calls != 1 else ''}"
+            if self.cached_calls:
+                text += f" ({self.cached_calls} more from the cache)"
+            text += f", about {self.bytes / 1_000_000:.1f} MB and {_format_seconds(self.seconds)}"
+        if self.quota_left is not None:
+            text += f"; {self.quota_left} requests left today"
+        return text
+
+
+def _format_seconds(seconds):
+    if seconds < 90:
+        return f"{max(1, round(seconds))} s"
+    if seconds < 90 * 60:
+        return f"{round(seconds / 60)} min"
+    return f"{seconds / 3600:.1f} h"
@@ -0,0 +1,298 @@
+"""
+One queue for the SolarEdge requests of every export, fleet export and site-details view, served by
+MAX_CONCURRENT_API_REQUESTS worker threads so the whole app stays within the API's concurrency limit.
+
+Requests are queued per (priority, site) and dispatched in this order:
+- priority class: PRIORITY_INTERACTIVE before PRIORITY_EXPORT before PRIORITY_BULK. A free worker always takes
+  interactive work first, so selecting a site during a long backfill waits for at most one in-flight request
+  rather than for the backfill;
+- a site that already started is drained before the next site of its class begins, which keeps each site's
+  chunks contiguous (and its export file growing in order);
+- sites whose queued requests still fit their daily budget (SolarEdgeRateLimiter.remaining_quota) before sites
+  that would run out part-way;
+- fewest queued requests first (shortest processing time), which minimises the total completion time of the
+  queued sites.
+
+A job consumed through results() (as fetch_chunks does) may limit how far its requests run ahead of the
+consumer (`window`); while it is at that limit its site is skipped, so the workers move on to other sites.
+
+Pure Python and GUI-free, like export_pipeline.
+"""
+import heapq
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future, wait as futures_wait
+from functools import partial
+
+from utils import helpers
+from utils import request_planner
+from utils.helpers import OperationCancelledError
+
+PRIORITY_INTERACTIVE = 0 # A user is looking at the screen: site details, alerts
+PRIORITY_EXPORT = 1 # An export started from the GUI or CLI
+PRIORITY_BULK = 2 # Fleet exports and other backfills
+RESULT_POLL_SECONDS = 0.25 # How often a caller waiting for results checks for cancellation
+
+_current = threading.local()
+_CONSUMED = Future() # Stands in for futures whose result results() has handed out, so the result can be freed
+_CONSUMED.set_result(None)
+
+
+def current_job():
+    """The ScheduledJob whose request runs on this thread, or None outside the scheduler's workers."""
+    return getattr(_current, "job", None)
+
+
+class ScheduledJob:
+    """
+    Requests submitted together for one site. `futures` holds a concurrent.futures.Future per request,
+    in submission order, so callers can use as_completed() or results(). With a `window`, at most that many
+    requests run ahead of the ones results() has handed out.
+    """
+    def __init__(self, scheduler, site_id, priority, calls, api_key=None, check_if_cancelled_callback=None, window=None):
+        self.site_id = str(site_id) if site_id is not None else None
+        self.priority = priority
+        self.api_key = api_key
+        self.check_if_cancelled_callback = check_if_cancelled_callback
+        self.window = window
+        self.futures = [Future() for _ in calls]
+        self._calls = calls
+        self._scheduler = scheduler
+        self._cancelled = False
+        self._consumed = 0 # Results handed out by results()
+
+    def raise_if_cancelled(self):
+        """Raises OperationCancelledError if the job was cancelled or its callback says so."""
+        if self._cancelled:
+            raise OperationCancelledError("Cancelled")
+        if self.check_if_cancelled_callback:
+            self.check_if_cancelled_callback()
+
+    def cancel(self, reason="Cancelled"):
+        """Fails every request that has not started with OperationCancelledError; running ones are left to finish."""
+        self._scheduler._fail_pending(self, OperationCancelledError(reason))
+
+    def done(self):
+        return all(future.done() for future in self.futures)
+
+    def _may_start(self, index):
+        return self.window is None or index < self._consumed + self.window
+
+    def results(self):
+        """
+        Yields the results in submission order, re-raising a request's exception when its turn comes.
+        Each result is released by the job once handed out, so the caller holds the only reference.
+        The callback is polled while waiting; the rest of the job is cancelled if the caller stops early.
+        """
+        try:
+            for index in range(len(self.futures)):
+                future = self.futures[index]
+                while not future.done():
+                    self.raise_if_cancelled()
+                    futures_wait([future], timeout=RESULT_POLL_SECONDS)
+                result = future.result()
+                self.futures[index] = future = _CONSUMED
+                self._scheduler._advance(self, index + 1)
+                yield result
+                del result
+        finally:
+            self.cancel()
+
+
+class RequestScheduler:
+    """
+    Runs ScheduledJobs on `max_concurrent` daemon worker threads, started on the first submit.
+    `rate_limiter` (usually the client's SolarEdgeRateLimiter) is only read to plan against the daily budget;
+    the client still takes a permit for every request it sends.
+    """
+    def __init__(self, max_concurrent=helpers.MAX_CONCURRENT_API_REQUESTS, rate_limiter=None):
+        self.max_concurrent = max_concurrent
+        self.rate_limiter = rate_limiter
+        self._lock = threading.Condition()
+        self._queues = {} # (priority, site_id) -> deque of (job, request_index)
+        self._heap = [] # (priority, not_started, over_budget, queued, seq, queue_key); stale entries are skipped
+        self._entry_seq = {} # queue_key -> seq of its current heap entry
+        self._started = set() # queue keys that dispatched a request and still have some queued
+        self._seq = itertools.count()
+        self._workers = []
+        self._closed = False
+
+    # --- Submitting ---
+
+    def submit_calls(self, site_id, calls, priority=PRIORITY_INTERACTIVE, api_key=None, check_if_cancelled_callback=None,
+                     window=None):
+        """
+        Queues zero-argument callables that each make one API request for site_id (e.g. the site-details calls).
+        api_key lets the job be planned against the site's daily budget. check_if_cancelled_callback is checked
+        before each request is dispatched. window (only for jobs read through results()) limits how many
+        requests run ahead of the results handed out. Returns the ScheduledJob.
+        """
+        job = ScheduledJob(self, site_id, priority, list(calls), api_key, check_if_cancelled_callback, window)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The request scheduler is closed.")
+            self._start_workers()
+            key = (priority, job.site_id)
+            self._queues.setdefault(key, deque()).extend((job, i) for i in range(len(job.futures)))
+            self._push(key)
+            self._lock.notify_all()
+        return job
+
+    def submit_chunks(self, site_id, date_chunks, fetch_chunk_callback, priority=PRIORITY_EXPORT, api_key=None,
+                      check_if_cancelled_callback=None, chunk_done_callback=None, window=None):
+        """
+        Queues `fetch_chunk_callback(chunk_index, chunk_start, chunk_end)` for every (start, end) in date_chunks.
+        `chunk_done_callback(completed_count, total_count)` is called from a worker thread as each chunk lands.
+        """
+        job = self.submit_calls(site_id, [partial(fetch_chunk_callback, ci, cs, ce) for ci, (cs, ce) in enumerate(date_chunks)],
+                                priority=priority, api_key=api_key, check_if_cancelled_callback=check_if_cancelled_callback,
+                                window=window)
+        if chunk_done_callback:
+            completed = [0]
+            completed_lock = threading.Lock()
+
+            def on_done(future):
+                if future.exception() is not None:
+                    return
+                with completed_lock:
+                    completed[0] += 1
+                    done_count = completed[0]
+                chunk_done_callback(done_count, len(date_chunks))
+            for future in job.futures:
+                future.add_done_callback(on_done)
+        return job
+
+    def submit_range(self, site_id, data_type, time_unit, start_dt, end_dt, fetch_chunk_callback, **kwargs):
+        """
+        submit_chunks for [start_dt, end_dt], split into the fewest calls the endpoint's period limit allows
+        (request_planner.plan_calls). Returns (job, date_chunks).
+        """
+        date_chunks = request_planner.plan_calls(data_type, time_unit, [(start_dt, end_dt)], kwargs.get("check_if_cancelled_callback"))
+        return self.submit_chunks(site_id, date_chunks, fetch_chunk_callback, **kwargs), date_chunks
+
+    def fetch_chunks(self, site_id, date_chunks, fetch_chunk_callback, priority=PRIORITY_EXPORT, api_key=None,
+                     check_if_cancelled_callback=None, chunk_done_callback=None):
+        """
+        Scheduled counterpart of helpers.fetch_chunks_concurrently: yields (chunk_index, chunk_start, chunk_end, result)
+        in chunk order, with at most max_concurrent * helpers.CHUNKS_AHEAD_PER_WORKER chunks fetched ahead of the
+        consumer. If a chunk raises, the job's queued chunks are cancelled and the exception is re-raised when
+        that chunk's turn comes.
+        """
+        job = self.submit_chunks(site_id, date_chunks, fetch_chunk_callback, priority=priority, api_key=api_key,
+                                 check_if_cancelled_callback=check_if_cancelled_callback, chunk_done_callback=chunk_done_callback,
+                                 window=self.max_concurrent * helpers.CHUNKS_AHEAD_PER_WORKER)
+        for ci, result in enumerate(job.results()):
+            cs, ce = date_chunks[ci]
+            yield ci, cs, ce, result
+            del result
+
+    # --- Queue ---
+
+    def _over_budget(self, key, queue):
+        """1 if the queue's requests would not fit the site's (or account's) requests left today, else 0."""
+        priority, site_id = key
+        api_key = queue[0][0].api_key
+        if priority == PRIORITY_INTERACTIVE or self.rate_limiter is None or not api_key or site_id is None:
+            return 0
+        return 1 if len(queue) > min(self.rate_limiter.remaining_quota(api_key, site_id).values()) else 0
+
+    def _push(self, key):
+        """(Re)places the heap entry of a queue; called with the lock held whenever the queue changes."""
+        queue = self._queues.get(key)
+        if not queue:
+            self._queues.pop(key, None)
+            self._entry_seq.pop(key, None)
+            self._started.discard(key)
+            return
+        seq = next(self._seq)
+        self._entry_seq[key] = seq
+        heapq.heappush(self._heap, (key[0], 0 if key in self._started else 1, self._over_budget(key, queue), len(queue), seq, key))
+
+    def _next_request(self):
+        """Pops the next (job, request_index) to run, or None if nothing can run now. Lock held."""
+        held_back = [] # Entries of queues whose next request is outside its job's window; they keep their place
+        try:
+            while self._heap:
+                entry = heapq.heappop(self._heap)
+                key = entry[-1]
+                if self._entry_seq.get(key) != entry[4]:
+                    continue # Superseded by a newer entry for the same queue
+                job, index = self._queues[key][0]
+                future = job.futures[index]
+                if not future.done() and not job._may_start(index):
+                    held_back.append(entry)
+                    continue
+                self._queues[key].popleft()
+                self._started.add(key)
+                self._push(key)
+                if future.done():
+                    continue # Failed by cancel() while queued
+                future.set_running_or_notify_cancel()
+                return job, index
+            return None
+        finally:
+            for entry in held_back:
+                heapq.heappush(self._heap, entry)
+
+    def _advance(self, job, consumed):
+        """results() handed out `consumed` results: requests that were outside the job's window may start."""
+        with self._lock:
+            job._consumed = consumed
+            if job.window is not None:
+                self._lock.notify_all()
+
+    def _fail_pending(self, job, exception):
+        with self._lock:
+            job._cancelled = True
+            for future in job.futures:
+                if not future.done() and not future.running():
+                    future.set_exception(exception)
+
+    # --- Workers ---
+
+    def _start_workers(self):
+        while len(self._workers) < self.max_concurrent:
+            worker = threading.Thread(target=self._work, name=f"request-scheduler-{len(self._workers) + 1}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _work(self):
+        while True:
+            with self._lock:
+                item = self._next_request()
+                while item is None and not self._closed:
+                    self._lock.wait()
+                    item = self._next_request()
+                if item is None:
+                    return
+            job, index = item
+            future = job.futures[index]
+            _current.job = job
+            try:
+                job.raise_if_cancelled()
+                result = job._calls[index]()
+            except OperationCancelledError as e:
+                future.set_exception(e)
+                self._fail_pending(job, e)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                _current.job = None
+                # Do not keep the result alive while waiting for the next request
+                item = job = future = result = None
+
+    def close(self):
+        """Fails every queued request with OperationCancelledError and lets the workers exit once their request is done."""
+        with self._lock:
+            self._closed = True
+            queued_jobs = {job for queue in self._queues.values() for job, _ in queue}
+            self._queues.clear()
+            self._heap.clear()
+            self._entry_seq.clear()
+            self._started.clear()
+            self._lock.notify_all()
+        for job in queued_jobs:
+            self._fail_pending(job, OperationCancelledError("Request scheduler closed"))
@@ -0,0 +1,189 @@
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.timeseries_store import FINAL_AFTER, _DATE_DTYPE
+
+DEFAULT_SEGMENT_DIR = os.path.join(os.path.expanduser("~"), ".solaredge_segments")
+REVISION_METADATA_KEY = b"solaredge.store_revision" # TimeSeriesStore.month_revision a segment was sealed at
+
+
+def _import_pyarrow():
+    """Returns (pyarrow, pyarrow.ipc); raises ImportError if pyarrow is not installed."""
+    import pyarrow
+    import pyarrow.ipc
+    return pyarrow, pyarrow.ipc
+
+
+def segments_available():
+    """True if pyarrow is installed, which segment files need."""
+    try:
+        _import_pyarrow()
+        return True
+    except ImportError:
+        return False
+
+
+def _month_starts(start_dt, end_dt):
+    """The first day (00:00) of every calendar month overlapping [start_dt, end_dt]."""
+    month = datetime(start_dt.year, start_dt.month, 1)
+    while month <= end_dt:
+        yield month
+        month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _month_end(month_start):
+    next_month = datetime(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1)
+    return next_month - timedelta(seconds=1)
+
+
+class SegmentStore:
+    """
+    Read-optimised copy of the history in a TimeSeriesStore, as one sealed Arrow IPC file per
+    site, dataset and calendar month: `<root_dir>/<site_id>/<dataset>/YYYY-MM.arrow`.
+
+    Segments are written uncompressed, so read_table() memory-maps them and returns Arrow columns that
+    point straight into the mapped files: nothing is parsed or copied, and processes reading the same
+    segments share the operating system's page cache instead of each loading their own copy.
+    read_range() turns that into a DataFrame shaped like the data_processor.process_* output.
+
+    A month is sealed (see seal_from_store) once it ended more than FINAL_AFTER ago, because SolarEdge may
+    still update newer data, and is sealed again whenever the store has been written to since. Months without
+    a segment are read from timeseries_store, if one is given.
+    """
+    def __init__(self, root_dir=DEFAULT_SEGMENT_DIR, timeseries_store=None):
+        self.root_dir = root_dir
+        self.timeseries_store = timeseries_store
+
+    def segment_path(self, site_id, dataset, month_start):
+        safe_parts = [str(site_id)] + [p.replace("\\", "-") for p in dataset.split("/")]
+        return os.path.join(self.root_dir, *safe_parts, f"{month_start.strftime('%Y-%m')}.arrow")
+
+    def write_month(self, site_id, dataset, month_start, dataframe, store_revision=None):
+        """
+        Writes (or atomically replaces) the segment of one month from a process_*-shaped frame.
+        store_revision is the TimeSeriesStore.month_revision the frame was read at.
+        """
+        pa, ipc = _import_pyarrow()
+        path = self.segment_path(site_id, dataset, month_start)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pandas(dataframe.sort_values('date'), preserve_index=False)
+        if store_revision is not None:
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), REVISION_METADATA_KEY: str(store_revision).encode()})
+        tmp_path = f"{path}.tmp"
+        with ipc.new_file(tmp_path, table.schema) as writer:
+            writer.write_table(table)
+        # Readers that already mapped the old file keep its pages; new readers see the new file
+        os.replace(tmp_path, path)
+        return path
+
+    def _segment_revision(self, path):
+        """The store revision a segment was sealed at, or None for a missing segment or one without it."""
+        if not os.path.exists(path):
+            return None
+        pa, ipc = _import_pyarrow()
+        with pa.memory_map(path, "r") as source:
+            revision = (ipc.open_file(source).schema.metadata or {}).get(REVISION_METADATA_KEY)
+        return int(revision) if revision is not None else None
+
+    def seal_from_store(self, site_id, dataset, start_dt, end_dt, now=None, coverage_keys=None):
+        """
+        Writes a segment for every month in [start_dt, end_dt] that is final and whose segment is missing or
+        older than the store's data for that month (TimeSeriesStore.month_revision). With coverage_keys, only
+        months the store has fetched completely for those keys are sealed; an outdated segment of a month that
+        is not complete yet is removed, so the month is read from the store. Returns the segment paths written.
+        """
+        if self.timeseries_store is None:
+            return []
+        final_before = (now or datetime.now()) - FINAL_AFTER
+        written = []
+        for month_start in _month_starts(start_dt, end_dt):
+            month_end = _month_end(month_start)
+            if month_end >= final_before:
+                break
+            path = self.segment_path(site_id, dataset, month_start)
+            # Read before the data: a write in between leaves the segment one revision behind, so it is sealed again
+            revision = self.timeseries_store.month_revision(site_id, dataset, month_start)
+            if self._segment_revision(path) == revision:
+                continue
+            frame = pd.DataFrame()
+            if not coverage_keys or not self.timeseries_store.missing_ranges(site_id, coverage_keys, month_start, month_end):
+                frame = self.timeseries_store.read_frame(site_id, dataset, month_start, month_end)
+            if not frame.empty:
+                written.append(self.write_month(site_id, dataset, month_start, frame, store_revision=revision))
+            elif os.path.exists(path):
+                os.remove(path)
+        return written
+
+    def _read_month_table(self, site_id, dataset, month_start, start_dt, end_dt, columns):
+        """Zero-copy slice of one month's segment covering [start_dt, end_dt], or None if there is no usable segment."""
+        pa, ipc = _import_pyarrow()
+        path = self.segment_path(site_id, dataset, month_start)
+        if not os.path.exists(path):
+            return None
+        table = ipc.open_file(pa.memory_map(path, "r")).read_all()
+        if columns is not None:
+            if not set(columns) <= set(table.schema.names):
+                return None
+            table = table.select(['date'] + list(columns))
+        # Segments are sorted by date, so the range is one contiguous slice
+        dates = table.column('date').to_numpy().astype("datetime64[s]")
+        first = np.searchsorted(dates, np.datetime64(start_dt, "s"), side="left")
+        last = np.searchsorted(dates, np.datetime64(end_dt, "s"), side="right")
+        return table.slice(first, last - first)
+
+    def read_table(self, site_id, dataset, start_dt, end_dt, columns=None):
+        """
+        Returns the dataset between start_dt and end_dt (inclusive) as a pyarrow Table backed by the
+        memory-mapped segments, plus the list of month starts that had no segment: (table or None, missing_months).
+        """
+        pa, ipc = _import_pyarrow()
+        tables = []
+        missing_months = []
+        for month_start in _month_starts(start_dt, end_dt):
+            table = self._read_month_table(site_id, dataset, month_start, max(start_dt, month_start),
+                                           min(end_dt, _month_end(month_start)), columns)
+            if table is None:
+                missing_months.append(month_start)
+            elif table.num_rows:
+                tables.append(table)
+        if not tables:
+            return None, missing_months
+        # Months sealed at different times can differ in columns or int/float types
+        return pa.concat_tables(tables, promote_options="permissive"), missing_months
+
+    def read_range(self, site_id, dataset, start_dt, end_dt, columns=None):
+        """
+        Returns the dataset between start_dt and end_dt (inclusive) as a DataFrame with the same layout as
+        data_processor.process_voltage_data / process_production_data: 'date' first, sorted, missing values as 0.
+        Months without a segment are read from timeseries_store, if there is one.
+        """
+        table, missing_months = self.read_table(site_id, dataset, start_dt, end_dt, columns=columns)
+        frames = []
+        if table is not None:
+            frame = table.to_pandas(split_blocks=True) # Numeric columns without nulls stay views of the mapped pages
+            frame['date'] = frame['date'].astype(_DATE_DTYPE)
+            if any(column.null_count for column in table.columns): # Columns missing from some months
+                frame = frame.fillna(0)
+            frames.append(frame)
+        if missing_months and self.timeseries_store is not None:
+            for month_start in missing_months:
+                frame = self.timeseries_store.read_frame(site_id, dataset, max(start_dt, month_start),
+                                                         min(end_dt, _month_end(month_start)), columns=columns)
+                if not frame.empty:
+                    frames.append(frame)
+        if not frames:
+            return pd.DataFrame()
+        if len(frames) == 1:
+            return frames[0]
+        df = pd.concat(frames, ignore_index=True, sort=False).sort_values('date', kind='stable').reset_index(drop=True)
+        return df.fillna(0)
+
+    def iter_frames(self, site_id, dataset, start_dt, end_dt, columns=None):
+        """read_range one calendar month at a time, so an export can stream years of data."""
+        for month_start in _month_starts(start_dt, end_dt):
+            frame = self.read_range(site_id, dataset, max(start_dt, month_start), min(end_dt, _month_end(month_start)), columns=columns)
+            if not frame.empty:
+                yield frame
@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+DEFAULT_SYNC_STATE_FILE = os.path.join(os.path.expanduser("~"), ".solaredge_sync_state.json")
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def sync_key(site_id, data_type, meters_or_equipment=None, time_unit=None):
+    """
+    Identifies one incremental export stream.
+    meters_or_equipment is the list of meter types for production data or the inverter serial for voltage data.
+    """
+    if isinstance(meters_or_equipment, (list, tuple)):
+        meters_or_equipment = ",".join(sorted(meters_or_equipment))
+    return f"{site_id}|{data_type}|{meters_or_equipment or ''}|{time_unit or ''}"
+
+
+class SyncStateStore:
+    """
+    Remembers, per sync_key, the timestamp up to which data has been exported and the file it was appended to.
+    Stored as JSON; every update is written atomically.
+    """
+    def __init__(self, state_file=DEFAULT_SYNC_STATE_FILE):
+        self.state_file = state_file
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key):
+        """Returns {"last_timestamp": datetime, "output_file": str} or None if this stream was never synced."""
+        with self._lock:
+            entry = self._load().get(key)
+        if not entry:
+            return None
+        try:
+            last_timestamp = datetime.strptime(entry["last_timestamp"], TIMESTAMP_FORMAT)
+        except (KeyError, ValueError):
+            return None
+        return {"last_timestamp": last_timestamp, "output_file": entry.get("output_file")}
+
+    def update(self, key, last_timestamp, output_file):
+        with self._lock:
+            data = self._load()
+            data[key] = {
+                "last_timestamp": last_timestamp.strftime(TIMESTAMP_FORMAT),
+                "output_file": output_file,
+                "synced_at": datetime.now().strftime(TIMESTAMP_FORMAT),
+            }
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.state_file)
+
+    def forget(self, key):
+        with self._lock:
+            data = self._load()
+            if data.pop(key, None) is not None:
+                tmp_path = f"{self.state_file}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2)
+                os.replace(tmp_path, self.state_file)
+
+
+def incremental_start(state_entry, data_type):
+    """
+    Where the next incremental fetch should start, or None if there is no usable previous run.
+    Energy rows are bucketed (the last bucket of a run may still have been filling up), so production
+    syncs restart *at* the held-back bucket; telemetry samples are final, so voltage syncs restart just after.
+    """
+    if not state_entry or not state_entry.get("output_file") or not os.path.exists(state_entry["output_file"]):
+        return None
+    if data_type == "voltage":
+        return state_entry["last_timestamp"] + timedelta(seconds=1)
+    return state_entry["last_timestamp"]
+
+
+def split_final_rows(dataframe, data_type):
+    """
+    Splits freshly fetched rows into (rows_to_append, new_watermark).
+    For production data the newest bucket is held back and becomes the watermark, so the next run
+    re-fetches it once it is complete. For voltage data every row is final and the watermark is the newest sample.
+    """
+    if dataframe is None or dataframe.empty or 'date' not in dataframe.columns:
+        return dataframe, None
+    last_date = dataframe['date'].max()
+    if data_type == "voltage":
+        return dataframe, last_date.to_pydatetime()
+    return dataframe[dataframe['date'] < last_date].reset_index(drop=True), last_date.to_pydatetime()
@@ -0,0 +1,243 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processor import parse_solaredge_dates
+
+DEFAULT_STORE_FILE = os.path.join(os.path.expanduser("~"), ".solaredge_timeseries.sqlite")
+FINAL_AFTER = timedelta(days=1) # Ranges newer than this may still change on the SolarEdge side, so they are never marked as fetched
+READ_WINDOW_DAYS = 31 # iter_frames reads this many days per query
+
+_DATE_DTYPE = parse_solaredge_dates(pd.Series(["2000-01-01 00:00:00"])).dtype # Same dtype as the process_* frames
+
+
+def production_series(time_unit, meter_type):
+    """Series name of one energyDetails meter at one time unit, e.g. "production/HOUR/PRODUCTION"."""
+    return f"production/{time_unit}/{meter_type}"
+
+
+def voltage_dataset(equipment_sn):
+    """Dataset (series name prefix) holding every telemetry field of one inverter."""
+    return f"voltage/{equipment_sn}"
+
+
+def _to_epoch_seconds(values):
+    return pd.to_datetime(pd.Series(values)).to_numpy(dtype="datetime64[s]").astype(np.int64)
+
+
+def _from_epoch_seconds(seconds):
+    return datetime(1970, 1, 1) + timedelta(seconds=seconds)
+
+
+class TimeSeriesStore:
+    """
+    Local SQLite (WAL) store of fetched data, in long format: one row per (site_id, series, ts).
+
+    A series is one column of a processed frame under a dataset name, e.g. "production/HOUR/PRODUCTION" or
+    "voltage/<serial>/L1Data.acVoltage". The samples table is a WITHOUT ROWID table clustered on its
+    primary key, so it is itself the covering index for (site, series, time range) scans. Writes are
+    idempotent upserts, one transaction per frame.
+
+    The fetched_ranges table records which time ranges were fetched for a coverage key (a production
+    series, or a voltage dataset), so data that was already fetched is not requested again even if the
+    API returned no values for it. The month_revisions table counts the writes to each calendar month of a
+    dataset, so copies of a month (SegmentStore segments) can tell whether they are still current. Thread-safe.
+    """
+    def __init__(self, store_file=DEFAULT_STORE_FILE):
+        self.store_file = store_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(store_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL") # Safe with WAL; a crash can only lose the last transactions
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS samples (
+                site_id TEXT NOT NULL,
+                series TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                value,
+                PRIMARY KEY (site_id, series, ts)
+            ) WITHOUT ROWID""")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS series (
+                site_id TEXT NOT NULL,
+                dataset TEXT NOT NULL,
+                column_name TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (site_id, dataset, column_name)
+            ) WITHOUT ROWID""")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS fetched_ranges (
+                site_id TEXT NOT NULL,
+                coverage_key TEXT NOT NULL,
+                start_ts INTEGER NOT NULL,
+                end_ts INTEGER NOT NULL,
+                PRIMARY KEY (site_id, coverage_key, start_ts)
+            ) WITHOUT ROWID""")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS month_revisions (
+                site_id TEXT NOT NULL,
+                dataset TEXT NOT NULL,
+                month TEXT NOT NULL,
+                revision INTEGER NOT NULL,
+                PRIMARY KEY (site_id, dataset, month)
+            ) WITHOUT ROWID""")
+
+    def upsert_frame(self, site_id, dataset, dataframe):
+        """
+        Writes every non-date column of a processed frame as series "<dataset>/<column>".
+        Re-writing the same timestamps replaces their values, so re-fetched chunks never duplicate rows.
+        Bumps the revision of every month written to. Returns the number of samples written.
+        """
+        if dataframe is None or dataframe.empty or 'date' not in dataframe.columns:
+            return 0
+        site_id = str(site_id)
+        epoch_seconds = _to_epoch_seconds(dataframe['date'])
+        ts = epoch_seconds.tolist()
+        months = [str(m) for m in np.unique(epoch_seconds.astype("datetime64[s]").astype("datetime64[M]"))]
+        columns = [c for c in dataframe.columns if c != 'date']
+        written = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO month_revisions (site_id, dataset, month, revision) VALUES (?, ?, ?, 1) "
+                    "ON CONFLICT (site_id, dataset, month) DO UPDATE SET revision = revision + 1",
+                    [(site_id, dataset, month) for month in months])
+                next_position = self._conn.execute(
+                    "SELECT COALESCE(MAX(position) + 1, 0) FROM series WHERE site_id = ? AND dataset = ?", (site_id, dataset)).fetchone()[0]
+                for col in columns:
+                    if self._conn.execute("INSERT OR IGNORE INTO series (site_id, dataset, column_name, position) VALUES (?, ?, ?, ?)",
+                                          (site_id, dataset, col, next_position)).rowcount:
+                        next_position += 1
+                    series = f"{dataset}/{col}"
+                    values = dataframe[col].astype(object).where(dataframe[col].notna(), None).tolist()
+                    self._conn.executemany(
+                        "INSERT INTO samples (site_id, series, ts, value) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT (site_id, series, ts) DO UPDATE SET value = excluded.value",
+                        zip([site_id] * len(ts), [series] * len(ts), ts, values))
+                    written += len(ts)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return written
+
+    def month_revision(self, site_id, dataset, month_start):
+        """How many upserts wrote to the calendar month starting at month_start (0 if none did)."""
+        with self._lock:
+            row = self._conn.execute("SELECT revision FROM month_revisions WHERE site_id = ? AND dataset = ? AND month = ?",
+                                     (str(site_id), dataset, month_start.strftime("%Y-%m"))).fetchone()
+        return row[0] if row else 0
+
+    def columns(self, site_id, dataset):
+        """The columns stored for a dataset, in the order they were first written."""
+        with self._lock:
+            rows = self._conn.execute("SELECT column_name FROM series WHERE site_id = ? AND dataset = ? ORDER BY position",
+                                      (str(site_id), dataset)).fetchall()
+        return [r[0] for r in rows]
+
+    def read_frame(self, site_id, dataset, start_dt, end_dt, columns=None):
+        """
+        Returns the stored samples of a dataset between start_dt and end_dt (inclusive) as a wide frame shaped
+        like the process_* output: a 'date' column first, then one column per series, sorted by date, with
+        missing values as 0. columns limits (and orders) the series read; by default all of the dataset's are.
+        """
+        site_id = str(site_id)
+        columns = columns if columns is not None else self.columns(site_id, dataset)
+        start_ts, end_ts = _to_epoch_seconds([start_dt, end_dt]).tolist()
+        series_values = {}
+        with self._lock:
+            for col in columns:
+                rows = self._conn.execute(
+                    "SELECT ts, value FROM samples WHERE site_id = ? AND series = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                    (site_id, f"{dataset}/{col}", start_ts, end_ts)).fetchall()
+                if rows:
+                    ts, values = zip(*rows)
+                    series_values[col] = pd.Series(values, index=np.asarray(ts, dtype=np.int64))
+        if not series_values:
+            return pd.DataFrame()
+        wide = pd.concat(series_values, axis=1, sort=True).fillna(0).infer_objects()
+        wide.insert(0, 'date', pd.to_datetime(wide.index.to_numpy(), unit="s").astype(_DATE_DTYPE))
+        return wide.reset_index(drop=True)
+
+    def iter_frames(self, site_id, dataset, start_dt, end_dt, columns=None, window_days=READ_WINDOW_DAYS):
+        """read_frame in consecutive windows of window_days, so an export can stream years of data from the store."""
+        window_start = start_dt
+        while window_start <= end_dt:
+            window_end = min(end_dt, window_start + timedelta(days=window_days) - timedelta(seconds=1))
+            frame = self.read_frame(site_id, dataset, window_start, window_end, columns=columns)
+            if not frame.empty:
+                yield frame
+            window_start = window_end + timedelta(seconds=1)
+
+    def mark_fetched(self, site_id, coverage_keys, start_dt, end_dt, now=None):
+        """
+        Records that [start_dt, end_dt] was fetched for each coverage key, merging it with adjacent or
+        overlapping ranges. The part newer than FINAL_AFTER is not recorded, so it is fetched again next time.
+        """
+        end_dt = min(end_dt, (now or datetime.now()) - FINAL_AFTER)
+        if end_dt < start_dt:
+            return
+        site_id = str(site_id)
+        start_ts, end_ts = _to_epoch_seconds([start_dt, end_dt]).tolist()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for key in coverage_keys:
+                    overlapping = self._conn.execute(
+                        "SELECT start_ts, end_ts FROM fetched_ranges WHERE site_id = ? AND coverage_key = ? AND start_ts <= ? AND end_ts >= ?",
+                        (site_id, key, end_ts + 1, start_ts - 1)).fetchall()
+                    merged_start = min([start_ts] + [r[0] for r in overlapping])
+                    merged_end = max([end_ts] + [r[1] for r in overlapping])
+                    self._conn.executemany("DELETE FROM fetched_ranges WHERE site_id = ? AND coverage_key = ? AND start_ts = ?",
+                                           [(site_id, key, r[0]) for r in overlapping])
+                    self._conn.execute("INSERT INTO fetched_ranges (site_id, coverage_key, start_ts, end_ts) VALUES (?, ?, ?, ?)",
+                                       (site_id, key, merged_start, merged_end))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def missing_ranges(self, site_id, coverage_keys, start_dt, end_dt):
+        """
+        The parts of [start_dt, end_dt] not yet fetched for at least one of the coverage keys,
+        as a sorted list of (start, end) datetimes.
+        """
+        site_id = str(site_id)
+        start_ts, end_ts = _to_epoch_seconds([start_dt, end_dt]).tolist()
+        gaps = []
+        with self._lock:
+            for key in coverage_keys:
+                cursor = start_ts
+                for range_start, range_end in self._conn.execute(
+                        "SELECT start_ts, end_ts FROM fetched_ranges WHERE site_id = ? AND coverage_key = ? AND end_ts >= ? AND start_ts <= ? ORDER BY start_ts",
+                        (site_id, key, start_ts, end_ts)):
+                    if range_start > cursor:
+                        gaps.append((cursor, range_start - 1))
+                    cursor = max(cursor, range_end + 1)
+                if cursor <= end_ts:
+                    gaps.append((cursor, end_ts))
+        # Union of the gaps of all keys
+        merged = []
+        for gap_start, gap_end in sorted(gaps):
+            if merged and gap_start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], gap_end)
+            else:
+                merged.append([gap_start, gap_end])
+        return [(_from_epoch_seconds(s), _from_epoch_seconds(e)) for s, e in merged]
+
+    def stats(self):
+        """Returns {"samples", "series", "bytes"}."""
+        with self._lock:
+            samples = self._conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+            series = self._conn.execute("SELECT COUNT(*) FROM series").fetchone()[0]
+        return {"samples": samples, "series": series,
+                "bytes": os.path.getsize(self.store_file) if os.path.exists(self.store_file) else 0}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()